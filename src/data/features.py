@@ -8,6 +8,18 @@ import numpy as np
 from typing import Dict, List, Tuple, Optional
 import logging
 from datetime import datetime, timedelta
+from pathlib import Path
+import json
+
+try:
+    from data.tensor_store import TensorStore, encode_road_ids
+except ImportError:
+    from tensor_store import TensorStore, encode_road_ids
+
+try:
+    from training.splits import TimeSplitManager
+except ImportError:
+    TimeSplitManager = None
 
 class FeatureEngineer:
     """Feature engineering for traffic prediction models."""
@@ -63,6 +75,53 @@ class FeatureEngineer:
         
         return np.array(X_sequences), np.array(y_sequences), road_ids
     
+    def create_snapshot_grid(self, time_series_df: pd.DataFrame,
+                             node_mapping: Optional[Dict[str, int]] = None
+                             ) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """
+        Pivot time series into one dense all-node grid.
+        
+        Windows are cut from the grid at load time, so every time step is stored
+        once instead of once per window.
+        
+        Args:
+            time_series_df: Time series data with 'road_id', 'time_bin' columns
+            node_mapping: Optional graph node mapping (road_id -> node index) that
+                fixes the node axis; defaults to sorted road ids
+            
+        Returns:
+            Tuple of (grid [time_steps, num_nodes, features] float32, int64
+            timestamps [time_steps], node road ids [num_nodes])
+        """
+        feature_cols = [col for col in time_series_df.columns 
+                       if col not in ['road_id', 'time_bin']]
+        
+        road_ids = time_series_df['road_id'].astype(str)
+        if node_mapping is None:
+            nodes = sorted(road_ids.unique())
+            node_mapping = {road: idx for idx, road in enumerate(nodes)}
+        else:
+            nodes = [''] * (max(node_mapping.values()) + 1 if node_mapping else 0)
+            for road, idx in node_mapping.items():
+                nodes[idx] = str(road)
+        
+        node_idx = road_ids.map(node_mapping).to_numpy()
+        known = ~pd.isna(node_idx)
+        if not known.all():
+            self.logger.warning(f"{(~known).sum()} records of roads outside the node mapping dropped")
+        
+        time_idx, timestamps = pd.factorize(time_series_df['time_bin'], sort=True)
+        
+        # Missing (time, road) cells and NaNs become 0, the mean of normalized features
+        grid = np.zeros((len(timestamps), len(nodes), len(feature_cols)), dtype=np.float32)
+        values = time_series_df[feature_cols].to_numpy(dtype=np.float32)
+        grid[time_idx[known], node_idx[known].astype(np.int64)] = np.nan_to_num(values[known])
+        
+        coverage = known.sum() / grid[..., 0].size if grid.size else 0.0
+        self.logger.info(f"Snapshot grid {grid.shape}, {coverage:.1%} of cells observed")
+        
+        return grid, np.asarray(timestamps, dtype='datetime64[ns]').astype(np.int64), nodes
+    
     def create_spatial_features(self, time_series_df: pd.DataFrame, 
                                road_network_df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -260,8 +319,83 @@ class FeatureEngineer:
         
         return normalized_train, normalization_stats
 
+def save_snapshot_features(engineer: FeatureEngineer, enriched_df: pd.DataFrame,
+                           output_dir: str, node_mapping: Optional[Dict[str, int]] = None,
+                           val_fraction: float = 0.1, test_fraction: float = 0.2):
+    """
+    Save one all-node grid with chronological split boundaries.
+    
+    Splits are stored as time-step boundaries in `splits.json`; datasets cut
+    train/val/test windows from the shared grid without copying it.
+    
+    Args:
+        engineer: Feature engineer (sequence length, horizon, normalization)
+        enriched_df: Feature-engineered time series
+        output_dir: Output directory
+        node_mapping: Optional graph node mapping fixing the node axis
+        val_fraction: Fraction of time steps used for validation
+        test_fraction: Fraction of time steps used for testing (the latest ones)
+    """
+    if TimeSplitManager is None:
+        raise ImportError("training.splits is required for the snapshot format")
+    
+    if node_mapping is None:
+        roads = sorted(enriched_df['road_id'].astype(str).unique())
+        node_mapping = {road: idx for idx, road in enumerate(roads)}
+    
+    timestamps = np.unique(enriched_df['time_bin'].to_numpy())
+    splits = TimeSplitManager.from_fractions(
+        len(timestamps), engineer.sequence_length, engineer.prediction_horizon,
+        val_fraction=val_fraction, test_fraction=test_fraction
+    )
+    
+    # Normalization statistics come from the training period only
+    train_mask = enriched_df['time_bin'].to_numpy() < timestamps[splits.val_start]
+    _, normalized_df, norm_stats = engineer.normalize_features(
+        enriched_df[train_mask], enriched_df
+    )
+    
+    grid, grid_timestamps, nodes = engineer.create_snapshot_grid(normalized_df, node_mapping)
+    np.save(f"{output_dir}/grid.npy", grid)
+    np.save(f"{output_dir}/grid_timestamps.npy", grid_timestamps)
+    splits.save(f"{output_dir}/splits.json")
+    
+    metadata = {
+        'normalization_stats': norm_stats,
+        'sequence_length': engineer.sequence_length,
+        'prediction_horizon': engineer.prediction_horizon,
+        'feature_names': [col for col in normalized_df.columns 
+                         if col not in ['road_id', 'time_bin']],
+        'store_format': 'snapshot',
+        'snapshot_nodes': nodes
+    }
+    
+    with open(f"{output_dir}/metadata.json", 'w') as f:
+        json.dump(metadata, f, default=str, indent=2)
+    
+    print(f"Snapshot grid {grid.shape} saved to {output_dir}")
+    for split, indices in splits.ranges.items():
+        print(f"  {split.capitalize()} windows: {len(indices)}")
+
+def drop_unknown_roads(engineer: FeatureEngineer, split: str, X: np.ndarray, y: np.ndarray,
+                       node_idx: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Drop samples whose road has no node index (-1 from `encode_road_ids`), with a warning."""
+    known = node_idx >= 0
+    if known.all():
+        return X, y, node_idx
+    
+    engineer.logger.warning(
+        f"Dropping {int((~known).sum())} {split} samples of roads without a node index "
+        f"(not in the graph or the train vocabulary)"
+    )
+    return X[known], y[known], node_idx[known]
+
 def create_model_ready_features(input_file: str, output_dir: str, 
-                               road_network_file: Optional[str] = None):
+                               road_network_file: Optional[str] = None,
+                               store_format: str = 'npy',
+                               store_dtype: str = 'float32',
+                               compression: str = 'none',
+                               chunk_rows: Optional[int] = None):
     """
     Complete feature engineering pipeline.
     
@@ -269,6 +403,12 @@ def create_model_ready_features(input_file: str, output_dir: str,
         input_file: Path to aggregated time series data
         output_dir: Output directory for processed features
         road_network_file: Optional road network file for spatial features
+        store_format: 'npy' (plain arrays + per-sample road ids in metadata.json),
+            'chunked' (chunked tensor store with int32 node indices) or 'snapshot'
+            (one [time_steps, num_nodes, features] grid with time-based splits)
+        store_dtype: Storage dtype of the chunked store ('float32' or 'float16')
+        compression: Chunk compression of the chunked store ('none', 'zlib', 'lz4', 'zstd')
+        chunk_rows: Samples per chunk of the chunked store (default: ~4 MB chunks)
     """
     engineer = FeatureEngineer()
     
@@ -291,6 +431,17 @@ def create_model_ready_features(input_file: str, output_dir: str,
         except Exception as e:
             print(f"Warning: Could not add spatial features: {e}")
     
+    # Graph node order, if graph tensors were already created in output_dir
+    node_mapping = None
+    mapping_path = Path(output_dir) / 'node_mapping.json'
+    if mapping_path.exists():
+        with open(mapping_path, 'r') as f:
+            node_mapping = json.load(f)
+    
+    if store_format == 'snapshot':
+        save_snapshot_features(engineer, enriched_df, output_dir, node_mapping)
+        return
+    
     # Split train/test (80/20)
     split_date = enriched_df['time_bin'].quantile(0.8)
     train_df = enriched_df[enriched_df['time_bin'] <= split_date]
@@ -299,20 +450,8 @@ def create_model_ready_features(input_file: str, output_dir: str,
     # Normalize features
     train_normalized, test_normalized, norm_stats = engineer.normalize_features(train_df, test_df)
     
-    # Create sequences
-    X_train, y_train, train_road_ids = engineer.create_sequences(train_normalized)
-    X_test, y_test, test_road_ids = engineer.create_sequences(test_normalized)
-    
-    # Save processed data
-    np.save(f"{output_dir}/X_train.npy", X_train)
-    np.save(f"{output_dir}/y_train.npy", y_train)
-    np.save(f"{output_dir}/X_test.npy", X_test)
-    np.save(f"{output_dir}/y_test.npy", y_test)
-    
     # Save metadata
     metadata = {
-        'train_road_ids': train_road_ids,
-        'test_road_ids': test_road_ids,
         'normalization_stats': norm_stats,
         'sequence_length': engineer.sequence_length,
         'prediction_horizon': engineer.prediction_horizon,
@@ -320,7 +459,43 @@ def create_model_ready_features(input_file: str, output_dir: str,
                          if col not in ['road_id', 'time_bin']]
     }
     
-    import json
+    # Create sequences
+    X_train, y_train, train_road_ids = engineer.create_sequences(train_normalized)
+    X_test, y_test, test_road_ids = engineer.create_sequences(test_normalized)
+    
+    if store_format == 'chunked':
+        # Chunked store: road ids become int32 node indices, strings are kept once
+        train_idx, road_index = encode_road_ids(train_road_ids, node_mapping)
+        test_idx, _ = encode_road_ids(test_road_ids, node_mapping or
+                                      {road: i for i, road in enumerate(road_index)})
+        
+        # Roads outside the graph (or the train vocabulary) have no node index;
+        # -1 would index the last node, so their samples are dropped
+        X_train, y_train, train_idx = drop_unknown_roads(engineer, 'train', X_train, y_train, train_idx)
+        X_test, y_test, test_idx = drop_unknown_roads(engineer, 'test', X_test, y_test, test_idx)
+        
+        store = TensorStore(Path(output_dir) / 'tensor_store', mode='w')
+        for name, array in [('X_train', X_train), ('y_train', y_train),
+                            ('X_test', X_test), ('y_test', y_test)]:
+            store.write_array(name, array, chunk_rows=chunk_rows, dtype=store_dtype,
+                              compression=compression)
+        store.write_array('train_node_idx', train_idx)
+        store.write_array('test_node_idx', test_idx)
+        store.attrs['road_index'] = road_index
+        store.flush()
+        
+        metadata['store_format'] = 'chunked'
+        metadata['tensor_store'] = 'tensor_store'
+    else:
+        # Save processed data as float32 so it can be memory-mapped without conversion
+        np.save(f"{output_dir}/X_train.npy", X_train.astype(np.float32))
+        np.save(f"{output_dir}/y_train.npy", y_train.astype(np.float32))
+        np.save(f"{output_dir}/X_test.npy", X_test.astype(np.float32))
+        np.save(f"{output_dir}/y_test.npy", y_test.astype(np.float32))
+        
+        metadata['train_road_ids'] = train_road_ids
+        metadata['test_road_ids'] = test_road_ids
+    
     with open(f"{output_dir}/metadata.json", 'w') as f:
         json.dump(metadata, f, default=str, indent=2)
     
@@ -0,0 +1,289 @@
+"""
+Chunked on-disk tensor store for processed training data.
+Stores arrays as fixed-size row chunks with an index file, optional float16
+storage and optional LZ4/zstd/zlib compression, with random-access reads.
+"""
+
+import numpy as np
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import zlib
+
+# Optional compression backends
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIONS = ('none', 'zlib', 'lz4', 'zstd')
+
+# Default uncompressed chunk size when chunk_rows is not given
+TARGET_CHUNK_BYTES = 4 * 1024 * 1024
+
+def _compress(raw: bytes, compression: str, level: Optional[int]) -> bytes:
+    """Compress a chunk buffer with the given codec."""
+    if compression == 'zlib':
+        return zlib.compress(raw, 6 if level is None else level)
+    elif compression == 'lz4':
+        return lz4_frame.compress(raw, compression_level=0 if level is None else level)
+    elif compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(raw)
+    raise ValueError(f"Unknown compression: {compression}")
+
+def _decompress(payload: bytes, compression: str) -> bytes:
+    """Decompress a chunk buffer with the given codec."""
+    if compression == 'zlib':
+        return zlib.decompress(payload)
+    elif compression == 'lz4':
+        return lz4_frame.decompress(payload)
+    elif compression == 'zstd':
+        return zstandard.ZstdDecompressor().decompress(payload)
+    raise ValueError(f"Unknown compression: {compression}")
+
+def _check_codec(compression: str):
+    """Fail early if a compression backend is not installed."""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+    if compression == 'lz4' and lz4_frame is None:
+        raise ImportError("LZ4 compression requires the 'lz4' package (pip install lz4)")
+    if compression == 'zstd' and zstandard is None:
+        raise ImportError("zstd compression requires the 'zstandard' package (pip install zstandard)")
+
+class TensorStore:
+    """Directory of chunked arrays with a JSON chunk index."""
+    
+    INDEX_FILE = 'index.json'
+    
+    def __init__(self, path: str, mode: str = 'r', cache_chunks: int = 4):
+        """
+        Open a tensor store.
+        
+        Args:
+            path: Store directory
+            mode: 'r' to read, 'w' to create (overwrites the index), 'a' to add arrays
+            cache_chunks: Number of decoded chunks kept in memory for repeated reads
+        """
+        self.path = Path(path)
+        self.mode = mode
+        self.cache_chunks = cache_chunks
+        self._cache: 'OrderedDict[Tuple[str, int], np.ndarray]' = OrderedDict()
+        self.logger = logging.getLogger(__name__)
+        
+        index_path = self.path / self.INDEX_FILE
+        if mode == 'w' or (mode == 'a' and not index_path.exists()):
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.index = {'arrays': {}, 'attrs': {}}
+        else:
+            with open(index_path, 'r') as f:
+                self.index = json.load(f)
+    
+    @property
+    def attrs(self) -> Dict:
+        """Free-form metadata stored alongside the arrays."""
+        return self.index['attrs']
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.index['arrays']
+    
+    def shape(self, name: str) -> Tuple[int, ...]:
+        """Shape of a stored array."""
+        return tuple(self.index['arrays'][name]['shape'])
+    
+    def write_array(self, name: str, array: np.ndarray, chunk_rows: Optional[int] = None,
+                    dtype: Optional[str] = None, compression: str = 'none',
+                    level: Optional[int] = None):
+        """
+        Write an array as row chunks along axis 0.
+        
+        The input may be a memory-mapped array; only one chunk is materialized
+        at a time.
+        
+        Args:
+            name: Array name
+            array: Array to store
+            chunk_rows: Rows (samples) per chunk (default: ~4 MB per chunk)
+            dtype: Storage dtype (default: the array's dtype), e.g. 'float16'
+            compression: 'none', 'zlib', 'lz4' or 'zstd'
+            level: Compression level (codec default if None)
+        """
+        if self.mode == 'r':
+            raise IOError("Tensor store opened read-only")
+        _check_codec(compression)
+        
+        dtype = np.dtype(dtype or array.dtype)
+        if chunk_rows is None:
+            row_bytes = dtype.itemsize * int(np.prod(array.shape[1:]))
+            chunk_rows = max(1, TARGET_CHUNK_BYTES // max(row_bytes, 1))
+        
+        array_dir = self.path / name
+        array_dir.mkdir(parents=True, exist_ok=True)
+        
+        chunks = []
+        n_rows = array.shape[0]
+        for chunk_id, start in enumerate(range(0, max(n_rows, 1), chunk_rows)):
+            end = min(start + chunk_rows, n_rows)
+            chunk = np.ascontiguousarray(array[start:end], dtype=dtype)
+            
+            if compression == 'none':
+                filename = f"chunk_{chunk_id:05d}.npy"
+                np.save(array_dir / filename, chunk)
+            else:
+                filename = f"chunk_{chunk_id:05d}.{compression}"
+                with open(array_dir / filename, 'wb') as f:
+                    f.write(_compress(chunk.tobytes(), compression, level))
+            
+            chunks.append({'file': filename, 'start': start, 'end': end})
+        
+        self.index['arrays'][name] = {
+            'shape': list(array.shape),
+            'dtype': dtype.str,
+            'chunk_rows': chunk_rows,
+            'compression': compression,
+            'chunks': chunks
+        }
+        self._cache = OrderedDict((k, v) for k, v in self._cache.items() if k[0] != name)
+        self.flush()
+    
+    def flush(self):
+        """Write the chunk index to disk."""
+        with open(self.path / self.INDEX_FILE, 'w') as f:
+            json.dump(self.index, f, indent=2)
+    
+    def read(self, name: str, start: int = 0, end: Optional[int] = None) -> np.ndarray:
+        """
+        Read a contiguous range of rows, touching only the overlapping chunks.
+        
+        Args:
+            name: Array name
+            start: First row
+            end: End row (exclusive, default: all rows)
+        
+        Returns:
+            Array of rows [start, end)
+        """
+        info = self.index['arrays'][name]
+        n_rows = info['shape'][0]
+        end = n_rows if end is None else min(end, n_rows)
+        chunk_rows = info['chunk_rows']
+        
+        if start >= end:
+            return np.empty([0] + info['shape'][1:], dtype=np.dtype(info['dtype']))
+        
+        parts = []
+        for chunk_id in range(start // chunk_rows, (end - 1) // chunk_rows + 1):
+            chunk = self._load_chunk(name, chunk_id)
+            offset = chunk_id * chunk_rows
+            parts.append(chunk[max(start - offset, 0):min(end - offset, len(chunk))])
+        
+        return parts[0] if len(parts) == 1 else np.concatenate(parts, axis=0)
+    
+    def take(self, name: str, indices: Sequence[int]) -> np.ndarray:
+        """
+        Read arbitrary rows, decoding each needed chunk once.
+        
+        Args:
+            name: Array name
+            indices: Row indices
+        
+        Returns:
+            Array of the requested rows, in request order
+        """
+        info = self.index['arrays'][name]
+        indices = np.asarray(indices, dtype=np.int64)
+        chunk_rows = info['chunk_rows']
+        
+        result = np.empty([len(indices)] + info['shape'][1:], dtype=np.dtype(info['dtype']))
+        chunk_ids = indices // chunk_rows
+        
+        for chunk_id in np.unique(chunk_ids):
+            positions = np.flatnonzero(chunk_ids == chunk_id)
+            chunk = self._load_chunk(name, int(chunk_id))
+            result[positions] = chunk[indices[positions] - chunk_id * chunk_rows]
+        
+        return result
+    
+    def _load_chunk(self, name: str, chunk_id: int) -> np.ndarray:
+        """Load (and cache) one decoded chunk."""
+        key = (name, chunk_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        info = self.index['arrays'][name]
+        meta = info['chunks'][chunk_id]
+        filepath = self.path / name / meta['file']
+        
+        if info['compression'] == 'none':
+            chunk = np.load(filepath, mmap_mode='r')
+        else:
+            with open(filepath, 'rb') as f:
+                raw = _decompress(f.read(), info['compression'])
+            shape = [meta['end'] - meta['start']] + info['shape'][1:]
+            chunk = np.frombuffer(raw, dtype=np.dtype(info['dtype'])).reshape(shape)
+        
+        self._cache[key] = chunk
+        if len(self._cache) > self.cache_chunks:
+            self._cache.popitem(last=False)
+        
+        return chunk
+    
+    def nbytes(self, name: Optional[str] = None) -> int:
+        """On-disk size of one array (or the whole store) in bytes."""
+        names = [name] if name else list(self.index['arrays'])
+        return sum(
+            (self.path / n / chunk['file']).stat().st_size
+            for n in names for chunk in self.index['arrays'][n]['chunks']
+        )
+
+def encode_road_ids(road_ids: List, node_mapping: Optional[Dict[str, int]] = None
+                    ) -> Tuple[np.ndarray, List[str]]:
+    """
+    Encode per-sample road ids as int32 node indices.
+    
+    Args:
+        road_ids: Road id of every sample
+        node_mapping: Optional graph node mapping (road_id -> node index); if not
+            given, indices refer to a sorted vocabulary of the road ids
+    
+    Returns:
+        Tuple of (int32 indices, vocabulary) where unknown roads map to -1 (drop
+        those samples before indexing a node axis) and the vocabulary lists road
+        ids by index
+    """
+    if node_mapping is None:
+        vocabulary = sorted({str(r) for r in road_ids})
+        node_mapping = {road: idx for idx, road in enumerate(vocabulary)}
+    else:
+        vocabulary = [None] * (max(node_mapping.values()) + 1 if node_mapping else 0)
+        for road, idx in node_mapping.items():
+            vocabulary[idx] = str(road)
+    
+    indices = np.fromiter((node_mapping.get(str(r), -1) for r in road_ids),
+                          dtype=np.int32, count=len(road_ids))
+    return indices, vocabulary
+
+if __name__ == "__main__":
+    # Example usage: round-trip a float16, zlib-compressed array
+    import tempfile
+    
+    data = np.random.randn(5000, 12, 10).astype(np.float32)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TensorStore(tmp, mode='w')
+        store.write_array('X_train', data, chunk_rows=512, dtype='float16', compression='zlib')
+        
+        reader = TensorStore(tmp)
+        rows = reader.read('X_train', 1000, 1100)
+        sampled = reader.take('X_train', [4999, 3, 1500])
+        
+        print(f"Stored {data.nbytes / 1e6:.1f} MB in {reader.nbytes() / 1e6:.1f} MB")
+        print(f"Range read: {rows.shape}, random read: {sampled.shape}")
+        print(f"Max abs error: {np.abs(rows.astype(np.float32) - data[1000:1100]).max():.4f}")
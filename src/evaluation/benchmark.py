@@ -0,0 +1,949 @@
+"""
+Performance benchmarks for GNN traffic prediction models.
+Measures training throughput and numerical parity across execution modes
+(fp32 vs mixed precision, eager vs compiled) on synthetic sample data, and
+fit/predict cost and accuracy of the baseline models.
+"""
+
+import torch
+import torch.nn as nn
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import argparse
+import glob
+import json
+import tempfile
+import time
+
+# Local imports
+try:
+    from models import create_model, compile_model, explain_graph_breaks, GraphConvolution
+    from models.rollout import horizon_steps, rollout
+except ImportError:
+    print("Warning: Local modules not found. Install required packages first.")
+
+MODEL_TYPES = ['stgcn', 'simple_gcn', 'temporal_gcn', 'sign', 'dcrnn', 'graphwavenet']
+CONFIG_DIR = Path(__file__).resolve().parents[2] / 'configs'
+
+def sample_model_config(model_type: str, num_nodes: int = 50, num_features: int = 8,
+                        hidden_dim: int = 64) -> Dict:
+    """Model configuration used for benchmarks."""
+    return {
+        'model_type': model_type,
+        'num_nodes': num_nodes,
+        'num_features': num_features,
+        'input_dim': num_features,
+        'hidden_dim': hidden_dim,
+        'hidden_dims': [hidden_dim, hidden_dim],
+        'output_dim': 1,
+        'sequence_length': 12,
+        'prediction_horizon': 6,
+        'num_layers': 2,
+        'num_hops': 2,
+        'dropout': 0.0
+    }
+
+def sample_adjacency(num_nodes: int, rng: np.random.Generator) -> np.ndarray:
+    """Row-normalized ring road graph with random shortcuts and self-loops."""
+    adj = np.eye(num_nodes)
+    idx = np.arange(num_nodes)
+    adj[idx, (idx + 1) % num_nodes] = adj[(idx + 1) % num_nodes, idx] = 1.0
+    shortcuts = rng.integers(num_nodes, size=(num_nodes // 5, 2))
+    adj[shortcuts[:, 0], shortcuts[:, 1]] = adj[shortcuts[:, 1], shortcuts[:, 0]] = 1.0
+    return adj / adj.sum(axis=1, keepdims=True)
+
+def make_sample_series(config: Dict, num_steps: int,
+                       seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Create a synthetic traffic-like series of 5-minute steps.
+    
+    Node speeds follow a daily sinusoid with a per-node phase, diffused over a
+    ring road graph with random shortcuts.
+    
+    Args:
+        config: Model configuration (num_nodes, num_features)
+        num_steps: Number of time steps
+        seed: Random seed
+    
+    Returns:
+        Tuple of (features [steps, N, F], speed [steps, N], normalized adjacency [N, N])
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = config['num_nodes']
+    num_features = config['num_features']
+    
+    adj = sample_adjacency(num_nodes, rng)
+    
+    t = np.arange(num_steps)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, num_nodes)[None, :]
+    speed = np.sin(2 * np.pi * t / 288 + phase) + 0.1 * rng.standard_normal((num_steps, num_nodes))
+    speed = speed @ adj.T
+    
+    # Features: speed plus noisy correlated channels
+    features = np.repeat(speed[:, :, None], num_features, axis=2)
+    features[:, :, 1:] += 0.5 * rng.standard_normal((num_steps, num_nodes, num_features - 1))
+    
+    return features, speed, adj
+
+def make_sample_data(config: Dict, num_samples: int = 256,
+                     seed: int = 0) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Create synthetic traffic-like sample windows (see `make_sample_series`).
+    
+    Args:
+        config: Model configuration (num_nodes, num_features, sequence_length,
+            prediction_horizon)
+        num_samples: Number of windows
+        seed: Random seed
+    
+    Returns:
+        Tuple of (inputs [S, T, N, F], targets [S, H, N, 1], normalized adjacency [N, N])
+    """
+    seq_len, horizon = config['sequence_length'], config['prediction_horizon']
+    features, speed, adj = make_sample_series(config, num_samples + seq_len + horizon, seed)
+    
+    windows = np.arange(num_samples)[:, None]
+    x = features[windows + np.arange(seq_len)]
+    y = speed[windows + np.arange(seq_len, seq_len + horizon)][..., None]
+    
+    return (torch.tensor(x, dtype=torch.float32), torch.tensor(y, dtype=torch.float32),
+            torch.tensor(adj, dtype=torch.float32))
+
+def model_inputs(model_type: str, config: Dict, x: torch.Tensor, y: torch.Tensor,
+                 adj: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Adapt sample windows to the input/target layout of a model type."""
+    if model_type == 'simple_gcn':
+        # Single snapshot: last input step -> first target step
+        return x[:, -1], y[:, 0]
+    
+    if model_type == 'sign':
+        # Precomputed propagated features A^k X concatenated on the feature axis
+        hops = [x]
+        for _ in range(config.get('num_hops', 2)):
+            hops.append(torch.einsum('ij,stjf->stif', adj, hops[-1]))
+        return torch.cat(hops, dim=-1), y
+    
+    return x, y
+
+def train_steps(model: nn.Module, x: torch.Tensor, y: torch.Tensor, adj: torch.Tensor,
+                num_steps: int = 20, batch_size: int = 32, device: str = 'cpu',
+                amp_dtype: Optional[torch.dtype] = None, warmup: int = 2) -> Dict:
+    """
+    Train a model for a fixed number of steps and time it.
+    
+    Args:
+        model: Model to train
+        x: Inputs
+        y: Targets
+        adj: Adjacency matrix
+        num_steps: Timed optimizer steps
+        batch_size: Batch size
+        device: Device
+        amp_dtype: Autocast dtype (None for fp32)
+        warmup: Untimed warm-up steps
+    
+    Returns:
+        Dictionary with throughput (samples/s), step time and loss curve
+    """
+    device = torch.device(device)
+    model = model.to(device).train()
+    x, y, adj = x.to(device), y.to(device), adj.to(device)
+    
+    optimizer = torch.optim.Adam(model.parameters(), lr=1e-3)
+    criterion = nn.MSELoss()
+    scaler = torch.amp.GradScaler(device.type, enabled=amp_dtype == torch.float16)
+    
+    losses = []
+    elapsed = 0.0
+    for step in range(warmup + num_steps):
+        start = (step * batch_size) % max(len(x) - batch_size + 1, 1)
+        xb, yb = x[start:start + batch_size], y[start:start + batch_size]
+        
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+        step_start = time.perf_counter()
+        
+        optimizer.zero_grad()
+        with torch.autocast(device.type, dtype=amp_dtype or torch.float32,
+                            enabled=amp_dtype is not None):
+            predictions = model(xb, adj)
+        loss = criterion(predictions.float(), yb)
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
+        
+        if device.type == 'cuda':
+            torch.cuda.synchronize()
+        
+        if step >= warmup:
+            elapsed += time.perf_counter() - step_start
+            losses.append(loss.item())
+    
+    return {
+        'throughput': num_steps * batch_size / elapsed if elapsed > 0 else 0.0,
+        'step_time_ms': 1000 * elapsed / max(num_steps, 1),
+        'losses': losses,
+        'final_loss': float(np.mean(losses[-5:])) if losses else float('nan')
+    }
+
+def autocast_parity(model: nn.Module, x: torch.Tensor, adj: torch.Tensor,
+                    amp_dtype: torch.dtype, device: str = 'cpu') -> Dict:
+    """
+    Check that a model runs under autocast and stays close to fp32.
+    
+    Returns:
+        Dictionary with output dtype, max relative error vs fp32 and whether all
+        gradients are finite
+    """
+    device = torch.device(device)
+    model = model.to(device).eval()
+    x, adj = x.to(device), adj.to(device)
+    
+    with torch.no_grad():
+        reference = model(x, adj)
+    
+    model.zero_grad()
+    with torch.autocast(device.type, dtype=amp_dtype):
+        output = model(x, adj)
+    output.float().pow(2).mean().backward()
+    
+    grads_finite = all(
+        bool(torch.isfinite(p.grad).all()) for p in model.parameters() if p.grad is not None
+    )
+    rel_error = (output.detach().float() - reference).abs().max() / reference.abs().max().clamp_min(1e-12)
+    
+    return {
+        'output_dtype': str(output.dtype),
+        'max_rel_error': float(rel_error),
+        'grads_finite': grads_finite
+    }
+
+def benchmark_precision(model_type: str, config: Dict, num_steps: int = 20,
+                        batch_size: int = 32, device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Compare fp32 and mixed-precision training for one model type.
+    
+    Every mode starts from the same initialization and trains on the same
+    batches, so loss curves are directly comparable.
+    
+    Returns:
+        Dictionary keyed by precision with throughput, loss and parity results
+    """
+    x, y, adj = make_sample_data(config, num_samples=max(4 * batch_size, 128), seed=seed)
+    x, y = model_inputs(model_type, config, x, y, adj)
+    
+    if torch.device(device).type == 'cuda':
+        precisions = {'fp32': None, 'fp16': torch.float16, 'bf16': torch.bfloat16}
+    else:
+        precisions = {'fp32': None, 'bf16': torch.bfloat16}
+    
+    torch.manual_seed(seed)
+    init_state = create_model(model_type, config).state_dict()
+    
+    results = {}
+    for name, amp_dtype in precisions.items():
+        model = create_model(model_type, config)
+        model.load_state_dict(init_state)
+        results[name] = train_steps(model, x, y, adj, num_steps, batch_size, device, amp_dtype)
+        
+        if amp_dtype is not None:
+            model.load_state_dict(init_state)
+            results[name].update(autocast_parity(model, x[:batch_size], adj, amp_dtype, device))
+            results[name]['speedup'] = results[name]['throughput'] / results['fp32']['throughput']
+            results[name]['loss_gap'] = results[name]['final_loss'] - results['fp32']['final_loss']
+    
+    return results
+
+def print_precision_report(model_type: str, results: Dict):
+    """Print a precision comparison table."""
+    print(f"\n{model_type}:")
+    print(f"  {'mode':<6} {'samples/s':>10} {'speedup':>8} {'final loss':>11} {'loss gap':>9} {'rel err':>8}")
+    for name, r in results.items():
+        print(
+            f"  {name:<6} {r['throughput']:>10.1f} {r.get('speedup', 1.0):>8.2f} "
+            f"{r['final_loss']:>11.5f} {r.get('loss_gap', 0.0):>9.5f} "
+            f"{r.get('max_rel_error', 0.0):>8.4f}"
+            + ('' if r.get('grads_finite', True) else '  NON-FINITE GRADS')
+        )
+
+def load_experiment_configs(pattern: str = str(CONFIG_DIR / '*.json')) -> Dict[str, Tuple[str, Dict]]:
+    """
+    Load experiment configs as flat model configs.
+    
+    The 'data' and 'model' sections are merged; `num_features` and `input_dim`
+    are filled from each other, since the configs only set the one their model
+    type reads.
+    
+    Returns:
+        Dictionary {config name: (model type, model config)}
+    """
+    configs = {}
+    for path in sorted(Path(p) for p in glob.glob(pattern)):
+        with open(path, 'r') as f:
+            experiment = json.load(f)
+        
+        config = {'output_dim': 1, **experiment.get('data', {}), **experiment.get('model', {})}
+        num_features = config.get('num_features', config.get('input_dim'))
+        config.setdefault('num_features', num_features)
+        config.setdefault('input_dim', num_features)
+        configs[path.stem] = (experiment['model_type'], config)
+    
+    return configs
+
+def benchmark_compile(model_type: str, config: Dict, num_steps: int = 20,
+                      batch_size: int = 32, device: str = 'cpu', mode: str = 'compile',
+                      seed: int = 0) -> Dict:
+    """
+    Compare eager and compiled training step time for one model config.
+    
+    Both runs start from the same initialization and train on the same batches.
+    Compilation time is the warm-up forward pass in `compile_model`; the
+    backward graph is compiled during the untimed warm-up steps.
+    
+    Returns:
+        Dictionary with eager and compiled results, compile time, speedup,
+        eval-mode output difference and graph-break diagnostics
+    """
+    x, y, adj = make_sample_data(config, num_samples=max(4 * batch_size, 128), seed=seed)
+    x, y = model_inputs(model_type, config, x, y, adj)
+    config = {**config, 'compile': None}
+    
+    torch.manual_seed(seed)
+    eager = create_model(model_type, config)
+    init_state = eager.state_dict()
+    diagnostics = explain_graph_breaks(eager, (x[:batch_size], adj))
+    results = {'eager': train_steps(eager, x, y, adj, num_steps, batch_size, device)}
+    
+    model = create_model(model_type, config)
+    model.load_state_dict(init_state)
+    model.to(device).train()
+    sample = (x[:batch_size].to(device), adj.to(device))
+    
+    compile_start = time.perf_counter()
+    compiled = compile_model(model, mode, example_inputs=sample)
+    compile_time = time.perf_counter() - compile_start
+    
+    results['compiled'] = train_steps(compiled, x, y, adj, num_steps, batch_size, device)
+    
+    # Compiled vs eager forward on the same (trained) weights
+    model.eval()
+    compiled.eval()
+    with torch.no_grad():
+        max_abs_diff = (compiled(*sample) - model(*sample)).abs().max()
+    
+    results.update({
+        'compiled_as': type(compiled).__name__,
+        'compile_time_s': compile_time,
+        'speedup': results['eager']['step_time_ms'] / results['compiled']['step_time_ms'],
+        'max_abs_diff': float(max_abs_diff),
+        **diagnostics
+    })
+    return results
+
+def print_compile_report(name: str, results: Dict):
+    """Print an eager vs compiled comparison."""
+    print(f"\n{name} ({results['compiled_as']}):")
+    print(f"  eager     {results['eager']['step_time_ms']:>8.2f} ms/step")
+    print(f"  compiled  {results['compiled']['step_time_ms']:>8.2f} ms/step  "
+          f"speedup {results['speedup']:.2f}x  compile {results['compile_time_s']:.1f}s  "
+          f"max diff {results['max_abs_diff']:.2e}")
+    print(f"  graphs {results['graph_count']}, graph breaks {results['graph_break_count']}")
+    for reason in results['break_reasons']:
+        print(f"    - {reason}")
+
+def time_forward_backward(fn, num_steps: int = 20, warmup: int = 2,
+                          device: str = 'cpu') -> float:
+    """Mean forward + backward time (ms) of a function returning a tensor."""
+    cuda = torch.device(device).type == 'cuda'
+    elapsed = 0.0
+    for step in range(warmup + num_steps):
+        if cuda:
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        fn().pow(2).mean().backward()
+        if cuda:
+            torch.cuda.synchronize()
+        if step >= warmup:
+            elapsed += time.perf_counter() - start
+    return 1000 * elapsed / max(num_steps, 1)
+
+def benchmark_temporal_gcn(config: Dict, num_steps: int = 20, batch_size: int = 32,
+                           device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Micro-benchmark the TemporalGCN spatial pass and temporal heads.
+    
+    Times forward + backward of the spatial pass as a per-time-step loop
+    (one SimpleGCN call per step) against one call over [B*T, N, F], then
+    the full model with each temporal head.
+    
+    Returns:
+        Dictionary with step times (ms) and the batched-vs-loop speedup
+    """
+    x, _, adj = make_sample_data(config, num_samples=batch_size, seed=seed)
+    x, adj = x.to(device), adj.to(device)
+    batch_size, seq_len, num_nodes, num_features = x.size()
+    
+    torch.manual_seed(seed)
+    model = create_model('temporal_gcn', {**config, 'compile': None}).to(device).train()
+    
+    results = {
+        'spatial_loop_ms': time_forward_backward(
+            lambda: torch.stack([model.gcn(x[:, t], adj) for t in range(seq_len)], dim=1),
+            num_steps, device=device
+        ),
+        'spatial_batched_ms': time_forward_backward(
+            lambda: model.gcn(x.reshape(batch_size * seq_len, num_nodes, num_features), adj),
+            num_steps, device=device
+        )
+    }
+    results['spatial_speedup'] = results['spatial_loop_ms'] / results['spatial_batched_ms']
+    
+    for head in ['lstm', 'gru', 'conv']:
+        torch.manual_seed(seed)
+        model = create_model('temporal_gcn', {**config, 'temporal_head': head}).to(device).train()
+        results[f'{head}_model_ms'] = time_forward_backward(lambda: model(x, adj), num_steps,
+                                                            device=device)
+    
+    return results
+
+def print_temporal_report(results: Dict):
+    """Print TemporalGCN micro-benchmark results."""
+    print("\ntemporal_gcn (forward + backward):")
+    print(f"  spatial, per-step loop  {results['spatial_loop_ms']:>8.2f} ms")
+    print(f"  spatial, batched        {results['spatial_batched_ms']:>8.2f} ms  "
+          f"({results['spatial_speedup']:.2f}x)")
+    for head in ['lstm', 'gru', 'conv']:
+        print(f"  model, {head} head{'':<{12 - len(head)}}{results[f'{head}_model_ms']:>8.2f} ms")
+
+def benchmark_sparse(num_nodes: int, num_steps: int = 20, batch_size: int = 32,
+                     hidden_dim: int = 64, sequence_length: int = 12,
+                     device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Compare dense, CSR (SpMM) and COO (scatter) graph convolution.
+    
+    Times forward + backward of one GraphConvolution over [B*T, N, hidden]
+    features, the layout used inside STGCN blocks.
+    
+    Returns:
+        Dictionary with step time (ms) per adjacency layout, speedups over dense
+        and the max output difference to dense
+    """
+    rng = np.random.default_rng(seed)
+    dense = torch.tensor(sample_adjacency(num_nodes, rng), dtype=torch.float32, device=device)
+    layouts = {
+        'dense': dense,
+        'csr': dense.to_sparse_csr(),
+        'coo': dense.to_sparse_coo().coalesce()
+    }
+    
+    torch.manual_seed(seed)
+    layer = GraphConvolution(hidden_dim, hidden_dim).to(device)
+    x = torch.randn(batch_size * sequence_length, num_nodes, hidden_dim, device=device)
+    
+    with torch.no_grad():
+        reference = layer(x, dense)
+    
+    results = {'num_nodes': num_nodes, 'avg_degree': float((dense > 0).sum()) / num_nodes}
+    for name, adj in layouts.items():
+        results[f'{name}_ms'] = time_forward_backward(lambda: layer(x, adj), num_steps, device=device)
+        with torch.no_grad():
+            results[f'{name}_max_diff'] = float((layer(x, adj) - reference).abs().max())
+        results[f'{name}_speedup'] = results['dense_ms'] / results[f'{name}_ms']
+    
+    return results
+
+def print_sparse_report(results: Dict):
+    """Print a dense vs sparse graph convolution comparison."""
+    print(f"\n{results['num_nodes']} nodes (avg degree {results['avg_degree']:.1f}), forward + backward:")
+    for name in ['dense', 'csr', 'coo']:
+        print(f"  {name:<6} {results[f'{name}_ms']:>9.2f} ms  {results[f'{name}_speedup']:>6.2f}x  "
+              f"max diff {results[f'{name}_max_diff']:.1e}")
+
+def benchmark_baselines(config: Dict, num_days: int = 14, train_fraction: float = 0.7,
+                        num_steps: int = 200, batch_size: int = 32,
+                        device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Fit and evaluate the baseline models on a synthetic series.
+    
+    The series is split chronologically; historical average and seasonal
+    naive are fitted on the series, ridge in closed form on the training
+    windows and the shared LSTM with `num_steps` Adam steps.
+    
+    Returns:
+        Dictionary per baseline with fit time (s), predict time over the test
+        windows (ms), and test MAE / RMSE
+    """
+    seq_len, horizon = config['sequence_length'], config['prediction_horizon']
+    features, speed, _ = make_sample_series(config, num_days * 288, seed)
+    timestamps = np.datetime64('2024-01-01') + np.arange(len(speed)) * np.timedelta64(5, 'm')
+    
+    features = torch.tensor(features, dtype=torch.float32, device=device)
+    series = torch.tensor(speed, dtype=torch.float32, device=device).unsqueeze(-1)
+    
+    # Windows whose targets lie entirely in the training / test part
+    split = int(train_fraction * len(series))
+    starts = torch.arange(len(series) - seq_len - horizon + 1, device=device)
+    target_steps = starts[:, None] + seq_len + torch.arange(horizon, device=device)
+    train, test = target_steps[:, -1] < split, starts + seq_len >= split
+    
+    x = features[starts[:, None] + torch.arange(seq_len, device=device)]
+    y = series[target_steps]
+    
+    def sync():
+        if torch.device(device).type == 'cuda':
+            torch.cuda.synchronize()
+    
+    def fit_lstm(model):
+        optimizer = torch.optim.Adam(model.parameters(), lr=1e-2)
+        generator = torch.Generator(device='cpu').manual_seed(seed)
+        x_train, y_train = x[train], y[train]
+        for _ in range(num_steps):
+            idx = torch.randint(len(x_train), (batch_size,), generator=generator).to(device)
+            optimizer.zero_grad()
+            nn.functional.mse_loss(model(x_train[idx]), y_train[idx]).backward()
+            optimizer.step()
+        model.eval()
+    
+    fits = {
+        'historical_average': lambda model: model.fit(series, timestamps, fit_steps=split),
+        'seasonal_naive': lambda model: model.fit(series),
+        'ridge': lambda model: model.fit(x[train], y[train]),
+        'lstm': fit_lstm
+    }
+    
+    results = {}
+    for name, fit in fits.items():
+        torch.manual_seed(seed)
+        model = create_model(name, {**config, 'num_layers': 1}).to(device)
+        
+        sync()
+        start = time.perf_counter()
+        fit(model)
+        sync()
+        fit_time = time.perf_counter() - start
+        
+        with torch.no_grad():
+            start = time.perf_counter()
+            if name in ('historical_average', 'seasonal_naive'):
+                predictions = model(x[test], None, target_steps=target_steps[test])
+            else:
+                predictions = model(x[test])
+            sync()
+            predict_time = time.perf_counter() - start
+        
+        errors = predictions - y[test]
+        results[name] = {
+            'fit_time_s': fit_time,
+            'predict_time_ms': 1000 * predict_time,
+            'mae': float(errors.abs().mean()),
+            'rmse': float(errors.pow(2).mean().sqrt())
+        }
+    
+    results['num_test_windows'] = int(test.sum())
+    return results
+
+def print_baseline_report(results: Dict):
+    """Print baseline fit/predict times and test errors."""
+    print(f"\nBaselines ({results['num_test_windows']} test windows):")
+    for name, r in results.items():
+        if name == 'num_test_windows':
+            continue
+        print(f"  {name:<19} fit {r['fit_time_s']:>8.3f} s  predict {r['predict_time_ms']:>8.2f} ms  "
+              f"MAE {r['mae']:.4f}  RMSE {r['rmse']:.4f}")
+
+def peak_memory_mb(model: nn.Module, x: torch.Tensor, adj: torch.Tensor,
+                   device: str = 'cpu') -> float:
+    """
+    Memory of one training forward + backward pass (MB).
+    
+    On CUDA this is the peak allocated memory. On CPU, where there is no
+    allocator peak counter, it is the size of the activations autograd saves
+    for the backward pass, which dominates training memory.
+    """
+    device = torch.device(device)
+    model = model.to(device).train()
+    x, adj = x.to(device), adj.to(device)
+    
+    if device.type == 'cuda':
+        torch.cuda.synchronize()
+        torch.cuda.reset_peak_memory_stats()
+        baseline = torch.cuda.memory_allocated()
+        model(x, adj).pow(2).mean().backward()
+        torch.cuda.synchronize()
+        peak = torch.cuda.max_memory_allocated() - baseline
+    else:
+        storages = {}
+        
+        def pack(tensor):
+            storage = tensor.untyped_storage()
+            storages[storage.data_ptr()] = storage.nbytes()
+            return tensor
+        
+        # Parameters are saved too but are not activations
+        params = {p.untyped_storage().data_ptr() for p in model.parameters()}
+        with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+            output = model(x, adj)
+        output.pow(2).mean().backward()
+        peak = sum(size for ptr, size in storages.items() if ptr not in params)
+    
+    model.zero_grad()
+    return peak / 2 ** 20
+
+def benchmark_stgcn_blocks(config: Dict, num_steps: int = 50, batch_size: int = 32,
+                           device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Compare the standard and fused ST-GCN blocks.
+    
+    Both models train for the same steps on the same batches; accuracy is the
+    MSE on held-out windows, so memory and step time are compared at matched
+    training budgets.
+    
+    Returns:
+        Dictionary per block type with training memory (MB), step time (ms),
+        final training loss, held-out MSE and parameter count
+    """
+    x, y, adj = make_sample_data(config, num_samples=8 * batch_size, seed=seed)
+    split = 6 * batch_size
+    
+    results = {}
+    for block in ['standard', 'fused']:
+        torch.manual_seed(seed)
+        model = create_model('stgcn', {**config, 'stgcn_block': block, 'compile': None})
+        
+        memory = peak_memory_mb(model, x[:batch_size], adj, device)
+        trained = train_steps(model, x[:split], y[:split], adj, num_steps, batch_size, device)
+        
+        model.eval()
+        with torch.no_grad():
+            predictions = model(x[split:].to(device), adj.to(device))
+        
+        results[block] = {
+            'memory_mb': memory,
+            'step_time_ms': trained['step_time_ms'],
+            'final_loss': trained['final_loss'],
+            'eval_mse': float((predictions.cpu() - y[split:]).pow(2).mean()),
+            'num_params': sum(p.numel() for p in model.parameters())
+        }
+    
+    for key in ['memory_mb', 'step_time_ms']:
+        results[f'{key}_ratio'] = results['fused'][key] / results['standard'][key]
+    
+    return results
+
+def print_block_report(results: Dict):
+    """Print a standard vs fused ST-GCN block comparison."""
+    print("\nstgcn blocks (training):")
+    for block in ['standard', 'fused']:
+        r = results[block]
+        print(f"  {block:<9} memory {r['memory_mb']:>8.1f} MB  step {r['step_time_ms']:>8.2f} ms  "
+              f"train loss {r['final_loss']:.5f}  eval MSE {r['eval_mse']:.5f}  params {r['num_params']}")
+    print(f"  fused / standard: memory {results['memory_mb_ratio']:.2f}x, "
+          f"step time {results['step_time_ms_ratio']:.2f}x")
+
+def largest_block_memory_mb(model: nn.Module, blocks: List[nn.Module], x: torch.Tensor,
+                            adj: torch.Tensor, device: str = 'cpu') -> float:
+    """Largest activation memory (MB) saved inside any one of the given submodules."""
+    device = torch.device(device)
+    model = model.to(device).train()
+    x, adj = x.to(device), adj.to(device)
+    
+    current = [None]
+    per_block = {i: {} for i in range(len(blocks))}
+    hooks = []
+    for i, block in enumerate(blocks):
+        hooks.append(block.register_forward_pre_hook(lambda module, args, i=i: current.__setitem__(0, i)))
+        hooks.append(block.register_forward_hook(lambda module, args, output: current.__setitem__(0, None)))
+    
+    def pack(tensor):
+        if current[0] is not None:
+            storage = tensor.untyped_storage()
+            per_block[current[0]][storage.data_ptr()] = storage.nbytes()
+        return tensor
+    
+    params = {p.untyped_storage().data_ptr() for p in model.parameters()}
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+        model(x, adj)
+    for hook in hooks:
+        hook.remove()
+    
+    return max(
+        sum(size for ptr, size in saved.items() if ptr not in params) for saved in per_block.values()
+    ) / 2 ** 20
+
+def checkpoint_blocks(model: nn.Module) -> List[nn.Module]:
+    """Submodules that gradient checkpointing recomputes one at a time."""
+    if hasattr(model, 'blocks'):
+        return list(model.blocks)
+    temporal = [m for m in (model.lstm, model.gru, model.temporal_conv) if m is not None]
+    return list(model.gcn.layers) + temporal
+
+def benchmark_checkpointing(model_type: str, config: Dict, num_steps: int = 10,
+                            batch_size: int = 32, memory_budget_mb: float = 1024.0,
+                            device: str = 'cpu', seed: int = 0) -> Dict:
+    """
+    Measure training memory and step time with and without gradient checkpointing.
+    
+    Memory is measured at `batch_size` and scaled linearly to the largest batch
+    that fits `memory_budget_mb`. On CPU (saved activations, see
+    `peak_memory_mb`) the checkpointed figure adds the activations of the
+    largest block, which are recomputed and held during its backward pass.
+    
+    Returns:
+        Dictionary per mode with memory (MB), memory per sample, max batch size
+        within the budget and step time (ms), plus the max difference of the
+        buffers (BatchNorm running statistics) after training with and without
+        checkpointing, which should be 0
+    """
+    x, y, adj = make_sample_data(config, num_samples=2 * batch_size, seed=seed)
+    
+    results = {'memory_budget_mb': memory_budget_mb}
+    for mode, enabled in [('baseline', False), ('checkpointed', True)]:
+        torch.manual_seed(seed)
+        model = create_model(model_type, {**config, 'gradient_checkpointing': enabled, 'compile': None})
+        
+        memory = peak_memory_mb(model, x[:batch_size], adj, device)
+        if enabled and torch.device(device).type != 'cuda':
+            model.gradient_checkpointing = False
+            memory += largest_block_memory_mb(model, checkpoint_blocks(model), x[:batch_size], adj, device)
+            model.gradient_checkpointing = True
+        
+        per_sample = memory / batch_size
+        trained = train_steps(model, x, y, adj, num_steps, batch_size, device)
+        
+        results[mode] = {
+            'memory_mb': memory,
+            'memory_per_sample_mb': per_sample,
+            'max_batch_size': int(memory_budget_mb // per_sample),
+            'step_time_ms': trained['step_time_ms']
+        }
+    
+    # Same training run with and without checkpointing; the backward-pass
+    # recompute must not update buffers a second time
+    buffers = []
+    for enabled in [False, True]:
+        torch.manual_seed(seed)
+        model = create_model(model_type, {**config, 'gradient_checkpointing': enabled, 'compile': None})
+        train_steps(model, x, y, adj, num_steps, batch_size, device)
+        buffers.append([b.float().cpu() for b in model.buffers()])
+    results['buffer_max_abs_diff'] = max(
+        [float((a - b).abs().max()) for a, b in zip(*buffers)] or [0.0]
+    )
+    
+    results['memory_ratio'] = results['checkpointed']['memory_mb'] / results['baseline']['memory_mb']
+    results['step_time_ratio'] = results['checkpointed']['step_time_ms'] / results['baseline']['step_time_ms']
+    
+    return results
+
+def print_checkpoint_report(name: str, results: Dict):
+    """Print a gradient checkpointing memory profile."""
+    print(f"\n{name} (budget {results['memory_budget_mb']:.0f} MB):")
+    for mode in ['baseline', 'checkpointed']:
+        r = results[mode]
+        print(f"  {mode:<13} memory {r['memory_mb']:>8.1f} MB  ({r['memory_per_sample_mb']:.2f} MB/sample)  "
+              f"max batch {r['max_batch_size']:>6}  step {r['step_time_ms']:>8.2f} ms")
+    print(f"  checkpointed / baseline: memory {results['memory_ratio']:.2f}x, "
+          f"step time {results['step_time_ratio']:.2f}x, "
+          f"buffer diff {results['buffer_max_abs_diff']:.2e}")
+
+def time_forward(fn, num_steps: int = 20, warmup: int = 3) -> float:
+    """Mean time (ms) of an inference call."""
+    for _ in range(warmup):
+        fn()
+    start = time.perf_counter()
+    for _ in range(num_steps):
+        fn()
+    return 1000 * (time.perf_counter() - start) / max(num_steps, 1)
+
+def benchmark_onnx(model_type: str, config: Dict, num_steps: int = 20,
+                   batch_sizes: Tuple[int, ...] = (1, 32), seed: int = 0) -> Dict:
+    """
+    Compare eager PyTorch and ONNX Runtime CPU inference latency.
+    
+    The model is exported once with dynamic batch and node axes and both
+    backends run on the same inputs from the sample graph.
+    
+    Returns:
+        Dictionary per batch size with eager and ONNX Runtime latency (ms per
+        call), speedup and max output difference
+    """
+    from onnx_export import OnnxRuntimeModel, export_onnx
+    
+    x, _, adj = make_sample_data(config, num_samples=max(batch_sizes), seed=seed)
+    
+    torch.manual_seed(seed)
+    model = create_model(model_type, {**config, 'compile': None}).eval()
+    
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        onnx_model = OnnxRuntimeModel(export_onnx(model, config, str(Path(tmp) / f'{model_type}.onnx')))
+        
+        with torch.no_grad():
+            for batch_size in batch_sizes:
+                batch = x[:batch_size]
+                eager_ms = time_forward(lambda: model(batch, adj), num_steps)
+                onnx_ms = time_forward(lambda: onnx_model(batch, adj), num_steps)
+                max_abs_diff = (onnx_model(batch, adj) - model(batch, adj)).abs().max()
+                
+                results[f'batch_{batch_size}'] = {
+                    'eager_ms': eager_ms,
+                    'onnx_ms': onnx_ms,
+                    'speedup': eager_ms / onnx_ms,
+                    'max_abs_diff': float(max_abs_diff)
+                }
+    
+    return results
+
+def print_onnx_report(name: str, results: Dict):
+    """Print an eager vs ONNX Runtime latency comparison."""
+    print(f"\n{name} (CPU inference):")
+    for key, r in results.items():
+        print(f"  {key:<10} eager {r['eager_ms']:>8.2f} ms  onnxruntime {r['onnx_ms']:>8.2f} ms  "
+              f"speedup {r['speedup']:.2f}x  max diff {r['max_abs_diff']:.2e}")
+
+def benchmark_rollout(model_type: str, config: Dict, horizons_min: Tuple[int, ...] = (15, 60, 120),
+                      num_steps: int = 10, batch_size: int = 32, seed: int = 0) -> Dict:
+    """
+    Compare cached-state rollout with re-running the model on its predictions.
+    
+    Returns:
+        Dictionary with per-call costs (full forward, encode, and one advance
+        plus readout, i.e. refreshing the forecast for a new observation) and,
+        per horizon, the latency of both rollouts and their max output difference
+    """
+    x, _, adj = make_sample_data(config, num_samples=batch_size, seed=seed)
+    
+    torch.manual_seed(seed)
+    model = create_model(model_type, {**config, 'compile': None}).eval()
+    
+    with torch.no_grad():
+        state = model.encode(x, adj)
+        results = {
+            'forward_ms': time_forward(lambda: model(x, adj), num_steps),
+            'encode_ms': time_forward(lambda: model.encode(x, adj), num_steps),
+            'update_ms': time_forward(lambda: model.readout(model.advance(x[:, -1], adj, state)), num_steps)
+        }
+    
+    for minutes in horizons_min:
+        steps = horizon_steps(minutes)
+        incremental_ms = time_forward(lambda: rollout(model, x, adj, steps), num_steps)
+        recompute_ms = time_forward(lambda: rollout(model, x, adj, steps, incremental=False), num_steps)
+        max_abs_diff = (rollout(model, x, adj, steps) - rollout(model, x, adj, steps, incremental=False)).abs().max()
+        
+        results[f'{minutes}_min'] = {
+            'steps': steps,
+            'incremental_ms': incremental_ms,
+            'recompute_ms': recompute_ms,
+            'speedup': recompute_ms / incremental_ms,
+            'max_abs_diff': float(max_abs_diff)
+        }
+    
+    return results
+
+def print_rollout_report(name: str, results: Dict):
+    """Print a cached-state vs recompute rollout comparison."""
+    print(f"\n{name} (rollout):")
+    print(f"  forward {results['forward_ms']:.2f} ms  encode {results['encode_ms']:.2f} ms  "
+          f"update {results['update_ms']:.2f} ms/step")
+    for key, r in results.items():
+        if isinstance(r, dict):
+            print(f"  {key:<8} ({r['steps']:>2} steps) incremental {r['incremental_ms']:>8.2f} ms  "
+                  f"recompute {r['recompute_ms']:>8.2f} ms  speedup {r['speedup']:.2f}x  "
+                  f"max diff {r['max_abs_diff']:.2e}")
+
+def main():
+    """Run benchmarks on synthetic sample data."""
+    parser = argparse.ArgumentParser(description='Benchmark GNN traffic models')
+    parser.add_argument('--suite', type=str, default='precision',
+                       choices=['precision', 'compile', 'temporal', 'sparse', 'baselines', 'blocks',
+                                'checkpoint', 'onnx', 'rollout'],
+                       help='Benchmark to run')
+    parser.add_argument('--configs', type=str, default=str(CONFIG_DIR / '*.json'),
+                       help='Experiment configs for the compile suite')
+    parser.add_argument('--compile-mode', type=str, default='compile', choices=['compile', 'script'],
+                       help='Compilation path for the compile suite')
+    parser.add_argument('--models', type=str, nargs='+', default=MODEL_TYPES,
+                       help='Model types to benchmark')
+    parser.add_argument('--num-nodes', type=int, nargs='+', default=[50],
+                       help='Number of graph nodes (several sizes for the sparse suite)')
+    parser.add_argument('--memory-budget', type=float, default=1024.0,
+                       help='Memory budget (MB) for the checkpoint suite')
+    parser.add_argument('--batch-size', type=int, default=32,
+                       help='Batch size')
+    parser.add_argument('--steps', type=int, default=20,
+                       help='Timed training steps')
+    parser.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu',
+                       help='Device')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Optional JSON output path')
+    
+    args = parser.parse_args()
+    
+    report = {}
+    if args.suite == 'compile':
+        for name, (model_type, config) in load_experiment_configs(args.configs).items():
+            results = benchmark_compile(model_type, config, args.steps, args.batch_size,
+                                        args.device, args.compile_mode)
+            print_compile_report(name, results)
+            report[name] = results
+    elif args.suite == 'temporal':
+        config = sample_model_config('temporal_gcn', num_nodes=args.num_nodes[0])
+        report['temporal_gcn'] = benchmark_temporal_gcn(config, args.steps, args.batch_size, args.device)
+        print_temporal_report(report['temporal_gcn'])
+    elif args.suite == 'sparse':
+        for num_nodes in args.num_nodes:
+            report[f'{num_nodes}_nodes'] = benchmark_sparse(num_nodes, args.steps, args.batch_size,
+                                                            device=args.device)
+            print_sparse_report(report[f'{num_nodes}_nodes'])
+    elif args.suite == 'baselines':
+        config = sample_model_config('lstm', num_nodes=args.num_nodes[0])
+        report['baselines'] = benchmark_baselines(config, num_steps=args.steps,
+                                                  batch_size=args.batch_size, device=args.device)
+        print_baseline_report(report['baselines'])
+    elif args.suite == 'blocks':
+        config = sample_model_config('stgcn', num_nodes=args.num_nodes[0])
+        report['stgcn_blocks'] = benchmark_stgcn_blocks(config, args.steps, args.batch_size, args.device)
+        print_block_report(report['stgcn_blocks'])
+    elif args.suite == 'checkpoint':
+        for model_type in [m for m in args.models if m in ('stgcn', 'temporal_gcn')]:
+            config = sample_model_config(model_type, num_nodes=args.num_nodes[0])
+            if model_type == 'stgcn':
+                config['num_layers'] = 4
+                config['stgcn_block'] = 'standard'
+            results = benchmark_checkpointing(model_type, config, args.steps, args.batch_size,
+                                              args.memory_budget, args.device)
+            print_checkpoint_report(model_type, results)
+            report[model_type] = results
+    elif args.suite == 'onnx':
+        for model_type in [m for m in args.models if m in ('stgcn', 'temporal_gcn')]:
+            config = sample_model_config(model_type, num_nodes=args.num_nodes[0])
+            results = benchmark_onnx(model_type, config, args.steps, (1, args.batch_size))
+            print_onnx_report(model_type, results)
+            report[model_type] = results
+    elif args.suite == 'rollout':
+        variants = []
+        if 'stgcn' in args.models:
+            variants += [(f'stgcn_{block}', 'stgcn', {'stgcn_block': block}) for block in ['standard', 'fused']]
+        if 'temporal_gcn' in args.models:
+            variants += [(f'temporal_gcn_{head}', 'temporal_gcn', {'temporal_head': head})
+                         for head in ['lstm', 'gru', 'conv']]
+        for name, model_type, overrides in variants:
+            config = {**sample_model_config(model_type, num_nodes=args.num_nodes[0]), **overrides}
+            results = benchmark_rollout(model_type, config, num_steps=args.steps, batch_size=args.batch_size)
+            print_rollout_report(name, results)
+            report[name] = results
+    else:
+        for model_type in args.models:
+            config = sample_model_config(model_type, num_nodes=args.num_nodes[0])
+            results = benchmark_precision(model_type, config, args.steps, args.batch_size, args.device)
+            print_precision_report(model_type, results)
+            report[model_type] = results
+    
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
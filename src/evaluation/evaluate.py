@@ -17,16 +17,17 @@ from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
 # Local imports
 try:
-    from models import create_model
+    from models import create_model, unwrap_model
     from datasets import SpatialTemporalDataset
     from train import TrafficPredictor
+    from graph.sampling import load_csr_adjacency
 except ImportError:
     print("Warning: Local modules not found. Install required packages first.")
 
 class ModelEvaluator:
     """Class for evaluating trained traffic prediction models."""
     
-    def __init__(self, model_path: str, config_path: str, data_dir: str):
+    def __init__(self, model_path: str, config_path: str, data_dir: str, backend: str = 'torch'):
         """
         Initialize evaluator.
         
@@ -34,10 +35,13 @@ class ModelEvaluator:
             model_path: Path to trained model checkpoint
             config_path: Path to model configuration
             data_dir: Path to data directory
+            backend: 'torch' (eager) or 'onnx' (ONNX Runtime on CPU, falls
+                back to eager when unavailable)
         """
         self.model_path = model_path
         self.config_path = config_path
         self.data_dir = data_dir
+        self.backend = backend
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         
         # Load configuration
@@ -49,22 +53,57 @@ class ModelEvaluator:
         self.load_model()
         
         # Load adjacency matrix
-        adj_path = Path(data_dir) / 'adjacency_matrix_normalized.npy'
-        self.adjacency_matrix = torch.FloatTensor(np.load(adj_path)).to(self.device)
+        adjacency = load_csr_adjacency(data_dir)
+        self.adjacency_matrix = torch.FloatTensor(adjacency.toarray()).to(self.device)
         
     def load_model(self):
         """Load the trained model."""
+        if self.backend == 'onnx' and self.load_onnx_model():
+            return
+        
         # Create model
         self.model = create_model(self.config['model_type'], self.config)
         
         # Load checkpoint
         checkpoint = torch.load(self.model_path, map_location=self.device)
-        self.model.load_state_dict(checkpoint['model_state_dict'])
+        unwrap_model(self.model).load_state_dict(checkpoint['model_state_dict'])
         self.model.to(self.device)
         self.model.eval()
         
         print(f"Model loaded from {self.model_path}")
     
+    def load_onnx_model(self) -> bool:
+        """
+        Load the ONNX Runtime model next to the checkpoint (exported on demand).
+        
+        Returns:
+            False (after a warning) when ONNX Runtime or the export is not
+            available for this model, so the eager model is used instead
+        """
+        try:
+            from onnx_export import ONNX_MODEL_TYPES, load_onnx_model
+        except ImportError as e:
+            print(f"Warning: ONNX backend unavailable ({e}); using PyTorch")
+            self.backend = 'torch'
+            return False
+        
+        if self.config['model_type'] not in ONNX_MODEL_TYPES:
+            print(f"Warning: ONNX backend does not support {self.config['model_type']}; using PyTorch")
+            self.backend = 'torch'
+            return False
+        
+        try:
+            self.model = load_onnx_model(self.model_path, self.config)
+        except (ImportError, RuntimeError, OSError) as e:
+            print(f"Warning: ONNX backend unavailable ({e}); using PyTorch")
+            self.backend = 'torch'
+            return False
+        
+        # ONNX Runtime runs on CPU
+        self.device = torch.device('cpu')
+        print(f"ONNX model loaded from {self.model.onnx_path}")
+        return True
+    
     def evaluate_dataset(self, dataset: SpatialTemporalDataset) -> Dict:
         """
         Evaluate model on a dataset.
@@ -377,7 +416,7 @@ class ModelEvaluator:
         
         return evaluation_results
 
-def compare_models(model_paths: List[str], data_dir: str, output_dir: str):
+def compare_models(model_paths: List[str], data_dir: str, output_dir: str, backend: str = 'torch'):
     """
     Compare multiple trained models.
     
@@ -385,6 +424,7 @@ def compare_models(model_paths: List[str], data_dir: str, output_dir: str):
         model_paths: List of paths to model checkpoints
         data_dir: Path to data directory
         output_dir: Directory to save comparison results
+        backend: Inference backend ('torch' or 'onnx')
     """
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
@@ -396,7 +436,7 @@ def compare_models(model_paths: List[str], data_dir: str, output_dir: str):
         config_path = str(Path(model_path).parent / 'config.json')
         
         try:
-            evaluator = ModelEvaluator(model_path, config_path, data_dir)
+            evaluator = ModelEvaluator(model_path, config_path, data_dir, backend)
             test_dataset = SpatialTemporalDataset(data_dir, 'test')
             model_results = evaluator.evaluate_dataset(test_dataset)
             
@@ -430,12 +470,14 @@ def main():
                        help='Output directory for results')
     parser.add_argument('--compare', nargs='+', 
                        help='Compare multiple models (provide multiple paths)')
+    parser.add_argument('--backend', type=str, default='torch', choices=['torch', 'onnx'],
+                       help='Inference backend (onnx: ONNX Runtime on CPU, eager fallback)')
     
     args = parser.parse_args()
     
     if args.compare:
         # Compare multiple models
-        compare_models(args.compare, args.data_dir, args.output_dir)
+        compare_models(args.compare, args.data_dir, args.output_dir, args.backend)
     else:
         # Evaluate single model
         if args.config:
@@ -443,7 +485,7 @@ def main():
         else:
             config_path = str(Path(args.model).parent / 'config.json')
         
-        evaluator = ModelEvaluator(args.model, config_path, args.data_dir)
+        evaluator = ModelEvaluator(args.model, config_path, args.data_dir, args.backend)
         evaluator.run_full_evaluation(args.output_dir)
 
 if __name__ == "__main__":
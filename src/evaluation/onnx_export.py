@@ -0,0 +1,225 @@
+"""
+ONNX export and ONNX Runtime inference for GNN traffic models.
+Exports STGCN/TemporalGCN checkpoints with dynamic batch and node axes and
+runs them with ONNX Runtime's CPU execution provider.
+"""
+
+import torch
+import torch.nn as nn
+import numpy as np
+import json
+import hashlib
+import inspect
+import warnings
+from pathlib import Path
+from typing import Dict, Optional
+import argparse
+
+# Local imports
+try:
+    from models import create_model, example_inputs, unwrap_model
+except ImportError:
+    print("Warning: Local modules not found. Install required packages first.")
+
+# Model types whose forward pass exports with dynamic batch and node axes
+ONNX_MODEL_TYPES = ['stgcn', 'temporal_gcn']
+
+DYNAMIC_AXES = {
+    'x': {0: 'batch', 2: 'num_nodes'},
+    'adj': {0: 'num_nodes', 1: 'num_nodes'},
+    'predictions': {0: 'batch', 2: 'num_nodes'}
+}
+
+# ONNX metadata key holding the hash of the source checkpoint
+CHECKPOINT_HASH_KEY = 'checkpoint_sha256'
+
+def onnx_path_for(model_path: str) -> Path:
+    """ONNX file written next to a checkpoint (final_model.pth -> final_model.onnx)."""
+    return Path(model_path).with_suffix('.onnx')
+
+def checkpoint_hash(model_path: str) -> str:
+    """SHA-256 hex digest of a checkpoint file."""
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def onnx_checkpoint_hash(onnx_path: str) -> Optional[str]:
+    """Checkpoint hash recorded in an ONNX file's metadata, if any."""
+    import onnx
+    
+    # Metadata only: skip external weight files and runtime session setup
+    model = onnx.load(str(onnx_path), load_external_data=False)
+    return next((p.value for p in model.metadata_props if p.key == CHECKPOINT_HASH_KEY), None)
+
+def export_onnx(model: nn.Module, config: Dict, output_path: str, opset: int = 17,
+                source_hash: Optional[str] = None) -> str:
+    """
+    Export a model to ONNX.
+    
+    The graph takes `x` [batch, seq_len, num_nodes, features] and a dense
+    `adj` [num_nodes, num_nodes]; batch and node counts are dynamic, so one
+    file serves any batch size and road network size.
+    
+    Args:
+        model: Trained model
+        config: Model configuration (model_type, shapes)
+        output_path: Destination .onnx file
+        opset: ONNX opset version
+        source_hash: Hash of the source checkpoint, stored in the model
+            metadata so stale exports can be detected
+    
+    Returns:
+        Path of the written file
+    """
+    model_type = config['model_type']
+    if model_type not in ONNX_MODEL_TYPES:
+        raise ValueError(f"ONNX export supports {ONNX_MODEL_TYPES}, got {model_type}")
+    
+    model = unwrap_model(model).cpu().eval()
+    inputs = example_inputs(model_type, config)
+    
+    # TorchScript-based exporter; `dynamo` only exists (and defaults to True
+    # from torch 2.9) on newer releases
+    exporter = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        torch.onnx.export(
+            model, inputs, str(output_path),
+            input_names=['x', 'adj'], output_names=['predictions'],
+            dynamic_axes=DYNAMIC_AXES, opset_version=opset, **exporter
+        )
+    
+    if source_hash is not None:
+        import onnx
+        
+        onnx_model = onnx.load(str(output_path))
+        onnx.helper.set_model_props(onnx_model, {CHECKPOINT_HASH_KEY: source_hash})
+        onnx.save(onnx_model, str(output_path))
+    
+    return str(output_path)
+
+class OnnxRuntimeModel(nn.Module):
+    """
+    ONNX Runtime session behind the model call interface.
+    
+    `model(x, adj)` takes and returns torch tensors, so evaluation code runs
+    unchanged. Inputs are moved to CPU; outputs are returned on CPU.
+    """
+    
+    def __init__(self, onnx_path: str, num_threads: Optional[int] = None):
+        super(OnnxRuntimeModel, self).__init__()
+        
+        import onnxruntime as ort
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads is not None:
+            options.intra_op_num_threads = num_threads
+        
+        self.onnx_path = str(onnx_path)
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=['CPUExecutionProvider'])
+    
+    def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Dense adjacency matrix [num_nodes, num_nodes]
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        if adj.layout != torch.strided:
+            adj = adj.to_dense()
+        
+        outputs = self.session.run(None, {
+            'x': x.detach().cpu().float().numpy(),
+            'adj': adj.detach().cpu().float().numpy()
+        })
+        return torch.from_numpy(outputs[0])
+
+def load_onnx_model(model_path: str, config: Dict, export_missing: bool = True,
+                    num_threads: Optional[int] = None) -> OnnxRuntimeModel:
+    """
+    ONNX Runtime model for a checkpoint, exporting it first if needed.
+    
+    The ONNX file records the SHA-256 of the checkpoint it was exported from;
+    a file without it or with a different hash (the checkpoint was retrained
+    or replaced) is treated as stale and re-exported.
+    
+    Args:
+        model_path: PyTorch checkpoint; the ONNX file lives next to it
+        config: Model configuration
+        export_missing: Export from the checkpoint when the ONNX file is
+            missing or stale
+        num_threads: ONNX Runtime intra-op threads (default: runtime's choice)
+    
+    Returns:
+        OnnxRuntimeModel
+    
+    Raises:
+        ImportError: onnxruntime or onnx is not installed
+        FileNotFoundError: No up-to-date ONNX file and export_missing is False
+    """
+    # Fail before exporting when the runtime is missing
+    import onnx  # noqa: F401
+    import onnxruntime  # noqa: F401
+    
+    onnx_path = onnx_path_for(model_path)
+    source_hash = checkpoint_hash(model_path)
+    if not onnx_path.exists() or onnx_checkpoint_hash(str(onnx_path)) != source_hash:
+        if not export_missing:
+            raise FileNotFoundError(f"No ONNX model of {model_path} at {onnx_path} (missing or stale)")
+        
+        model = create_model(config['model_type'], {**config, 'compile': None})
+        checkpoint = torch.load(model_path, map_location='cpu', weights_only=True)
+        model.load_state_dict(checkpoint['model_state_dict'])
+        export_onnx(model, config, str(onnx_path), source_hash=source_hash)
+    
+    return OnnxRuntimeModel(str(onnx_path), num_threads)
+
+def main():
+    """Export a trained checkpoint to ONNX."""
+    parser = argparse.ArgumentParser(description='Export GNN traffic models to ONNX')
+    parser.add_argument('--model', type=str, required=True,
+                       help='Path to model checkpoint (e.g. final_model.pth)')
+    parser.add_argument('--config', type=str,
+                       help='Path to config file (if different from model dir)')
+    parser.add_argument('--output', type=str, default=None,
+                       help='Output .onnx path (default: next to the checkpoint)')
+    parser.add_argument('--opset', type=int, default=17,
+                       help='ONNX opset version')
+    parser.add_argument('--verify', action='store_true',
+                       help='Compare ONNX Runtime outputs with eager PyTorch')
+    
+    args = parser.parse_args()
+    
+    config_path = args.config or str(Path(args.model).parent / 'config.json')
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    
+    model = create_model(config['model_type'], {**config, 'compile': None})
+    checkpoint = torch.load(args.model, map_location='cpu', weights_only=True)
+    model.load_state_dict(checkpoint['model_state_dict'])
+    model.eval()
+    
+    output_path = export_onnx(model, config, args.output or str(onnx_path_for(args.model)), args.opset,
+                              checkpoint_hash(args.model))
+    print(f"ONNX model saved to {output_path}")
+    
+    if args.verify:
+        # Different batch and graph size than the export example
+        x, adj = example_inputs(config['model_type'], {**config, 'num_nodes': config['num_nodes'] + 7},
+                                batch_size=3)
+        with torch.no_grad():
+            reference = model(x, adj)
+        max_diff = (OnnxRuntimeModel(output_path)(x, adj) - reference).abs().max()
+        print(f"Max abs difference vs eager: {float(max_diff):.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Post-training INT8 quantization for CPU inference.
+Dynamic quantization of Linear/LSTM layers and static quantization of Linear
+and convolution layers calibrated on a dataset sample, with accuracy and
+latency compared against the fp32 model.
+"""
+
+import torch
+import torch.nn as nn
+import numpy as np
+import copy
+import io
+import json
+import time
+import warnings
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+import argparse
+
+# Eager-mode quantization (deprecated upstream in favour of torchao, which is
+# not a dependency here)
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    import torch.ao.quantization as tq
+
+# Local imports
+try:
+    from models import create_model, unwrap_model
+    from datasets import SpatialTemporalDataset
+    from evaluate import ModelEvaluator
+except ImportError:
+    print("Warning: Local modules not found. Install required packages first.")
+
+QUANTIZATION_MODES = ['dynamic', 'static']
+
+# Layers that static quantization runs in INT8
+STATIC_LAYERS = (nn.Linear, nn.Conv1d, nn.Conv2d)
+
+class StaticQuantLayer(nn.Module):
+    """Layer with quantize/dequantize stubs, so only it runs in INT8."""
+    
+    def __init__(self, layer: nn.Module):
+        super(StaticQuantLayer, self).__init__()
+        self.quant = tq.QuantStub()
+        self.layer = layer
+        self.dequant = tq.DeQuantStub()
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.dequant(self.layer(self.quant(x)))
+
+def wrap_static_layers(module: nn.Module, qconfig) -> int:
+    """
+    Replace every Linear/Conv1d/Conv2d below `module` with a StaticQuantLayer.
+    
+    Graph aggregation, recurrences and the other float ops stay in fp32
+    between the wrapped layers.
+    
+    Returns:
+        Number of wrapped layers
+    """
+    count = 0
+    for name, child in module.named_children():
+        if isinstance(child, STATIC_LAYERS):
+            wrapped = StaticQuantLayer(child)
+            wrapped.qconfig = qconfig
+            setattr(module, name, wrapped)
+            count += 1
+        else:
+            count += wrap_static_layers(child, qconfig)
+    return count
+
+def quantize_dynamic_model(model: nn.Module, quantize_lstm: bool = True) -> nn.Module:
+    """
+    Dynamically quantize Linear and LSTM layers to INT8.
+    
+    Weights are stored in INT8, activations are quantized on the fly per
+    call. This covers the Linear/LSTM layers of TemporalGCN and GCNLayer;
+    other layers stay fp32.
+    
+    Args:
+        model: Trained fp32 model
+        quantize_lstm: Also quantize LSTM layers (on CPUs where the fp32
+            oneDNN LSTM is faster, keeping it fp32 can be the better trade)
+    
+    Returns:
+        Quantized copy of the model (eval mode, CPU)
+    """
+    model = copy.deepcopy(unwrap_model(model)).cpu().eval()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        layers = {nn.Linear, nn.LSTM} if quantize_lstm else {nn.Linear}
+        return tq.quantize_dynamic(model, layers, dtype=torch.qint8)
+
+def quantize_static_model(model: nn.Module, calibration_inputs: Iterable[torch.Tensor],
+                          adj: torch.Tensor, backend: str = 'fbgemm',
+                          quantize_lstm: bool = True) -> nn.Module:
+    """
+    Statically quantize Linear and convolution layers with activation ranges
+    from calibration.
+    
+    Each layer is wrapped in quantize/dequantize stubs and observed over the
+    calibration batches; LSTM layers, which eager-mode static quantization
+    does not support, are quantized dynamically.
+    
+    Args:
+        model: Trained fp32 model
+        calibration_inputs: Input batches representative of inference data
+            (empty when only restoring a quantized state dict)
+        adj: Adjacency matrix passed to the model
+        backend: Quantized engine ('fbgemm', 'x86', 'qnnpack', 'onednn'). The
+            x86 engine can produce wrong results for the (1, T) output
+            convolution of STGCN, so fbgemm is the default
+        quantize_lstm: Dynamically quantize LSTM layers
+    
+    Returns:
+        Quantized copy of the model (eval mode, CPU)
+    """
+    torch.backends.quantized.engine = backend
+    model = copy.deepcopy(unwrap_model(model)).cpu().eval()
+    
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        wrap_static_layers(model, tq.get_default_qconfig(backend))
+        tq.prepare(model, inplace=True)
+        
+        with torch.no_grad():
+            for x in calibration_inputs:
+                model(x.cpu(), adj.cpu())
+        
+        tq.convert(model, inplace=True)
+        if quantize_lstm:
+            model = tq.quantize_dynamic(model, {nn.LSTM}, dtype=torch.qint8)
+        return model
+
+def calibration_batches(dataset: SpatialTemporalDataset, num_batches: int = 8,
+                        batch_size: int = 32, seed: int = 0) -> Iterable[torch.Tensor]:
+    """Random input batches from a dataset for static calibration."""
+    generator = torch.Generator().manual_seed(seed)
+    indices = torch.randperm(len(dataset), generator=generator)[:num_batches * batch_size]
+    for start in range(0, len(indices), batch_size):
+        yield dataset.get_batch(indices[start:start + batch_size])['sequence']
+
+def predict(model: nn.Module, dataset: SpatialTemporalDataset, adj: torch.Tensor,
+            batch_size: int = 32) -> np.ndarray:
+    """Predictions for a whole dataset on CPU."""
+    predictions = []
+    with torch.no_grad():
+        for start in range(0, len(dataset), batch_size):
+            indices = torch.arange(start, min(start + batch_size, len(dataset)))
+            sequences = dataset.get_batch(indices)['sequence']
+            predictions.append(model(sequences, adj).numpy())
+    return np.concatenate(predictions, axis=0)
+
+def measure_latency(model: nn.Module, x: torch.Tensor, adj: torch.Tensor,
+                    num_runs: int = 20, warmup: int = 3) -> float:
+    """Mean latency (ms) of one forward call."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            model(x, adj)
+        start = time.perf_counter()
+        for _ in range(num_runs):
+            model(x, adj)
+    return 1000 * (time.perf_counter() - start) / num_runs
+
+def state_dict_size_mb(model: nn.Module) -> float:
+    """Serialized size of a model's state dict (MB)."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.getbuffer().nbytes / 2 ** 20
+
+def save_quantized_model(model: nn.Module, path: str, config: Dict, mode: str,
+                         backend: str, quantize_lstm: bool = True,
+                         metrics: Optional[Dict] = None):
+    """Save a quantized checkpoint (restored with `load_quantized_model`)."""
+    torch.save({
+        'model_state_dict': model.state_dict(),
+        'config': config,
+        'quantization': mode,
+        'backend': backend,
+        'quantize_lstm': quantize_lstm,
+        'metrics': metrics
+    }, path)
+
+def load_quantized_model(path: str) -> nn.Module:
+    """
+    Rebuild a quantized model from a checkpoint written by `save_quantized_model`.
+    
+    The fp32 model is recreated from the saved config and quantized the same
+    way (without calibration), then the INT8 weights and scales are loaded.
+    """
+    checkpoint = torch.load(path, map_location='cpu', weights_only=False)
+    config = {**checkpoint['config'], 'compile': None}
+    model = create_model(config['model_type'], config)
+    
+    quantize_lstm = checkpoint.get('quantize_lstm', True)
+    if checkpoint['quantization'] == 'dynamic':
+        model = quantize_dynamic_model(model, quantize_lstm)
+    elif checkpoint['quantization'] == 'static':
+        num_nodes = config['num_nodes']
+        model = quantize_static_model(model, [], torch.eye(num_nodes), checkpoint['backend'],
+                                      quantize_lstm)
+    else:
+        raise ValueError(f"Unknown quantization mode: {checkpoint['quantization']}")
+    
+    model.load_state_dict(checkpoint['model_state_dict'])
+    return model.eval()
+
+def run_quantization(model_path: str, config_path: str, data_dir: str,
+                     modes: Iterable[str] = QUANTIZATION_MODES, split: str = 'test',
+                     calibration_batches_count: int = 8, batch_size: int = 32,
+                     backend: str = 'fbgemm', quantize_lstm: bool = True,
+                     mae_tolerance: float = 0.05) -> Dict:
+    """
+    Quantize a trained model and compare it against fp32 on CPU.
+    
+    Quantized checkpoints are written next to the fp32 checkpoint as
+    `<name>_int8_<mode>.pth`, with a `quantization_report.json`. A mode whose
+    MAE exceeds the fp32 MAE by more than `mae_tolerance` (relative) is
+    reported but not saved.
+    
+    Returns:
+        Report with metrics, latency, checkpoint size and deltas vs fp32 per mode
+    """
+    evaluator = ModelEvaluator(model_path, config_path, data_dir)
+    model = unwrap_model(evaluator.model).cpu().eval()
+    adj = evaluator.adjacency_matrix.cpu()
+    
+    dataset = SpatialTemporalDataset(data_dir, split)
+    targets = dataset.targets.numpy()
+    latency_input = dataset.get_batch(torch.arange(min(batch_size, len(dataset))))['sequence']
+    
+    models = {'fp32': model}
+    for mode in modes:
+        if mode == 'dynamic':
+            models[mode] = quantize_dynamic_model(model, quantize_lstm)
+        elif mode == 'static':
+            calibration = SpatialTemporalDataset(data_dir, 'train')
+            models[mode] = quantize_static_model(
+                model, calibration_batches(calibration, calibration_batches_count, batch_size),
+                adj, backend, quantize_lstm
+            )
+        else:
+            raise ValueError(f"Unknown quantization mode: {mode}")
+    
+    report = {}
+    for name, candidate in models.items():
+        report[name] = {
+            'metrics': evaluator.calculate_metrics(predict(candidate, dataset, adj, batch_size), targets),
+            'latency_ms': measure_latency(candidate, latency_input, adj),
+            'size_mb': state_dict_size_mb(candidate)
+        }
+        
+        if name != 'fp32':
+            reference = report['fp32']
+            report[name]['mae_delta'] = report[name]['metrics']['mae'] - reference['metrics']['mae']
+            report[name]['rmse_delta'] = report[name]['metrics']['rmse'] - reference['metrics']['rmse']
+            report[name]['speedup'] = reference['latency_ms'] / report[name]['latency_ms']
+            
+            report[name]['saved'] = report[name]['mae_delta'] <= mae_tolerance * reference['metrics']['mae']
+            if not report[name]['saved']:
+                warnings.warn(f"{name} quantization raises MAE by {report[name]['mae_delta']:.4f} "
+                              f"(more than {mae_tolerance:.0%} of fp32), checkpoint not saved")
+                continue
+            
+            output_path = Path(model_path).with_name(f"{Path(model_path).stem}_int8_{name}.pth")
+            save_quantized_model(candidate, str(output_path), evaluator.config, name, backend,
+                                 quantize_lstm, report[name]['metrics'])
+            report[name]['path'] = str(output_path)
+    
+    with open(Path(model_path).with_name('quantization_report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    return report
+
+def print_quantization_report(report: Dict):
+    """Print accuracy and latency per precision."""
+    print(f"\n{'model':<8} {'MAE':>9} {'RMSE':>9} {'dMAE':>9} {'latency':>11} {'speedup':>8} {'size':>9}")
+    for name, r in report.items():
+        print(f"{name:<8} {r['metrics']['mae']:>9.4f} {r['metrics']['rmse']:>9.4f} "
+              f"{r.get('mae_delta', 0.0):>+9.4f} {r['latency_ms']:>8.2f} ms {r.get('speedup', 1.0):>7.2f}x "
+              f"{r['size_mb']:>6.2f} MB{'' if r.get('saved', True) else '  (not saved)'}")
+
+def main():
+    """Quantize a trained model for CPU inference."""
+    parser = argparse.ArgumentParser(description='INT8 quantization of GNN traffic models')
+    parser.add_argument('--model', type=str, required=True,
+                       help='Path to model checkpoint (e.g. final_model.pth)')
+    parser.add_argument('--config', type=str,
+                       help='Path to config file (if different from model dir)')
+    parser.add_argument('--data-dir', type=str, default='data/processed',
+                       help='Data directory')
+    parser.add_argument('--modes', type=str, nargs='+', default=QUANTIZATION_MODES,
+                       choices=QUANTIZATION_MODES, help='Quantization modes')
+    parser.add_argument('--split', type=str, default='test',
+                       help='Split used for the accuracy comparison')
+    parser.add_argument('--calibration-batches', type=int, default=8,
+                       help='Training batches used to calibrate static quantization')
+    parser.add_argument('--batch-size', type=int, default=32,
+                       help='Batch size for calibration, evaluation and latency')
+    parser.add_argument('--backend', type=str, default='fbgemm',
+                       choices=torch.backends.quantized.supported_engines,
+                       help='Quantized engine')
+    parser.add_argument('--keep-lstm-fp32', action='store_true',
+                       help='Leave LSTM layers in fp32')
+    parser.add_argument('--mae-tolerance', type=float, default=0.05,
+                       help='Largest relative MAE increase over fp32 for which a quantized checkpoint is saved')
+    
+    args = parser.parse_args()
+    
+    config_path = args.config or str(Path(args.model).parent / 'config.json')
+    report = run_quantization(args.model, config_path, args.data_dir, args.modes, args.split,
+                              args.calibration_batches, args.batch_size, args.backend,
+                              not args.keep_lstm_fp32, args.mae_tolerance)
+    print_quantization_report(report)
+
+if __name__ == "__main__":
+    main()
@@ -8,8 +8,17 @@ import numpy as np
 import networkx as nx
 from typing import Dict, List, Tuple, Optional, Union
 import logging
+from pathlib import Path
+import scipy.sparse as sp
 from scipy.spatial.distance import cdist
 
+try:
+    from graph.stats import save_graph_stats
+    from graph.registry import NodeRegistry
+except ImportError:
+    from stats import save_graph_stats
+    from registry import NodeRegistry
+
 class GraphBuilder:
     """Builds graphs for GNN traffic prediction models."""
     
@@ -306,37 +315,58 @@ def create_graph_tensors(graph_file: str, time_series_file: str, output_dir: str
     # Build spatial graph
     spatial_graph = builder.build_spatial_graph(road_segments)
     
+    # Assign stable node indices: known roads keep their index from previous
+    # builds, new roads are appended and missing roads leave an empty row
+    registry = NodeRegistry.load_or_create(output_dir)
+    graph_nodes = {str(node): node for node in spatial_graph.nodes()}
+    registry.register(graph_nodes.keys())
+    registry.remove([road for road in registry.id_to_road if road not in graph_nodes])
+    
     # Create adjacency matrix
-    node_list = list(spatial_graph.nodes())
+    node_list = [graph_nodes.get(road, road) for road in registry.id_to_road]
     adj_matrix = builder.create_adjacency_matrix(spatial_graph, node_list)
     
-    # Add self-loops and normalize
+    # Add self-loops (active nodes only) and normalize
     adj_matrix = builder.add_self_loops(adj_matrix)
+    adj_matrix[~registry.active] = 0.0
+    adj_matrix[:, ~registry.active] = 0.0
     adj_matrix_norm = builder.normalize_adjacency(adj_matrix, method='symmetric')
     
     # Save graph tensors
     np.save(f"{output_dir}/adjacency_matrix.npy", adj_matrix)
     np.save(f"{output_dir}/adjacency_matrix_normalized.npy", adj_matrix_norm)
     
-    # Save node mapping
-    node_mapping = {node: idx for idx, node in enumerate(node_list)}
+    # CSR copies for neighbor sampling and sparse graph operations
+    sp.save_npz(f"{output_dir}/adjacency_matrix.npz", sp.csr_matrix(adj_matrix))
+    sp.save_npz(f"{output_dir}/adjacency_matrix_normalized.npz", sp.csr_matrix(adj_matrix_norm))
+    
+    # Save node mapping, registry and coordinates for incremental updates
+    node_mapping = registry.node_mapping()
     
     import json
     with open(f"{output_dir}/node_mapping.json", 'w') as f:
         json.dump(node_mapping, f, default=str, indent=2)
     
-    # Graph statistics
-    stats = {
-        'n_nodes': len(node_list),
-        'n_edges': spatial_graph.number_of_edges(),
-        'avg_degree': np.mean(np.sum(adj_matrix > 0, axis=1)),
-        'density': nx.density(spatial_graph)
-    }
+    registry.save(f"{output_dir}/node_registry.json")
+    
+    coords = np.zeros((registry.capacity, 2))
+    coords_path = Path(output_dir) / 'node_coords.npy'
+    if coords_path.exists():
+        old_coords = np.load(coords_path)
+        coords[:len(old_coords)] = old_coords[:registry.capacity]
+    for road, node in graph_nodes.items():
+        data = spatial_graph.nodes[node]
+        coords[registry.road_to_id[road]] = [
+            data.get('avg_lat', data.get('lat', 0)), data.get('avg_lon', data.get('lon', 0))
+        ]
+    np.save(coords_path, coords)
     
-    with open(f"{output_dir}/graph_stats.json", 'w') as f:
-        json.dump(stats, f, indent=2)
+    # Graph statistics (computed on the CSR adjacency of active nodes, self-loops excluded)
+    active_adj = sp.csr_matrix(adj_matrix)[registry.active][:, registry.active]
+    stats = save_graph_stats(active_adj, f"{output_dir}/graph_stats.json")
     
-    print(f"Graph tensors created: {stats}")
+    print(f"Graph tensors created: {stats['n_nodes']} nodes, {stats['n_edges']} edges, "
+          f"avg degree {stats['avg_degree']:.2f}, {stats['n_components']} components")
     print(f"  Adjacency matrix shape: {adj_matrix.shape}")
     print(f"  Files saved to {output_dir}")
 
@@ -0,0 +1,226 @@
+"""
+Graph diagnostics computed directly on sparse CSR adjacency matrices.
+Degree distribution, connected components, diameter estimate and spectral gap
+in O(E) time and memory, without materializing dense or NetworkX graphs.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse import csgraph
+from scipy.sparse.linalg import eigsh, ArpackNoConvergence
+from pathlib import Path
+from typing import Dict, Optional
+import argparse
+import json
+import logging
+
+def _strip_self_loops(adjacency: sp.spmatrix) -> sp.csr_matrix:
+    """Remove diagonal entries (self-loops) from a sparse adjacency matrix."""
+    csr = sp.csr_matrix(adjacency, dtype=np.float64)
+    csr = (csr - sp.diags(csr.diagonal())).tocsr()
+    csr.eliminate_zeros()
+    return csr
+
+def degree_statistics(adjacency: sp.csr_matrix) -> Dict:
+    """
+    Compute the degree distribution from CSR row pointers.
+    
+    Args:
+        adjacency: Adjacency matrix without self-loops
+    
+    Returns:
+        Dictionary with degree summary and histogram (degree -> node count)
+    """
+    degrees = np.diff(adjacency.indptr)
+    histogram = np.bincount(degrees)
+    
+    return {
+        'avg_degree': float(degrees.mean()) if len(degrees) else 0.0,
+        'min_degree': int(degrees.min()) if len(degrees) else 0,
+        'max_degree': int(degrees.max()) if len(degrees) else 0,
+        'median_degree': float(np.median(degrees)) if len(degrees) else 0.0,
+        'std_degree': float(degrees.std()) if len(degrees) else 0.0,
+        'isolated_nodes': int(np.sum(degrees == 0)),
+        'degree_histogram': {int(d): int(c) for d, c in enumerate(histogram) if c > 0}
+    }
+
+def component_statistics(adjacency: sp.csr_matrix) -> Dict:
+    """
+    Compute connected components.
+    
+    Args:
+        adjacency: Adjacency matrix without self-loops
+    
+    Returns:
+        Dictionary with component count and sizes
+    """
+    n_components, labels = csgraph.connected_components(adjacency, directed=False)
+    sizes = np.bincount(labels)
+    
+    return {
+        'n_components': int(n_components),
+        'largest_component_size': int(sizes.max()) if len(sizes) else 0,
+        'largest_component_fraction': float(sizes.max() / len(labels)) if len(labels) else 0.0,
+        'component_size_histogram': {
+            int(size): int(count) for size, count in enumerate(np.bincount(sizes)) if count > 0
+        }
+    }
+
+def largest_component(adjacency: sp.csr_matrix) -> sp.csr_matrix:
+    """Extract the subgraph induced by the largest connected component."""
+    _, labels = csgraph.connected_components(adjacency, directed=False)
+    nodes = np.flatnonzero(labels == np.argmax(np.bincount(labels)))
+    return adjacency[nodes][:, nodes].tocsr()
+
+def estimate_diameter(adjacency: sp.csr_matrix, num_sweeps: int = 4,
+                      seed: Optional[int] = 0) -> int:
+    """
+    Estimate the hop diameter with repeated double-sweep BFS.
+    
+    Each sweep is one unweighted BFS (O(E)) and returns an eccentricity, which
+    is a lower bound on the diameter that is exact on most road-like graphs.
+    
+    Args:
+        adjacency: Connected adjacency matrix without self-loops
+        num_sweeps: Number of BFS passes
+        seed: Random seed for the start node
+    
+    Returns:
+        Diameter lower bound in hops
+    """
+    n_nodes = adjacency.shape[0]
+    if n_nodes < 2:
+        return 0
+    
+    rng = np.random.default_rng(seed)
+    source = int(rng.integers(n_nodes))
+    diameter = 0
+    
+    for _ in range(num_sweeps):
+        distances = csgraph.shortest_path(
+            adjacency, directed=False, unweighted=True, indices=source
+        )
+        distances[np.isinf(distances)] = -1
+        farthest = int(np.argmax(distances))
+        
+        if distances[farthest] <= diameter:
+            break
+        
+        diameter = int(distances[farthest])
+        source = farthest
+    
+    return diameter
+
+def spectral_gap(adjacency: sp.csr_matrix) -> Optional[float]:
+    """
+    Compute the spectral gap 1 - lambda_2 of the normalized adjacency.
+    
+    Uses Lanczos on the largest connected component, so the cost is a few
+    sparse matrix-vector products rather than a dense eigendecomposition.
+    
+    Args:
+        adjacency: Connected adjacency matrix without self-loops
+    
+    Returns:
+        Spectral gap, or None if it cannot be computed
+    """
+    n_nodes = adjacency.shape[0]
+    if n_nodes < 3:
+        return None
+    
+    degree = np.asarray(adjacency.sum(axis=1)).flatten()
+    degree_inv_sqrt = np.zeros_like(degree)
+    degree_inv_sqrt[degree > 0] = degree[degree > 0] ** -0.5
+    d_mat = sp.diags(degree_inv_sqrt)
+    normalized = (d_mat @ adjacency @ d_mat).tocsr()
+    
+    try:
+        eigenvalues = eigsh(normalized, k=2, which='LA', return_eigenvectors=False,
+                            maxiter=max(1000, 10 * n_nodes), tol=1e-6)
+    except ArpackNoConvergence:
+        logging.getLogger(__name__).warning("Spectral gap: Lanczos did not converge")
+        return None
+    
+    eigenvalues = np.sort(eigenvalues)
+    return float(eigenvalues[-1] - eigenvalues[-2])
+
+def compute_graph_stats(adjacency: sp.spmatrix, spectral: bool = True) -> Dict:
+    """
+    Compute graph diagnostics on a sparse adjacency matrix.
+    
+    Args:
+        adjacency: (Possibly self-looped) adjacency matrix [n_nodes, n_nodes]
+        spectral: Whether to compute the spectral gap
+    
+    Returns:
+        Dictionary of graph statistics
+    """
+    csr = _strip_self_loops(adjacency)
+    n_nodes = csr.shape[0]
+    
+    symmetric = (csr != csr.T).nnz == 0
+    n_edges = csr.nnz // 2 if symmetric else csr.nnz
+    max_edges = n_nodes * (n_nodes - 1) / (2 if symmetric else 1)
+    
+    stats = {
+        'n_nodes': int(n_nodes),
+        'n_edges': int(n_edges),
+        'directed': not symmetric,
+        'density': float(n_edges / max_edges) if max_edges > 0 else 0.0
+    }
+    
+    stats.update(degree_statistics(csr))
+    stats.update(component_statistics(csr))
+    
+    lcc = largest_component(csr) if n_nodes > 0 else csr
+    stats['diameter_estimate'] = estimate_diameter(lcc)
+    stats['spectral_gap'] = spectral_gap(lcc) if spectral else None
+    
+    return stats
+
+def save_graph_stats(adjacency: sp.spmatrix, output_path: str,
+                     spectral: bool = True) -> Dict:
+    """
+    Compute graph statistics and write them to JSON.
+    
+    Args:
+        adjacency: Adjacency matrix
+        output_path: Path of the output `graph_stats.json`
+        spectral: Whether to compute the spectral gap
+    
+    Returns:
+        Dictionary of graph statistics
+    """
+    stats = compute_graph_stats(adjacency, spectral=spectral)
+    
+    with open(output_path, 'w') as f:
+        json.dump(stats, f, indent=2)
+    
+    return stats
+
+def main():
+    """Compute graph statistics for a processed data directory."""
+    parser = argparse.ArgumentParser(description='Compute sparse graph statistics')
+    parser.add_argument('--data-dir', type=str, default='data/processed',
+                       help='Data directory')
+    parser.add_argument('--no-spectral', action='store_true',
+                       help='Skip the spectral gap computation')
+    
+    args = parser.parse_args()
+    
+    try:
+        from graph.sampling import load_csr_adjacency
+    except ImportError:
+        from sampling import load_csr_adjacency
+    
+    adjacency = load_csr_adjacency(args.data_dir, name='adjacency_matrix')
+    output_path = Path(args.data_dir) / 'graph_stats.json'
+    stats = save_graph_stats(adjacency, str(output_path), spectral=not args.no_spectral)
+    
+    print(f"Graph statistics saved to {output_path}:")
+    for key in ['n_nodes', 'n_edges', 'avg_degree', 'n_components',
+                'diameter_estimate', 'spectral_gap']:
+        print(f"  {key}: {stats[key]}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Graph support precomputation for spectral and diffusion GNN models.
+Computes scaled Laplacians, Chebyshev polynomials and random-walk transition
+matrices once per graph and caches them on disk keyed by graph hash.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import eigsh, ArpackNoConvergence
+import torch
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import hashlib
+import json
+import logging
+
+def graph_hash(adjacency: sp.spmatrix) -> str:
+    """
+    Compute a stable content hash of a sparse adjacency matrix.
+    
+    Args:
+        adjacency: Adjacency matrix
+    
+    Returns:
+        Hex digest identifying the graph structure and weights
+    """
+    csr = sp.csr_matrix(adjacency, dtype=np.float64)
+    csr.sum_duplicates()
+    csr.sort_indices()
+    
+    digest = hashlib.sha1()
+    digest.update(np.asarray(csr.shape, dtype=np.int64).tobytes())
+    digest.update(csr.indptr.astype(np.int64).tobytes())
+    digest.update(csr.indices.astype(np.int64).tobytes())
+    digest.update(csr.data.tobytes())
+    return digest.hexdigest()[:16]
+
+def to_torch_sparse(matrix: sp.spmatrix) -> torch.Tensor:
+    """Convert a scipy sparse matrix to a coalesced torch sparse COO tensor."""
+    coo = sp.coo_matrix(matrix, dtype=np.float32)
+    indices = torch.from_numpy(np.vstack([coo.row, coo.col]).astype(np.int64))
+    values = torch.from_numpy(coo.data)
+    return torch.sparse_coo_tensor(indices, values, coo.shape).coalesce()
+
+def to_torch_csr(matrix: sp.spmatrix) -> torch.Tensor:
+    """Convert a scipy sparse matrix to a torch sparse CSR tensor."""
+    csr = sp.csr_matrix(matrix, dtype=np.float32)
+    csr.sum_duplicates()
+    csr.sort_indices()
+    return torch.sparse_csr_tensor(
+        torch.from_numpy(csr.indptr.astype(np.int64)),
+        torch.from_numpy(csr.indices.astype(np.int64)),
+        torch.from_numpy(csr.data),
+        csr.shape
+    )
+
+def pad_matrix(matrix: sp.spmatrix, num_nodes: int) -> sp.csr_matrix:
+    """Copy of a square sparse matrix grown to `num_nodes` with empty rows/columns."""
+    padded = sp.csr_matrix(matrix, copy=True)
+    padded.resize((num_nodes, num_nodes))
+    return padded
+
+def rows_touching(matrix: sp.csr_matrix, columns: np.ndarray) -> np.ndarray:
+    """Rows with a non-zero entry in any of the given columns."""
+    mask = np.zeros(matrix.shape[1], dtype=bool)
+    mask[columns] = True
+    rows = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+    return np.unique(rows[mask[matrix.indices]])
+
+def replace_rows(matrix: sp.csr_matrix, rows: np.ndarray, values: sp.spmatrix,
+                 shape: Optional[Tuple[int, int]] = None) -> sp.csr_matrix:
+    """
+    Replace a subset of rows of a CSR matrix by splicing its arrays.
+    
+    The runs of kept rows between replaced rows are copied as contiguous
+    slices, so the cost is a memory copy of the non-zeros plus O(len(rows)).
+    
+    Args:
+        matrix: Matrix [n, m]
+        rows: Row indices to replace (sorted, unique)
+        values: New rows [len(rows), m']
+        shape: Shape of the result if it grows (new rows start empty)
+    
+    Returns:
+        Matrix with the given rows replaced
+    """
+    matrix, values = sp.csr_matrix(matrix), sp.csr_matrix(values)
+    shape = shape or matrix.shape
+    old_rows = matrix.shape[0]
+    
+    lengths = np.zeros(shape[0], dtype=np.int64)
+    lengths[:old_rows] = np.diff(matrix.indptr)
+    lengths[rows] = np.diff(values.indptr)
+    indptr = np.concatenate([[0], np.cumsum(lengths)])
+    
+    data = np.empty(indptr[-1], dtype=np.result_type(matrix.dtype, values.dtype))
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    
+    # Copy the kept run before each replaced row, then the replacement row
+    start = 0
+    for i, row in enumerate(np.append(rows, shape[0])):
+        end = min(row, old_rows)
+        if start < end:
+            src, dst = slice(matrix.indptr[start], matrix.indptr[end]), slice(indptr[start], indptr[end])
+            data[dst] = matrix.data[src]
+            indices[dst] = matrix.indices[src]
+        if i < len(rows):
+            src, dst = slice(values.indptr[i], values.indptr[i + 1]), slice(indptr[row], indptr[row + 1])
+            data[dst] = values.data[src]
+            indices[dst] = values.indices[src]
+        start = row + 1
+    
+    return sp.csr_matrix((data, indices, indptr), shape=shape)
+
+class GraphSupports:
+    """Computes and caches the sparse supports used by spectral and diffusion GNNs."""
+    
+    # Supports computed in this process, shared across model instantiations
+    _memory_cache: Dict[str, List[sp.csr_matrix]] = {}
+    
+    def __init__(self, adjacency: Union[np.ndarray, sp.spmatrix],
+                 cache_dir: Optional[str] = None):
+        """
+        Initialize graph supports.
+        
+        Args:
+            adjacency: Weighted adjacency matrix [n_nodes, n_nodes] (not normalized)
+            cache_dir: Directory for persisted supports (None keeps them in memory only)
+        """
+        self.adjacency = sp.csr_matrix(adjacency, dtype=np.float64)
+        self.adjacency.sum_duplicates()
+        self.adjacency.sort_indices()
+        self.num_nodes = self.adjacency.shape[0]
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.graph_hash = graph_hash(self.adjacency)
+        self.logger = logging.getLogger(__name__)
+    
+    def get(self, kind: str, **params) -> List[sp.csr_matrix]:
+        """
+        Get supports of a given kind, computing them only on a cache miss.
+        
+        Args:
+            kind: 'scaled_laplacian', 'chebyshev', 'random_walk' or 'dual_random_walk'
+            **params: Parameters of the support (e.g. order, num_steps, lambda_max)
+        
+        Returns:
+            List of sparse support matrices
+        """
+        key = self._cache_key(kind, params)
+        
+        if key in self._memory_cache:
+            return self._memory_cache[key]
+        
+        supports = self._load(key)
+        if supports is None:
+            supports = self._compute(kind, params)
+            self._save(key, kind, params, supports)
+        
+        self._memory_cache[key] = supports
+        return supports
+    
+    def get_torch(self, kind: str, device: Optional[torch.device] = None,
+                  **params) -> List[torch.Tensor]:
+        """Get supports as torch sparse tensors."""
+        return [to_torch_sparse(s).to(device) if device else to_torch_sparse(s)
+                for s in self.get(kind, **params)]
+    
+    def lambda_max(self, laplacian: Optional[sp.spmatrix] = None) -> float:
+        """
+        Estimate the largest eigenvalue of the normalized Laplacian with Lanczos.
+        
+        Args:
+            laplacian: Laplacian matrix (default: normalized Laplacian of the graph)
+        
+        Returns:
+            Largest eigenvalue (falls back to the upper bound 2.0 if ARPACK fails)
+        """
+        if laplacian is None:
+            laplacian = self.normalized_laplacian()
+        
+        if self.num_nodes < 3:
+            return 2.0
+        
+        try:
+            eigenvalues = eigsh(laplacian, k=1, which='LM', return_eigenvectors=False,
+                                maxiter=max(1000, 10 * self.num_nodes), tol=1e-4)
+            return float(eigenvalues[0])
+        except ArpackNoConvergence:
+            self.logger.warning("Lanczos did not converge, using lambda_max = 2.0")
+            return 2.0
+    
+    def normalized_laplacian(self) -> sp.csr_matrix:
+        """Compute L = I - D^(-1/2) A D^(-1/2)."""
+        degree = np.asarray(self.adjacency.sum(axis=1)).flatten()
+        with np.errstate(divide='ignore'):
+            degree_inv_sqrt = np.power(degree, -0.5)
+        degree_inv_sqrt[np.isinf(degree_inv_sqrt)] = 0.0
+        
+        d_mat = sp.diags(degree_inv_sqrt)
+        return (sp.eye(self.num_nodes) - d_mat @ self.adjacency @ d_mat).tocsr()
+    
+    def scaled_laplacian(self, lambda_max: Optional[float] = None) -> sp.csr_matrix:
+        """Compute L~ = 2 L / lambda_max - I."""
+        laplacian = self.normalized_laplacian()
+        if lambda_max is None:
+            lambda_max = self.lambda_max(laplacian)
+        
+        return ((2.0 / lambda_max) * laplacian - sp.eye(self.num_nodes)).tocsr()
+    
+    def transition_matrix(self, reverse: bool = False) -> sp.csr_matrix:
+        """
+        Compute the random-walk transition matrix D_O^(-1) A (or D_I^(-1) A^T).
+        
+        Args:
+            reverse: Use the reversed graph (backward diffusion)
+        """
+        adjacency = self.adjacency.T.tocsr() if reverse else self.adjacency
+        degree = np.asarray(adjacency.sum(axis=1)).flatten()
+        with np.errstate(divide='ignore'):
+            degree_inv = np.power(degree, -1.0)
+        degree_inv[np.isinf(degree_inv)] = 0.0
+        
+        return (sp.diags(degree_inv) @ adjacency).tocsr()
+    
+    def patched(self, previous: 'GraphSupports', kind: str, **params) -> List[sp.csr_matrix]:
+        """
+        Get supports by patching the supports of a previous version of the graph.
+        
+        Only rows whose values can change are recomputed: rows of nodes whose
+        edges changed and, for powers and polynomials, the rows within k hops
+        of them. Random-walk supports and Chebyshev/scaled-Laplacian supports
+        with a fixed `lambda_max` are patched. With an estimated `lambda_max`
+        a full recompute is required: it is the largest eigenvalue of the
+        whole Laplacian, so any edit can rescale every entry.
+        
+        Args:
+            previous: Supports of the graph before the update (node ids must
+                be stable, new nodes appended at the end)
+            kind: Support kind (see `get`)
+            **params: Parameters of the support
+        
+        Returns:
+            List of sparse support matrices of this graph
+        """
+        key = self._cache_key(kind, params)
+        
+        if key in self._memory_cache:
+            return self._memory_cache[key]
+        
+        supports = self._load(key)
+        if supports is None:
+            supports = self._patch(previous, kind, params)
+            if supports is None:
+                supports = self._compute(kind, params)
+            self._save(key, kind, params, supports)
+        
+        self._memory_cache[key] = supports
+        return supports
+    
+    def _patch(self, previous: 'GraphSupports', kind: str,
+               params: Dict) -> Optional[List[sp.csr_matrix]]:
+        """Patch the previous graph's supports, or None if the kind needs a full recompute."""
+        lambda_max = params.get('lambda_max')
+        spectral = kind in ('scaled_laplacian', 'chebyshev')
+        if not (kind in ('random_walk', 'dual_random_walk') or (spectral and lambda_max is not None)):
+            return None
+        
+        n = self.num_nodes
+        old = previous.get(kind, **params)
+        
+        # Rows / columns with changed edges; appended nodes count as changed
+        diff = (self.adjacency - pad_matrix(previous.adjacency, n)).tocoo()
+        diff.eliminate_zeros()
+        appended = np.arange(previous.num_nodes, n)
+        changed_rows = np.union1d(diff.row, appended).astype(np.int64)
+        changed_cols = np.union1d(diff.col, appended).astype(np.int64)
+        
+        if kind in ('random_walk', 'dual_random_walk'):
+            num_steps = params.get('num_steps', 1)
+            directions = [False, True] if kind == 'dual_random_walk' else [False]
+            
+            supports = []
+            for d, reverse in enumerate(directions):
+                # Row i of D^-1 A depends only on row i of A
+                adjacency = self.adjacency.T.tocsr() if reverse else self.adjacency
+                changed = changed_cols if reverse else changed_rows
+                degree = np.asarray(adjacency[changed].sum(axis=1)).flatten()
+                with np.errstate(divide='ignore'):
+                    degree_inv = np.power(degree, -1.0)
+                degree_inv[np.isinf(degree_inv)] = 0.0
+                
+                transition = replace_rows(old[d * num_steps], changed,
+                                          sp.diags(degree_inv) @ adjacency[changed], (n, n))
+                power, rows = transition, changed
+                supports.append(transition)
+                
+                # Row i of P^k = P^(k-1)[i] @ P changes when it reaches a changed row of P
+                for k in range(1, num_steps):
+                    rows = np.union1d(rows, rows_touching(power, changed))
+                    power = replace_rows(old[d * num_steps + k], rows, power[rows] @ transition, (n, n))
+                    supports.append(power)
+            return supports
+        
+        # L~ = (2 / lambda_max) (I - D^-1/2 A D^-1/2) - I: entry (i, j) depends on
+        # A_ij, d_i and d_j, so rows of changed nodes and of their neighbors change
+        rows = np.union1d(changed_rows, rows_touching(self.adjacency, changed_rows))
+        degree = np.asarray(self.adjacency.sum(axis=1)).flatten()
+        with np.errstate(divide='ignore'):
+            degree_inv_sqrt = np.power(degree, -0.5)
+        degree_inv_sqrt[np.isinf(degree_inv_sqrt)] = 0.0
+        
+        identity = sp.eye(n, format='csr')
+        normalized = sp.diags(degree_inv_sqrt[rows]) @ self.adjacency[rows] @ sp.diags(degree_inv_sqrt)
+        scaled_rows = (2.0 / lambda_max) * (identity[rows] - normalized) - identity[rows]
+        
+        if kind == 'scaled_laplacian':
+            return [replace_rows(old[0], rows, scaled_rows, (n, n))]
+        
+        # T_k[i] = 2 L~[i] @ T_(k-1) - T_(k-2)[i] changes when it reaches a changed row
+        order = params.get('order', 3)
+        scaled = replace_rows(old[1], rows, scaled_rows, (n, n)) if order > 1 else None
+        polynomials = [identity, scaled]
+        for k in range(2, order):
+            rows = np.union1d(rows, rows_touching(scaled, rows))
+            polynomials.append(replace_rows(
+                old[k], rows, 2 * scaled[rows] @ polynomials[-1] - polynomials[-2][rows], (n, n)
+            ))
+        return polynomials[:order]
+    
+    def _compute(self, kind: str, params: Dict) -> List[sp.csr_matrix]:
+        """Compute supports of the given kind."""
+        if kind == 'scaled_laplacian':
+            return [self.scaled_laplacian(params.get('lambda_max'))]
+        
+        elif kind == 'chebyshev':
+            # T_0 = I, T_1 = L~, T_k = 2 L~ T_(k-1) - T_(k-2)
+            order = params.get('order', 3)
+            scaled = self.scaled_laplacian(params.get('lambda_max'))
+            polynomials = [sp.eye(self.num_nodes, format='csr'), scaled]
+            for _ in range(2, order):
+                polynomials.append((2 * scaled @ polynomials[-1] - polynomials[-2]).tocsr())
+            return polynomials[:order]
+        
+        elif kind in ('random_walk', 'dual_random_walk'):
+            # P^1 .. P^K for forward (and backward) diffusion
+            num_steps = params.get('num_steps', 1)
+            directions = [False, True] if kind == 'dual_random_walk' else [False]
+            
+            supports = []
+            for reverse in directions:
+                transition = self.transition_matrix(reverse)
+                power = transition
+                supports.append(power)
+                for _ in range(1, num_steps):
+                    power = (power @ transition).tocsr()
+                    supports.append(power)
+            return supports
+        
+        else:
+            raise ValueError(f"Unknown support type: {kind}")
+    
+    def _cache_key(self, kind: str, params: Dict) -> str:
+        """Build the cache key from graph hash, support kind and parameters."""
+        param_str = '_'.join(f"{k}-{params[k]}" for k in sorted(params))
+        return f"{self.graph_hash}_{kind}" + (f"_{param_str}" if param_str else '')
+    
+    def _load(self, key: str) -> Optional[List[sp.csr_matrix]]:
+        """Load persisted supports, if any."""
+        if self.cache_dir is None:
+            return None
+        
+        index_path = self.cache_dir / f"{key}.json"
+        if not index_path.exists():
+            return None
+        
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        
+        self.logger.info(f"Loaded cached supports {key}")
+        return [sp.load_npz(self.cache_dir / name).tocsr() for name in index['files']]
+    
+    def _save(self, key: str, kind: str, params: Dict, supports: List[sp.csr_matrix]):
+        """Persist supports as `.npz` files plus a JSON index."""
+        if self.cache_dir is None:
+            return
+        
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        
+        files = []
+        for i, support in enumerate(supports):
+            name = f"{key}_{i}.npz"
+            sp.save_npz(self.cache_dir / name, support.astype(np.float32))
+            files.append(name)
+        
+        index = {
+            'graph_hash': self.graph_hash,
+            'kind': kind,
+            'params': params,
+            'num_nodes': self.num_nodes,
+            'files': files
+        }
+        
+        with open(self.cache_dir / f"{key}.json", 'w') as f:
+            json.dump(index, f, indent=2)
+        
+        self.logger.info(f"Cached {len(supports)} {kind} supports under {self.cache_dir}")
+    
+    @classmethod
+    def from_data_dir(cls, data_dir: str) -> 'GraphSupports':
+        """
+        Create supports for the raw adjacency written by `create_graph_tensors`.
+        
+        Args:
+            data_dir: Directory containing processed graph tensors
+        
+        Returns:
+            GraphSupports caching into `{data_dir}/supports`
+        """
+        try:
+            from graph.sampling import load_csr_adjacency
+        except ImportError:
+            from sampling import load_csr_adjacency
+        
+        adjacency = load_csr_adjacency(data_dir, name='adjacency_matrix')
+        return cls(adjacency, cache_dir=str(Path(data_dir) / 'supports'))
+
+if __name__ == "__main__":
+    # Example usage with a random sparse road graph
+    n_nodes = 500
+    adj = sp.random(n_nodes, n_nodes, density=0.01, format='csr', random_state=0)
+    adj = adj + adj.T
+    
+    supports = GraphSupports(adj)
+    print(f"Graph hash: {supports.graph_hash}")
+    print(f"lambda_max: {supports.lambda_max():.4f}")
+    
+    cheb = supports.get('chebyshev', order=3)
+    print(f"Chebyshev supports: {[s.nnz for s in cheb]} non-zeros")
+    
+    diffusion = supports.get('dual_random_walk', num_steps=2)
+    print(f"Diffusion supports: {len(diffusion)} matrices")
@@ -6,8 +6,182 @@ Includes ST-GCN, DCRNN, and GraphWaveNet implementations.
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Tuple, Optional, List
+from torch.utils.checkpoint import checkpoint
+from typing import Any, Dict, Tuple, Optional, List, Union
+import contextlib
 import math
+import warnings
+
+# Either a full [num_nodes, num_nodes] adjacency shared by every layer, or one
+# rectangular [num_dst, num_src] block per layer from `graph.sampling.NeighborSampler`.
+# Each matrix may be dense, sparse CSR (SpMM) or sparse COO (edge-list scatter)
+Adjacency = Union[torch.Tensor, List[torch.Tensor]]
+
+# Cached encoder state of an incremental rollout (see `rollout.rollout`)
+RolloutState = Dict[str, Any]
+
+# Per-block rollout cache: recent block inputs and recent spatial outputs, one
+# channel-last [batch, nodes, channels] tensor per step, oldest first
+BlockCache = Tuple[List[torch.Tensor], List[torch.Tensor]]
+
+def select_adjacency(adj: Adjacency, layer_idx: int, num_layers: int) -> torch.Tensor:
+    """
+    Pick the adjacency used by one graph layer.
+    
+    Args:
+        adj: Full adjacency matrix or list of sampled blocks (input layer first)
+        layer_idx: Index of the graph layer
+        num_layers: Total number of graph layers in the model
+        
+    Returns:
+        Adjacency matrix for the layer
+    """
+    if isinstance(adj, torch.Tensor):
+        return adj
+    
+    if len(adj) != num_layers:
+        raise ValueError(
+            f"Expected {num_layers} sampled blocks (one per graph layer), got {len(adj)}"
+        )
+    return adj[layer_idx]
+
+def edge_index_to_adjacency(edge_index: torch.Tensor, edge_weight: Optional[torch.Tensor] = None,
+                            num_nodes: Optional[int] = None, num_dst: Optional[int] = None,
+                            layout: torch.layout = torch.sparse_coo) -> torch.Tensor:
+    """
+    Build a sparse adjacency matrix from an edge list.
+    
+    Args:
+        edge_index: Edges [2, num_edges] as (source, target) rows; messages flow
+            from source to target, i.e. A[target, source] = weight
+        edge_weight: Edge weights [num_edges] (default: all ones)
+        num_nodes: Number of source nodes (default: largest index + 1)
+        num_dst: Number of target nodes (default: num_nodes)
+        layout: torch.sparse_coo (scatter message passing) or torch.sparse_csr (SpMM)
+        
+    Returns:
+        Sparse adjacency [num_dst, num_nodes]
+    """
+    if num_nodes is None:
+        num_nodes = int(edge_index.max()) + 1 if edge_index.numel() else 0
+    if num_dst is None:
+        num_dst = num_nodes
+    if edge_weight is None:
+        edge_weight = torch.ones(edge_index.size(1), device=edge_index.device)
+    
+    adj = torch.sparse_coo_tensor(
+        edge_index.flip(0), edge_weight.float(), (num_dst, num_nodes)
+    ).coalesce()
+    
+    if layout == torch.sparse_csr:
+        return adj.to_sparse_csr()
+    return adj
+
+@torch.jit.ignore
+def sparse_matmul(adj: torch.Tensor, x: torch.Tensor) -> torch.Tensor:
+    """
+    Sparse A @ X over the node axis of [..., num_nodes, features] features.
+    
+    Leading (batch) dimensions are folded into the feature dimension, so a
+    single kernel runs per call: SpMM for CSR, scatter-based message passing
+    over the edge list for COO. Sparse kernels are not autocast-safe, so the
+    product is computed in float32 and cast back to the feature dtype.
+    
+    Args:
+        adj: Sparse adjacency [num_dst, num_nodes] (CSR or COO)
+        x: Node features [..., num_nodes, features]
+        
+    Returns:
+        Aggregated features [..., num_dst, features]
+    """
+    num_dst, num_src = adj.size(0), adj.size(1)
+    features = x.size(-1)
+    
+    with torch.autocast(device_type=x.device.type, enabled=False):
+        # [..., nodes, features] -> [nodes, batch * features]
+        h = x.float().reshape(-1, num_src, features).transpose(0, 1).reshape(num_src, -1)
+        
+        if adj.layout == torch.sparse_csr:
+            out = torch.sparse.mm(adj.float(), h)
+        else:
+            adj = adj.coalesce()
+            dst, src = adj.indices()
+            messages = h.index_select(0, src) * adj.values().float().unsqueeze(1)
+            out = h.new_zeros(num_dst, h.size(1)).index_add_(0, dst, messages)
+    
+    out = out.view(num_dst, -1, features).transpose(0, 1)
+    return out.reshape(x.shape[:-2] + (num_dst, features)).to(x.dtype)
+
+def graph_matmul(adj: torch.Tensor, x: torch.Tensor) -> torch.Tensor:
+    """
+    Aggregate node features with a dense or sparse adjacency.
+    
+    Args:
+        adj: Adjacency [num_dst, num_nodes], dense or sparse (CSR/COO)
+        x: Node features [..., num_nodes, features]
+        
+    Returns:
+        Aggregated features [..., num_dst, features] in the dtype of x
+    """
+    if adj.layout == torch.strided:
+        # Match the adjacency to the feature dtype (bf16/fp16 models or autocast)
+        return torch.matmul(adj.to(x.dtype), x)
+    return sparse_matmul(adj, x)
+
+@contextlib.contextmanager
+def preserved_buffers(module: nn.Module):
+    """Restore every buffer of a module (e.g. BatchNorm running statistics) on exit."""
+    saved = [b.detach().clone() for b in module.buffers()]
+    try:
+        yield
+    finally:
+        with torch.no_grad():
+            for buffer, value in zip(module.buffers(), saved):
+                buffer.copy_(value)
+
+def checkpoint_module(module: nn.Module, function, *args) -> torch.Tensor:
+    """
+    Activation checkpointing of `function(*args)` that owns `module`.
+    
+    The backward pass re-runs the forward pass; its buffer updates are
+    undone, so BatchNorm running statistics (and `num_batches_tracked`) move
+    once per step exactly as without checkpointing.
+    """
+    return checkpoint(
+        function, *args, use_reentrant=False,
+        context_fn=lambda: (contextlib.nullcontext(), preserved_buffers(module))
+    )
+
+def last_steps(x: torch.Tensor, steps: int) -> List[torch.Tensor]:
+    """
+    Last `steps` entries of the time (last) axis as a list, oldest first.
+    
+    Sequences shorter than `steps` are zero-padded on the left, like a causal
+    convolution's padding.
+    """
+    if x.size(-1) < steps:
+        x = F.pad(x, (steps - x.size(-1), 0))
+    return list(x[..., x.size(-1) - steps:].unbind(-1))
+
+def conv_step(window: List[torch.Tensor], weight: torch.Tensor,
+              bias: Optional[torch.Tensor], dilation: int = 1) -> torch.Tensor:
+    """
+    Causal convolution output at the newest step of a window, as one matmul.
+    
+    Args:
+        window: Inputs oldest first, (kernel_size - 1) * dilation + 1 tensors
+            [..., in_channels]
+        weight: Conv1d [out, in, k] or Conv2d [out, in, 1, k] weight
+        bias: Convolution bias [out] or None
+        dilation: Convolution dilation
+        
+    Returns:
+        Output of the newest step [..., out_channels]
+    """
+    # Kernel-major taps, so each step is copied as one contiguous block
+    taps = torch.stack(window[::dilation], dim=-2)  # [..., kernel_size, in_channels]
+    weight = weight.flatten(2).transpose(1, 2)  # [out, kernel_size, in]
+    return F.linear(taps.flatten(-2), weight.flatten(1), bias)
 
 class GraphConvolution(nn.Module):
     """Basic Graph Convolution layer."""
@@ -37,13 +211,15 @@ class GraphConvolution(nn.Module):
         
         Args:
             input: Node features [batch_size, n_nodes, in_features]
-            adj: Adjacency matrix [n_nodes, n_nodes]
+            adj: Adjacency matrix [n_nodes, n_nodes], or a sampled block
+                [n_dst, n_nodes] whose rows are the first n_dst input nodes;
+                dense or sparse (CSR/COO)
             
         Returns:
-            Output features [batch_size, n_nodes, out_features]
+            Output features [batch_size, n_dst, out_features]
         """
         support = torch.matmul(input, self.weight)
-        output = torch.matmul(adj, support)
+        output = graph_matmul(adj, support)
         
         if self.bias is not None:
             return output + self.bias
@@ -86,6 +262,23 @@ class TemporalConvolution(nn.Module):
             out = out[:, :, :-(self.kernel_size - 1) * self.dilation]
         
         return self.dropout(out)
+    
+    @property
+    def context(self) -> int:
+        """Past steps (besides the current one) each output depends on."""
+        return (self.kernel_size - 1) * self.dilation
+    
+    def step(self, window: List[torch.Tensor]) -> torch.Tensor:
+        """
+        Output of a single step from its receptive window.
+        
+        Args:
+            window: The last context + 1 inputs, oldest first, each [..., channels]
+            
+        Returns:
+            Output of the last step [..., out_channels]
+        """
+        return self.dropout(conv_step(window, self.conv.weight, self.conv.bias, self.dilation))
 
 class STGCNBlock(nn.Module):
     """Spatial-Temporal Graph Convolutional Network block."""
@@ -124,10 +317,27 @@ class STGCNBlock(nn.Module):
         
         Args:
             x: Input tensor [batch_size, in_channels, num_nodes, time_steps]
-            adj: Adjacency matrix [num_nodes, num_nodes]
+            adj: Adjacency matrix [num_nodes, num_nodes], or a sampled block
+                [num_dst, num_nodes] whose rows are the first num_dst nodes
+            
+        Returns:
+            Output tensor [batch_size, out_channels, num_dst, time_steps]
+        """
+        return self.encode(x, adj)[0]
+    
+    def encode(self, x: torch.Tensor, adj: torch.Tensor) -> Tuple[torch.Tensor, BlockCache]:
+        """
+        Forward pass that also returns the cache for `step`.
+        
+        Args:
+            x: Input tensor [batch_size, in_channels, num_nodes, time_steps]
+            adj: Adjacency matrix [num_nodes, num_nodes], or a sampled block
+                [num_dst, num_nodes] whose rows are the first num_dst nodes
             
         Returns:
-            Output tensor [batch_size, out_channels, num_nodes, time_steps]
+            Output tensor [batch_size, out_channels, num_dst, time_steps] and
+            the last inputs and spatial outputs of the window (zero-padded like
+            the causal convolutions)
         """
         batch_size, _, num_nodes, time_steps = x.size()
         
@@ -138,6 +348,8 @@ class STGCNBlock(nn.Module):
         x = x.permute(0, 2, 1, 3).contiguous()  # [batch, nodes, channels, time]
         x = x.view(batch_size * num_nodes, -1, time_steps)  # [batch*nodes, channels, time]
         
+        input_cache = [h.view(batch_size, num_nodes, -1) for h in last_steps(x, self.temporal1.context)]
+        
         # First temporal convolution
         x = self.temporal1(x)  # [batch*nodes, out_channels, time]
         
@@ -150,11 +362,17 @@ class STGCNBlock(nn.Module):
         # Spatial convolution
         x = F.relu(self.spatial(x, adj))  # [batch*time, nodes, spatial_channels]
         
+        # Sampled blocks shrink the node set to the destination nodes
+        num_nodes = x.size(1)
+        residual = residual[:, :, :num_nodes]
+        
         # Reshape back for temporal convolution
         x = x.view(batch_size, time_steps, num_nodes, -1)  # [batch, time, nodes, channels]
         x = x.permute(0, 2, 3, 1).contiguous()  # [batch, nodes, channels, time]
         x = x.view(batch_size * num_nodes, -1, time_steps)  # [batch*nodes, channels, time]
         
+        spatial_cache = [h.view(batch_size, num_nodes, -1) for h in last_steps(x, self.temporal2.context)]
+        
         # Second temporal convolution
         x = self.temporal2(x)  # [batch*nodes, out_channels, time]
         
@@ -167,13 +385,167 @@ class STGCNBlock(nn.Module):
         x = self.bn(x)
         x = F.relu(x + residual)
         
-        return x
+        return x, (input_cache, spatial_cache)
+    
+    def step(self, x: torch.Tensor, adj: torch.Tensor,
+             cache: BlockCache) -> Tuple[torch.Tensor, BlockCache]:
+        """
+        Advance the block by one time step.
+        
+        Args:
+            x: Input of the new step [batch_size, num_nodes, in_channels]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            cache: Last inputs and spatial outputs from `encode` or a previous step
+            
+        Returns:
+            Output of the new step [batch_size, num_nodes, out_channels] and updated cache
+        """
+        input_cache, spatial_cache = cache
+        
+        if self.residual is None:
+            residual = x
+        else:
+            residual = F.linear(x, self.residual.weight.flatten(1), self.residual.bias)
+        
+        window = input_cache + [x]
+        h = F.relu(self.spatial(self.temporal1.step(window), adj))  # [batch, nodes, spatial_channels]
+        
+        spatial_window = spatial_cache + [h]
+        h = self.temporal2.step(spatial_window)  # [batch, nodes, out_channels]
+        
+        # Batch normalization over channels: [batch, channels, nodes, 1]
+        h = self.bn(h.transpose(1, 2).unsqueeze(-1)).squeeze(-1).transpose(1, 2)
+        
+        return F.relu(h + residual), (window[1:], spatial_window[1:])
+
+class FusedSTGCNBlock(nn.Module):
+    """
+    ST-GCN "sandwich" block that stays in the [batch, channels, nodes, time] layout.
+    
+    Temporal convolutions are Conv2d with (1, k) kernels, the first one
+    GLU-gated as in the original ST-GCN, and the graph convolution is a 1x1
+    channel projection followed by aggregation over the node axis, so no
+    permuted copies are made. Convolutions are unpadded (valid), so each block
+    shortens the sequence by 2 * (kernel_size - 1) steps.
+    
+    Opt-in (`stgcn_block: "fused"`): it trains in about 0.6x the memory and
+    step time of `STGCNBlock`, but the shorter readout window costs accuracy
+    (eval MSE 0.0115 vs 0.0103 in `benchmark.py --suite blocks`).
+    """
+    
+    def __init__(self, in_channels: int, spatial_channels: int,
+                 out_channels: int, num_nodes: int, kernel_size: int = 3,
+                 dropout: float = 0.1):
+        super(FusedSTGCNBlock, self).__init__()
+        
+        self.num_nodes = num_nodes
+        self.kernel_size = kernel_size
+        
+        # Temporal convolution 1: filter and gate halves for the GLU
+        self.temporal1 = nn.Conv2d(in_channels, 2 * out_channels, (1, kernel_size))
+        
+        # Spatial convolution: channel projection, then node aggregation
+        self.spatial = nn.Conv2d(out_channels, spatial_channels, 1)
+        
+        # Temporal convolution 2
+        self.temporal2 = nn.Conv2d(spatial_channels, out_channels, (1, kernel_size))
+        
+        self.bn = nn.BatchNorm2d(out_channels)
+        self.dropout = nn.Dropout(dropout)
+        
+        # Residual connection
+        if in_channels != out_channels:
+            self.residual = nn.Conv2d(in_channels, out_channels, 1)
+        else:
+            self.residual = None
+    
+    def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input tensor [batch_size, in_channels, num_nodes, time_steps]
+            adj: Adjacency matrix [num_nodes, num_nodes], or a sampled block
+                [num_dst, num_nodes] whose rows are the first num_dst nodes
+        
+        Returns:
+            Output tensor [batch_size, out_channels, num_dst, time_steps - 2 * (kernel_size - 1)]
+        """
+        return self.encode(x, adj)[0]
+    
+    def encode(self, x: torch.Tensor, adj: torch.Tensor) -> Tuple[torch.Tensor, BlockCache]:
+        """
+        Forward pass that also returns the cache for `step`.
+        
+        Args:
+            x: Input tensor [batch_size, in_channels, num_nodes, time_steps]
+            adj: Adjacency matrix [num_nodes, num_nodes], or a sampled block
+                [num_dst, num_nodes] whose rows are the first num_dst nodes
+        
+        Returns:
+            Output tensor as in `forward` and the last kernel_size - 1 inputs
+            and spatial outputs of the window
+        """
+        # Residual aligned with the last output steps
+        residual = x if self.residual is None else self.residual(x)
+        residual = residual[..., 2 * (self.kernel_size - 1):]
+        
+        input_cache = [h.transpose(1, 2) for h in last_steps(x, self.kernel_size - 1)]
+        x = F.glu(self.temporal1(x), dim=1)
+        
+        # [batch, channels, nodes, time] is already [..., nodes, features] for graph_matmul
+        x = F.relu(graph_matmul(adj, self.spatial(x)))
+        spatial_cache = [h.transpose(1, 2) for h in last_steps(x, self.kernel_size - 1)]
+        
+        # Sampled blocks shrink the node set to the destination nodes
+        residual = residual[:, :, :x.size(2)]
+        
+        x = self.bn(self.temporal2(x))
+        
+        return self.dropout(F.relu(x + residual)), (input_cache, spatial_cache)
+    
+    def step(self, x: torch.Tensor, adj: torch.Tensor,
+             cache: BlockCache) -> Tuple[torch.Tensor, BlockCache]:
+        """
+        Advance the block by one time step.
+        
+        With valid convolutions this equals `forward` on the shifted window.
+        
+        Args:
+            x: Input of the new step [batch_size, num_nodes, in_channels]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            cache: Last kernel_size - 1 inputs and spatial outputs from
+                `encode` or a previous step
+        
+        Returns:
+            Output of the new step [batch_size, num_nodes, out_channels] and updated cache
+        """
+        input_cache, spatial_cache = cache
+        
+        if self.residual is None:
+            residual = x
+        else:
+            residual = F.linear(x, self.residual.weight.flatten(1), self.residual.bias)
+        
+        # Channel-last, so the graph aggregation is one matmul per sample
+        window = input_cache + [x]
+        h = F.glu(conv_step(window, self.temporal1.weight, self.temporal1.bias), dim=-1)
+        h = F.relu(graph_matmul(adj, F.linear(h, self.spatial.weight.flatten(1), self.spatial.bias)))
+        
+        spatial_window = spatial_cache + [h]
+        h = conv_step(spatial_window, self.temporal2.weight, self.temporal2.bias)
+        
+        # Batch normalization over channels: [batch, channels, nodes, 1]
+        h = self.bn(h.transpose(1, 2).unsqueeze(-1)).squeeze(-1).transpose(1, 2)
+        
+        return self.dropout(F.relu(h + residual)), (window[1:], spatial_window[1:])
 
 class STGCN(nn.Module):
     """Spatial-Temporal Graph Convolutional Network for traffic prediction."""
     
     def __init__(self, num_nodes: int, num_features: int, num_timesteps_input: int,
-                 num_timesteps_output: int, hidden_dim: int = 64, num_layers: int = 2):
+                 num_timesteps_output: int, hidden_dim: int = 64, num_layers: int = 2,
+                 block: str = 'standard', gradient_checkpointing: bool = False):
         super(STGCN, self).__init__()
         
         self.num_nodes = num_nodes
@@ -181,33 +553,54 @@ class STGCN(nn.Module):
         self.num_timesteps_input = num_timesteps_input
         self.num_timesteps_output = num_timesteps_output
         
+        # Recompute block activations in the backward pass instead of storing them
+        self.gradient_checkpointing = gradient_checkpointing
+        
+        if block == 'standard':
+            block_cls = STGCNBlock
+        elif block == 'fused':
+            block_cls = FusedSTGCNBlock
+        else:
+            raise ValueError(f"Unknown ST-GCN block: {block}")
+        
         # ST-GCN blocks
         self.blocks = nn.ModuleList()
         
         # First block
         self.blocks.append(
-            STGCNBlock(num_features, hidden_dim, hidden_dim, num_nodes)
+            block_cls(num_features, hidden_dim, hidden_dim, num_nodes)
         )
         
         # Hidden blocks
         for _ in range(num_layers - 1):
             self.blocks.append(
-                STGCNBlock(hidden_dim, hidden_dim, hidden_dim, num_nodes)
+                block_cls(hidden_dim, hidden_dim, hidden_dim, num_nodes)
+            )
+        
+        # Fused blocks use unpadded convolutions and shorten the sequence
+        remaining_steps = num_timesteps_input
+        if block == 'fused':
+            remaining_steps -= sum(2 * (b.kernel_size - 1) for b in self.blocks)
+        if remaining_steps < 1:
+            raise ValueError(
+                f"{num_layers} fused ST-GCN blocks need more than "
+                f"{num_timesteps_input - remaining_steps} input steps, got {num_timesteps_input}"
             )
         
         # Output layer
         self.output_layer = nn.Conv2d(
             hidden_dim, num_timesteps_output, 
-            kernel_size=(1, num_timesteps_input)
+            kernel_size=(1, remaining_steps)
         )
         
-    def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+    def forward(self, x: torch.Tensor, adj: Adjacency) -> torch.Tensor:
         """
         Forward pass.
         
         Args:
             x: Input tensor [batch_size, num_timesteps_input, num_nodes, num_features]
-            adj: Adjacency matrix [num_nodes, num_nodes]
+            adj: Adjacency matrix [num_nodes, num_nodes], or one sampled block
+                per ST-GCN block
             
         Returns:
             Output tensor [batch_size, num_timesteps_output, num_nodes, 1]
@@ -216,8 +609,12 @@ class STGCN(nn.Module):
         x = x.permute(0, 3, 2, 1).contiguous()
         
         # Apply ST-GCN blocks
-        for block in self.blocks:
-            x = block(x, adj)
+        for i, block in enumerate(self.blocks):
+            block_adj = select_adjacency(adj, i, len(self.blocks))
+            if not torch.jit.is_scripting() and self.gradient_checkpointing and self.training:
+                x = checkpoint_module(block, block, x, block_adj)
+            else:
+                x = block(x, block_adj)
         
         # Output layer
         x = self.output_layer(x)  # [batch, num_timesteps_output, nodes, 1]
@@ -226,6 +623,62 @@ class STGCN(nn.Module):
         x = x.permute(0, 1, 2, 3).contiguous()
         
         return x
+    
+    def encode(self, x: torch.Tensor, adj: torch.Tensor) -> RolloutState:
+        """
+        Run the history window once and cache what `advance` needs.
+        
+        Args:
+            x: Input tensor [batch_size, num_timesteps_input, num_nodes, num_features]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            
+        Returns:
+            Rollout state: per-block convolution caches and the last block
+            outputs read by the output layer ([batch, nodes, hidden_dim] each)
+        """
+        x = x.permute(0, 3, 2, 1).contiguous()
+        
+        caches = []
+        for block in self.blocks:
+            x, cache = block.encode(x, adj)
+            caches.append(cache)
+        
+        features = [h.transpose(1, 2).contiguous() for h in x.unbind(-1)]
+        return {'caches': caches, 'features': features}
+    
+    def advance(self, x: torch.Tensor, adj: torch.Tensor, state: RolloutState) -> RolloutState:
+        """
+        Consume one new time step; no block reprocesses the history window.
+        
+        Args:
+            x: Input of the new step [batch_size, num_nodes, num_features]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            state: State from `encode` or a previous `advance`
+            
+        Returns:
+            Updated rollout state
+        """
+        h = x
+        caches = []
+        for block, cache in zip(self.blocks, state['caches']):
+            h, cache = block.step(h, adj, cache)
+            caches.append(cache)
+        
+        # Slide the output layer's input window by one step
+        return {'caches': caches, 'features': state['features'][1:] + [h]}
+    
+    def readout(self, state: RolloutState) -> torch.Tensor:
+        """
+        Predictions from a rollout state.
+        
+        The output layer still reads its whole input window, but that is a
+        single matmul over cached block outputs.
+        
+        Returns:
+            Output tensor [batch_size, num_timesteps_output, num_nodes, 1]
+        """
+        out = conv_step(state['features'], self.output_layer.weight, self.output_layer.bias)
+        return out.transpose(1, 2).unsqueeze(-1)
 
 class GCNLayer(nn.Module):
     """Graph Convolution Network layer."""
@@ -235,7 +688,8 @@ class GCNLayer(nn.Module):
         super(GCNLayer, self).__init__()
         
         self.linear = nn.Linear(in_features, out_features)
-        self.activation = activation
+        # Stored as a plain string so the layer stays scriptable
+        self.activation = activation or 'none'
         self.dropout = nn.Dropout(dropout)
         
     def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
@@ -244,16 +698,18 @@ class GCNLayer(nn.Module):
         
         Args:
             x: Node features [batch_size, num_nodes, in_features]
-            adj: Normalized adjacency matrix [num_nodes, num_nodes]
+            adj: Normalized adjacency matrix [num_nodes, num_nodes], or a sampled
+                block [num_dst, num_nodes] whose rows are the first num_dst nodes;
+                dense or sparse (CSR/COO)
             
         Returns:
-            Output features [batch_size, num_nodes, out_features]
+            Output features [batch_size, num_dst, out_features]
         """
         # Linear transformation
         x = self.linear(x)
         
         # Graph convolution: AXW
-        x = torch.matmul(adj, x)
+        x = graph_matmul(adj, x)
         
         # Activation
         if self.activation == 'relu':
@@ -270,10 +726,11 @@ class SimpleGCN(nn.Module):
     """Simple Graph Convolutional Network for traffic prediction."""
     
     def __init__(self, num_nodes: int, input_dim: int, hidden_dims: List[int],
-                 output_dim: int, dropout: float = 0.1):
+                 output_dim: int, dropout: float = 0.1, gradient_checkpointing: bool = False):
         super(SimpleGCN, self).__init__()
         
         self.num_nodes = num_nodes
+        self.gradient_checkpointing = gradient_checkpointing
         self.layers = nn.ModuleList()
         
         # Input layer
@@ -289,81 +746,243 @@ class SimpleGCN(nn.Module):
             GCNLayer(prev_dim, output_dim, activation=None, dropout=0.0)
         )
         
-    def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+    def forward(self, x: torch.Tensor, adj: Adjacency) -> torch.Tensor:
         """
         Forward pass.
         
         Args:
             x: Input features [batch_size, num_nodes, input_dim]
-            adj: Adjacency matrix [num_nodes, num_nodes]
+            adj: Adjacency matrix [num_nodes, num_nodes], or one sampled block
+                per GCN layer
             
         Returns:
             Output [batch_size, num_nodes, output_dim]
         """
-        for layer in self.layers:
-            x = layer(x, adj)
+        for i, layer in enumerate(self.layers):
+            layer_adj = select_adjacency(adj, i, len(self.layers))
+            if not torch.jit.is_scripting() and self.gradient_checkpointing and self.training:
+                x = checkpoint_module(layer, layer, x, layer_adj)
+            else:
+                x = layer(x, layer_adj)
         
         return x
 
+class FusedGRU(nn.Module):
+    """
+    Single-layer GRU without cuDNN.
+    
+    Input-to-hidden gates of all time steps are computed in one matmul up
+    front; each step then needs one fused hidden-to-hidden matmul. Gate
+    layout (reset, update, candidate) matches `nn.GRU`.
+    """
+    
+    def __init__(self, input_dim: int, hidden_dim: int):
+        super(FusedGRU, self).__init__()
+        
+        self.hidden_dim = hidden_dim
+        self.input_proj = nn.Linear(input_dim, 3 * hidden_dim)
+        self.hidden_proj = nn.Linear(hidden_dim, 3 * hidden_dim)
+        
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, time_steps, input_dim]
+            
+        Returns:
+            Last hidden state [batch_size, hidden_dim]
+        """
+        # Reset/update/candidate input gates for every step: [batch, time, 3*hidden]
+        input_gates = self.input_proj(x)
+        h = x.new_zeros(x.size(0), self.hidden_dim)
+        
+        for t in range(x.size(1)):
+            h = self.cell(input_gates[:, t], h)
+        
+        return h
+    
+    def cell(self, gx: torch.Tensor, h: torch.Tensor) -> torch.Tensor:
+        """
+        One recurrent step.
+        
+        Args:
+            gx: Input gates of the step [batch_size, 3 * hidden_dim]
+            h: Hidden state [batch_size, hidden_dim]
+            
+        Returns:
+            Next hidden state [batch_size, hidden_dim]
+        """
+        gh = self.hidden_proj(h)
+        reset, update = torch.sigmoid(
+            gx[:, :2 * self.hidden_dim] + gh[:, :2 * self.hidden_dim]
+        ).chunk(2, dim=-1)
+        candidate = torch.tanh(gx[:, 2 * self.hidden_dim:] + reset * gh[:, 2 * self.hidden_dim:])
+        return (1 - update) * candidate + update * h
+
+class TemporalConvHead(nn.Module):
+    """Residual stack of dilated causal convolutions covering the input sequence."""
+    
+    def __init__(self, channels: int, sequence_length: int, kernel_size: int = 3,
+                 dropout: float = 0.1):
+        super(TemporalConvHead, self).__init__()
+        
+        # Double the dilation until the receptive field spans the sequence
+        self.layers = nn.ModuleList()
+        receptive_field, dilation = 1, 1
+        while receptive_field < sequence_length:
+            self.layers.append(
+                TemporalConvolution(channels, channels, kernel_size, dilation=dilation, dropout=dropout)
+            )
+            receptive_field += (kernel_size - 1) * dilation
+            dilation *= 2
+        
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, time_steps, channels]
+            
+        Returns:
+            Features of the last time step [batch_size, channels]
+        """
+        h = x.transpose(1, 2)  # [batch, channels, time]
+        for layer in self.layers:
+            h = F.relu(layer(h)) + h
+        
+        return h[:, :, -1]
+    
+    def encode(self, x: torch.Tensor) -> Tuple[torch.Tensor, List[List[torch.Tensor]]]:
+        """
+        Forward pass that also returns the inputs each layer needs for `step`.
+        
+        Args:
+            x: Input sequences [batch_size, time_steps, channels]
+            
+        Returns:
+            Features of the last time step [batch_size, channels] and, per
+            layer, its last `context` inputs [batch_size, channels], oldest first
+        """
+        h = x.transpose(1, 2)
+        buffers = []
+        for layer in self.layers:
+            buffers.append(last_steps(h, layer.context))
+            h = F.relu(layer(h)) + h
+        
+        return h[:, :, -1], buffers
+    
+    def step(self, x: torch.Tensor,
+             buffers: List[List[torch.Tensor]]) -> Tuple[torch.Tensor, List[List[torch.Tensor]]]:
+        """
+        Advance every layer by one time step.
+        
+        Args:
+            x: Features of the new step [batch_size, channels]
+            buffers: Per-layer inputs from `encode` or a previous `step`
+            
+        Returns:
+            Features of the new step [batch_size, channels] and updated buffers
+        """
+        h = x
+        new_buffers = []
+        for layer, buffer in zip(self.layers, buffers):
+            window = buffer + [h]
+            new_buffers.append(window[1:])
+            h = F.relu(layer.step(window)) + h
+        
+        return h, new_buffers
+
 class TemporalGCN(nn.Module):
     """Temporal GCN that processes sequences of graph data."""
     
     def __init__(self, num_nodes: int, input_dim: int, hidden_dim: int,
-                 output_dim: int, sequence_length: int, prediction_horizon: int):
+                 output_dim: int, sequence_length: int, prediction_horizon: int,
+                 temporal_head: str = 'lstm', gradient_checkpointing: bool = False):
         super(TemporalGCN, self).__init__()
         
         self.num_nodes = num_nodes
         self.sequence_length = sequence_length
         self.prediction_horizon = prediction_horizon
+        self.temporal_head = temporal_head
+        
+        # Recompute each GCN layer and the temporal stage in the backward pass
+        self.gradient_checkpointing = gradient_checkpointing
         
-        # GCN for each time step
+        # GCN shared across time steps
         self.gcn = SimpleGCN(
-            num_nodes, input_dim, [hidden_dim, hidden_dim], hidden_dim
+            num_nodes, input_dim, [hidden_dim, hidden_dim], hidden_dim,
+            gradient_checkpointing=gradient_checkpointing
         )
         
-        # LSTM for temporal modeling
-        self.lstm = nn.LSTM(
-            hidden_dim, hidden_dim, batch_first=True
-        )
+        # Temporal modeling: LSTM, fused GRU or dilated temporal convolutions
+        self.lstm = None
+        self.gru = None
+        self.temporal_conv = None
+        if temporal_head == 'lstm':
+            self.lstm = nn.LSTM(
+                hidden_dim, hidden_dim, batch_first=True
+            )
+        elif temporal_head == 'gru':
+            self.gru = FusedGRU(hidden_dim, hidden_dim)
+        elif temporal_head == 'conv':
+            self.temporal_conv = TemporalConvHead(hidden_dim, sequence_length)
+        else:
+            raise ValueError(f"Unknown temporal head: {temporal_head}")
         
         # Output projection
         self.output_proj = nn.Linear(hidden_dim, output_dim * prediction_horizon)
         
-    def forward(self, x: torch.Tensor, adj: torch.Tensor) -> torch.Tensor:
+    def temporal_stage(self, temporal_input: torch.Tensor) -> torch.Tensor:
+        """
+        Run the temporal head over per-node sequences.
+        
+        Args:
+            temporal_input: GCN features [batch*nodes, seq_len, hidden_dim]
+            
+        Returns:
+            Last temporal state [batch*nodes, hidden_dim]
+        """
+        if self.lstm is not None:
+            lstm_out, _ = self.lstm(temporal_input)
+            return lstm_out[:, -1, :]
+        elif self.gru is not None:
+            return self.gru(temporal_input)
+        else:
+            assert self.temporal_conv is not None
+            return self.temporal_conv(temporal_input)
+        
+    def forward(self, x: torch.Tensor, adj: Adjacency) -> torch.Tensor:
         """
         Forward pass.
         
         Args:
             x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
-            adj: Adjacency matrix [num_nodes, num_nodes]
+            adj: Adjacency matrix [num_nodes, num_nodes], or one sampled block
+                per GCN layer (predictions then cover the seed nodes only)
             
         Returns:
             Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
         """
         batch_size, seq_len, num_nodes, input_dim = x.size()
         
-        # Process each time step with GCN
-        gcn_outputs = []
-        for t in range(seq_len):
-            # x_t: [batch_size, num_nodes, input_dim]
-            x_t = x[:, t, :, :]
-            gcn_out = self.gcn(x_t, adj)  # [batch_size, num_nodes, hidden_dim]
-            gcn_outputs.append(gcn_out)
+        # Spatial pass over all time steps at once: [batch*seq_len, nodes, input_dim]
+        gcn_out = self.gcn(x.reshape(batch_size * seq_len, num_nodes, input_dim), adj)
         
-        # Stack temporal outputs: [batch_size, seq_len, num_nodes, hidden_dim]
-        gcn_sequence = torch.stack(gcn_outputs, dim=1)
+        # Sampled blocks shrink the node set to the seed nodes
+        num_nodes, hidden_dim = gcn_out.size(1), gcn_out.size(2)
+        gcn_sequence = gcn_out.view(batch_size, seq_len, num_nodes, hidden_dim)
         
-        # Process with LSTM (treat each node independently)
-        batch_size, seq_len, num_nodes, hidden_dim = gcn_sequence.size()
-        
-        # Reshape for LSTM: [batch_size * num_nodes, seq_len, hidden_dim]
-        lstm_input = gcn_sequence.view(batch_size * num_nodes, seq_len, hidden_dim)
-        
-        # LSTM forward
-        lstm_out, _ = self.lstm(lstm_input)  # [batch*nodes, seq_len, hidden_dim]
+        # Per-node sequences: [batch_size * num_nodes, seq_len, hidden_dim]
+        temporal_input = gcn_sequence.permute(0, 2, 1, 3).reshape(
+            batch_size * num_nodes, seq_len, hidden_dim
+        )
         
-        # Take last output: [batch*nodes, hidden_dim]
-        last_output = lstm_out[:, -1, :]
+        # Last temporal state: [batch*nodes, hidden_dim]
+        if not torch.jit.is_scripting() and self.gradient_checkpointing and self.training:
+            last_output = checkpoint_module(self, self.temporal_stage, temporal_input)
+        else:
+            last_output = self.temporal_stage(temporal_input)
         
         # Output projection: [batch*nodes, output_dim * prediction_horizon]
         predictions = self.output_proj(last_output)
@@ -375,30 +994,156 @@ class TemporalGCN(nn.Module):
         predictions = predictions.permute(0, 2, 1, 3).contiguous()
         
         return predictions
+    
+    def encode(self, x: torch.Tensor, adj: torch.Tensor) -> RolloutState:
+        """
+        Run the history window once and cache the temporal state for `advance`.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            
+        Returns:
+            Rollout state: last temporal output per node and the head's
+            recurrent state (LSTM (h, c), GRU h or per-layer conv inputs)
+        """
+        batch_size, seq_len, num_nodes, input_dim = x.size()
+        
+        gcn_out = self.gcn(x.reshape(batch_size * seq_len, num_nodes, input_dim), adj)
+        temporal_input = gcn_out.view(batch_size, seq_len, num_nodes, -1).permute(0, 2, 1, 3).reshape(
+            batch_size * num_nodes, seq_len, -1
+        )
+        
+        if self.lstm is not None:
+            lstm_out, hidden = self.lstm(temporal_input)
+            last_output = lstm_out[:, -1, :]
+        elif self.gru is not None:
+            last_output = hidden = self.gru(temporal_input)
+        else:
+            last_output, hidden = self.temporal_conv.encode(temporal_input)
+        
+        return {'last_output': last_output, 'hidden': hidden, 'batch_size': batch_size}
+    
+    def advance(self, x: torch.Tensor, adj: torch.Tensor, state: RolloutState) -> RolloutState:
+        """
+        Consume one new time step at O(1) cost in the history length.
+        
+        Args:
+            x: Input of the new step [batch_size, num_nodes, input_dim]
+            adj: Full adjacency matrix [num_nodes, num_nodes]
+            state: State from `encode` or a previous `advance`
+            
+        Returns:
+            Updated rollout state
+        """
+        # The GCN is applied per time step, so only the new step is needed
+        frame = self.gcn(x, adj).reshape(x.size(0) * x.size(1), -1)  # [batch*nodes, hidden_dim]
+        
+        if self.lstm is not None:
+            lstm_out, hidden = self.lstm(frame.unsqueeze(1), state['hidden'])
+            last_output = lstm_out[:, -1, :]
+        elif self.gru is not None:
+            last_output = hidden = self.gru.cell(self.gru.input_proj(frame), state['hidden'])
+        else:
+            last_output, hidden = self.temporal_conv.step(frame, state['hidden'])
+        
+        return {'last_output': last_output, 'hidden': hidden, 'batch_size': state['batch_size']}
+    
+    def readout(self, state: RolloutState) -> torch.Tensor:
+        """
+        Predictions from a rollout state.
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        predictions = self.output_proj(state['last_output'])
+        predictions = predictions.view(state['batch_size'], -1, self.prediction_horizon,
+                                       predictions.size(-1) // self.prediction_horizon)
+        return predictions.permute(0, 2, 1, 3).contiguous()
+
+class SIGN(nn.Module):
+    """
+    Decoupled SIGN-style model trained on precomputed propagated features.
+    
+    The graph propagation A^k X is done offline (see `graph.propagation`), so
+    the forward pass only contains per-hop projections and temporal modeling.
+    """
+    
+    def __init__(self, num_nodes: int, input_dim: int, num_hops: int, hidden_dim: int,
+                 output_dim: int, prediction_horizon: int, dropout: float = 0.1):
+        super(SIGN, self).__init__()
+        
+        self.num_nodes = num_nodes
+        self.num_hops = num_hops
+        self.prediction_horizon = prediction_horizon
+        
+        # One projection per hop (hop 0 is the raw input)
+        self.hop_proj = nn.ModuleList([
+            nn.Linear(input_dim, hidden_dim) for _ in range(num_hops + 1)
+        ])
+        self.combine = nn.Linear((num_hops + 1) * hidden_dim, hidden_dim)
+        self.dropout = nn.Dropout(dropout)
+        
+        # LSTM for temporal modeling
+        self.lstm = nn.LSTM(hidden_dim, hidden_dim, batch_first=True)
+        
+        # Output projection
+        self.output_proj = nn.Linear(hidden_dim, output_dim * prediction_horizon)
+        
+    def forward(self, x: torch.Tensor, adj: Optional[Adjacency] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Hop-concatenated features [batch_size, seq_len, num_nodes, (num_hops+1)*input_dim]
+            adj: Unused, accepted for interface compatibility with the graph models
+            
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        hops = x.chunk(self.num_hops + 1, dim=-1)
+        
+        # Project every hop and merge: [batch, seq_len, nodes, hidden_dim]
+        h = torch.cat([F.relu(proj(hops[i])) for i, proj in enumerate(self.hop_proj)], dim=-1)
+        h = F.relu(self.combine(self.dropout(h)))
+        
+        # Run LSTM per node: [batch*nodes, seq_len, hidden_dim]
+        batch_size, seq_len, num_nodes, hidden_dim = h.size()
+        h = h.permute(0, 2, 1, 3).reshape(batch_size * num_nodes, seq_len, hidden_dim)
+        lstm_out, _ = self.lstm(h)
+        
+        predictions = self.output_proj(lstm_out[:, -1, :])
+        predictions = predictions.view(batch_size, num_nodes, self.prediction_horizon, -1)
+        
+        return predictions.permute(0, 2, 1, 3).contiguous()
 
 def create_model(model_type: str, config: dict) -> nn.Module:
     """
     Factory function to create models.
     
     Args:
-        model_type: Type of model ('stgcn', 'simple_gcn', 'temporal_gcn')
+        model_type: Type of model ('stgcn', 'simple_gcn', 'temporal_gcn', 'sign', 'dcrnn',
+            'graphwavenet', or the baselines 'historical_average', 'seasonal_naive',
+            'ridge', 'lstm')
         config: Model configuration dictionary
         
     Returns:
-        Initialized model
+        Initialized model (compiled if config['compile'] is 'compile' or 'script')
     """
     if model_type == 'stgcn':
-        return STGCN(
+        model = STGCN(
             num_nodes=config['num_nodes'],
             num_features=config['num_features'],
             num_timesteps_input=config['sequence_length'],
             num_timesteps_output=config['prediction_horizon'],
             hidden_dim=config.get('hidden_dim', 64),
-            num_layers=config.get('num_layers', 2)
+            num_layers=config.get('num_layers', 2),
+            block=config.get('stgcn_block', 'standard'),
+            gradient_checkpointing=config.get('gradient_checkpointing', False)
         )
     
     elif model_type == 'simple_gcn':
-        return SimpleGCN(
+        model = SimpleGCN(
             num_nodes=config['num_nodes'],
             input_dim=config['input_dim'],
             hidden_dims=config.get('hidden_dims', [64, 64]),
@@ -407,17 +1152,223 @@ def create_model(model_type: str, config: dict) -> nn.Module:
         )
     
     elif model_type == 'temporal_gcn':
-        return TemporalGCN(
+        model = TemporalGCN(
             num_nodes=config['num_nodes'],
             input_dim=config['input_dim'],
             hidden_dim=config.get('hidden_dim', 64),
             output_dim=config['output_dim'],
             sequence_length=config['sequence_length'],
-            prediction_horizon=config['prediction_horizon']
+            prediction_horizon=config['prediction_horizon'],
+            temporal_head=config.get('temporal_head', 'lstm'),
+            gradient_checkpointing=config.get('gradient_checkpointing', False)
+        )
+    
+    elif model_type == 'sign':
+        model = SIGN(
+            num_nodes=config['num_nodes'],
+            input_dim=config['input_dim'],
+            num_hops=config.get('num_hops', 3),
+            hidden_dim=config.get('hidden_dim', 64),
+            output_dim=config['output_dim'],
+            prediction_horizon=config['prediction_horizon'],
+            dropout=config.get('dropout', 0.1)
+        )
+    
+    elif model_type == 'dcrnn':
+        from .dcrnn import DCRNN
+        model = DCRNN(
+            num_nodes=config['num_nodes'],
+            input_dim=config['input_dim'],
+            hidden_dim=config.get('hidden_dim', 64),
+            output_dim=config['output_dim'],
+            sequence_length=config['sequence_length'],
+            prediction_horizon=config['prediction_horizon'],
+            num_layers=config.get('num_layers', 2),
+            max_diffusion_step=config.get('max_diffusion_step', 2),
+            cl_decay_steps=config.get('cl_decay_steps', 2000),
+            use_curriculum_learning=config.get('use_curriculum_learning', True)
+        )
+    
+    elif model_type == 'graphwavenet':
+        from .graphwavenet import GraphWaveNet
+        model = GraphWaveNet(
+            num_nodes=config['num_nodes'],
+            input_dim=config['input_dim'],
+            output_dim=config['output_dim'],
+            prediction_horizon=config['prediction_horizon'],
+            residual_channels=config.get('hidden_dim', 32),
+            skip_channels=config.get('skip_channels', 256),
+            end_channels=config.get('end_channels', 512),
+            num_blocks=config.get('num_blocks', 4),
+            layers_per_block=config.get('layers_per_block', 2),
+            adaptive_rank=config.get('adaptive_rank', 10),
+            adaptive_top_k=config.get('adaptive_top_k'),
+            use_fixed_supports=config.get('use_fixed_supports', True),
+            dropout=config.get('dropout', 0.3)
+        )
+    
+    elif model_type == 'historical_average':
+        from .baselines import HistoricalAverage
+        model = HistoricalAverage(
+            num_nodes=config['num_nodes'],
+            output_dim=config['output_dim']
+        )
+    
+    elif model_type == 'seasonal_naive':
+        from .baselines import SeasonalNaive
+        model = SeasonalNaive(season=config.get('season', 288))
+    
+    elif model_type == 'ridge':
+        from .baselines import NodeRidge
+        model = NodeRidge(
+            num_nodes=config['num_nodes'],
+            input_dim=config['input_dim'],
+            output_dim=config['output_dim'],
+            prediction_horizon=config['prediction_horizon'],
+            num_lags=min(config.get('num_lags', 12), config['sequence_length']),
+            alpha=config.get('ridge_alpha', 1.0)
+        )
+    
+    elif model_type == 'lstm':
+        from .baselines import SharedLSTM
+        model = SharedLSTM(
+            input_dim=config['input_dim'],
+            hidden_dim=config.get('hidden_dim', 64),
+            output_dim=config['output_dim'],
+            prediction_horizon=config['prediction_horizon'],
+            num_layers=config.get('num_layers', 1),
+            dropout=config.get('dropout', 0.0)
         )
     
     else:
         raise ValueError(f"Unknown model type: {model_type}")
+    
+    # Opt-in compilation ('compile', 'script'); eager by default
+    if config.get('compile'):
+        model = compile_model(
+            model, config['compile'],
+            example_inputs=example_inputs(model_type, config),
+            backend=config.get('compile_backend', 'inductor')
+        )
+    
+    return model
+
+def example_inputs(model_type: str, config: dict, batch_size: int = 2,
+                   device: Union[str, torch.device] = 'cpu') -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Random (x, adj) inputs with the layout a model type expects.
+    
+    Args:
+        model_type: Type of model
+        config: Model configuration dictionary
+        batch_size: Batch size
+        device: Device of the tensors
+        
+    Returns:
+        Tuple of (inputs, row-normalized adjacency [num_nodes, num_nodes])
+    """
+    num_nodes = config['num_nodes']
+    seq_len = config['sequence_length']
+    
+    if model_type == 'stgcn':
+        shape = (batch_size, seq_len, num_nodes, config['num_features'])
+    elif model_type == 'simple_gcn':
+        shape = (batch_size, num_nodes, config['input_dim'])
+    elif model_type == 'sign':
+        hops = config.get('num_hops', 3) + 1
+        shape = (batch_size, seq_len, num_nodes, hops * config['input_dim'])
+    else:
+        shape = (batch_size, seq_len, num_nodes, config['input_dim'])
+    
+    adj = torch.rand(num_nodes, num_nodes, device=device)
+    return torch.randn(shape, device=device), adj / adj.sum(dim=1, keepdim=True)
+
+def unwrap_model(model: nn.Module) -> nn.Module:
+    """Original module of a `torch.compile` wrapper (state dicts are saved unwrapped)."""
+    return getattr(model, '_orig_mod', model)
+
+def warm_up(compiled: nn.Module, model: nn.Module, example_inputs: Tuple[torch.Tensor, ...]):
+    """
+    Run one forward pass of a compiled model without side effects on its state.
+    
+    The pass runs in the current train/eval mode with grad enabled, so the
+    training graph is what gets compiled; buffers (BatchNorm running
+    statistics, `num_batches_tracked`) are restored afterwards.
+    """
+    with preserved_buffers(model):
+        compiled(*example_inputs)
+
+def compile_model(model: nn.Module, mode: str = 'compile',
+                  example_inputs: Optional[Tuple[torch.Tensor, ...]] = None,
+                  backend: str = 'inductor') -> nn.Module:
+    """
+    Compile a model, falling back to TorchScript and then to eager mode.
+    
+    `torch.compile` is lazy, so with example inputs a warm-up forward pass
+    (grad enabled, current train/eval mode, buffers restored afterwards) is
+    run to surface compiler errors here instead of in the first training step.
+    
+    Args:
+        model: Model to compile
+        mode: 'compile' (torch.compile, TorchScript fallback), 'script'
+            (TorchScript only) or 'none'
+        example_inputs: Optional (x, adj) used for the warm-up pass
+        backend: torch.compile backend
+        
+    Returns:
+        Compiled model, or the original model if compilation failed
+    """
+    if mode in (None, 'none'):
+        return model
+    if mode not in ('compile', 'script'):
+        raise ValueError(f"Unknown compile mode: {mode}")
+    
+    if mode == 'compile':
+        try:
+            compiled = torch.compile(model, backend=backend)
+            if example_inputs is not None:
+                warm_up(compiled, model, example_inputs)
+            return compiled
+        except Exception as e:
+            torch._dynamo.reset()
+            warnings.warn(f"torch.compile failed ({type(e).__name__}: {e}); trying TorchScript")
+    
+    try:
+        scripted = torch.jit.script(model)
+        if example_inputs is not None:
+            warm_up(scripted, scripted, example_inputs)
+        return scripted
+    except Exception as e:
+        warnings.warn(f"TorchScript failed ({type(e).__name__}: {e}); running eager")
+        return model
+
+def explain_graph_breaks(model: nn.Module, example_inputs: Tuple[torch.Tensor, ...]) -> Dict:
+    """
+    Trace a model with TorchDynamo and report graph breaks.
+    
+    Args:
+        model: Eager model
+        example_inputs: (x, adj) passed to the forward pass
+        
+    Returns:
+        Dictionary with graph count, graph break count, op count and one
+        "reason (file:line)" string per break
+    """
+    explanation = torch._dynamo.explain(unwrap_model(model))(*example_inputs)
+    
+    reasons = []
+    for reason in explanation.break_reasons:
+        frame = reason.user_stack[-1] if reason.user_stack else None
+        location = f" ({frame.filename}:{frame.lineno})" if frame is not None else ''
+        reasons.append(f"{reason.reason}{location}")
+    
+    return {
+        'graph_count': explanation.graph_count,
+        'graph_break_count': explanation.graph_break_count,
+        'op_count': explanation.op_count,
+        'break_reasons': reasons
+    }
+
 
 if __name__ == "__main__":
     # Test model creation
@@ -0,0 +1,303 @@
+"""
+Baseline models for traffic prediction.
+Historical average, seasonal naive, per-node ridge autoregression fitted in
+closed form and a shared-weight LSTM, all vectorized over roads.
+"""
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn as nn
+from typing import Dict, Optional
+
+from . import Adjacency
+
+# Hour-of-week profile slots, as grouped by `calculate_historical_stats`
+NUM_SLOTS = 7 * 24
+
+# Fitted lookup models: no parameters, and predictions need the target time
+# steps, so they are evaluated directly instead of through the trainer
+LOOKUP_BASELINES = ['historical_average', 'seasonal_naive']
+
+def time_slots(timestamps: np.ndarray) -> np.ndarray:
+    """
+    Hour-of-week slot (day_of_week * 24 + hour) of every timestamp.
+    
+    Args:
+        timestamps: datetime64 or int64 (ns) timestamps
+    
+    Returns:
+        int64 slots in [0, 168), Monday 00:00 = 0
+    """
+    hours = np.asarray(timestamps).astype('datetime64[ns]').astype('datetime64[h]').astype(np.int64)
+    # 1970-01-01 was a Thursday (day_of_week 3)
+    return ((hours // 24 + 3) % 7) * 24 + hours % 24
+
+class HistoricalAverage(nn.Module):
+    """Hour-of-week mean profile per road."""
+    
+    def __init__(self, num_nodes: int, output_dim: int = 1):
+        super(HistoricalAverage, self).__init__()
+        
+        self.num_nodes = num_nodes
+        self.register_buffer('profile', torch.zeros(NUM_SLOTS, num_nodes, output_dim))
+        self.register_buffer('step_slots', torch.zeros(0, dtype=torch.long))
+    
+    def fit(self, series: torch.Tensor, timestamps: np.ndarray,
+            fit_steps: Optional[int] = None) -> 'HistoricalAverage':
+        """
+        Average every (slot, road) over the fitting period.
+        
+        Args:
+            series: Target series [time_steps, num_nodes, output_dim]
+            timestamps: Timestamps of the series [time_steps]
+            fit_steps: Only the first fit_steps steps form the profile
+                (default: all); later steps can still be looked up
+        
+        Returns:
+            self
+        """
+        slots = torch.from_numpy(time_slots(timestamps)).to(series.device)
+        fit_steps = len(series) if fit_steps is None else fit_steps
+        
+        sums = torch.zeros_like(self.profile).index_add_(0, slots[:fit_steps], series[:fit_steps].float())
+        counts = torch.bincount(slots[:fit_steps], minlength=NUM_SLOTS).clamp_min(1)
+        
+        # Slots never seen in the fitting period fall back to the overall road mean
+        profile = sums / counts.view(-1, 1, 1)
+        missing = torch.bincount(slots[:fit_steps], minlength=NUM_SLOTS) == 0
+        profile[missing] = series[:fit_steps].float().mean(dim=0)
+        
+        self.profile = profile
+        self.step_slots = slots
+        return self
+    
+    def load_stats(self, stats: pd.DataFrame, node_mapping: Dict[str, int],
+                   normalization_stats: Dict[str, Dict[str, float]],
+                   column: str = 'avg_speed_mean') -> 'HistoricalAverage':
+        """
+        Use the profiles written by `TrafficAggregator.calculate_historical_stats`.
+        
+        The statistics are in raw units (km/h) while models are trained and
+        scored on normalized targets, so the profile is normalized with the
+        training statistics of the underlying feature (`avg_speed_mean` ->
+        `avg_speed`), as `normalize_features` does.
+        
+        Args:
+            stats: historical_stats.csv (road_id, hour, day_of_week, <column>)
+            node_mapping: Road id -> node index
+            normalization_stats: Per-feature {'mean', 'std'}, i.e. the
+                `normalization_stats` of the processed data's metadata
+            column: Statistic to use
+        
+        Returns:
+            self
+        
+        Raises:
+            ValueError: No normalization statistics for the column's feature
+        """
+        feature, statistic = column.rsplit('_', 1)
+        if feature not in normalization_stats:
+            raise ValueError(
+                f"No normalization statistics for '{feature}'; a raw-unit profile of "
+                f"'{column}' cannot be compared with normalized targets"
+            )
+        mean, std = normalization_stats[feature]['mean'], normalization_stats[feature]['std']
+        # A spread is only rescaled, location statistics are also shifted
+        values = stats[column].to_numpy(dtype=np.float64)
+        values = values / (std + 1e-8) if statistic == 'std' else (values - mean) / (std + 1e-8)
+        
+        node_idx = stats['road_id'].astype(str).map(node_mapping)
+        known = node_idx.notna().to_numpy()
+        slots = stats['day_of_week'].to_numpy() * 24 + stats['hour'].to_numpy()
+        
+        device = self.profile.device
+        profile = self.profile.new_full((NUM_SLOTS, self.num_nodes), float('nan'))
+        profile[torch.tensor(slots[known], dtype=torch.long, device=device),
+                torch.tensor(node_idx[known].to_numpy(), dtype=torch.long, device=device)] = torch.tensor(
+            values[known], dtype=profile.dtype, device=device
+        )
+        
+        # Missing slots fall back to the road mean, unseen roads to 0
+        road_mean = torch.nanmean(profile, dim=0).nan_to_num(0.0)
+        self.profile = torch.where(torch.isnan(profile), road_mean, profile).unsqueeze(-1)
+        return self
+    
+    def forward(self, x: torch.Tensor, adj: Optional[Adjacency] = None,
+                target_steps: Optional[torch.Tensor] = None,
+                target_slots: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences (unused, accepted for interface compatibility)
+            adj: Unused
+            target_steps: Series indices of the target steps [batch_size, prediction_horizon]
+                (only after `fit`, which records the slot of every step)
+            target_slots: Hour-of-week slots of the target steps
+                [batch_size, prediction_horizon], e.g. `time_slots(timestamps)`;
+                works with `fit` and `load_stats` profiles
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        if target_slots is None:
+            if target_steps is None:
+                raise ValueError("HistoricalAverage needs target_slots (or target_steps after fit)")
+            if len(self.step_slots) == 0:
+                raise ValueError("target_steps needs a profile from fit(); pass target_slots instead")
+            target_slots = self.step_slots[target_steps]
+        
+        return self.profile[torch.as_tensor(target_slots, dtype=torch.long, device=self.profile.device)]
+
+class SeasonalNaive(nn.Module):
+    """Repeats the value observed one season (default: one day) earlier."""
+    
+    def __init__(self, season: int = 288):
+        super(SeasonalNaive, self).__init__()
+        
+        self.season = season
+        self.register_buffer('series', torch.zeros(0))
+    
+    def fit(self, series: torch.Tensor, timestamps: Optional[np.ndarray] = None) -> 'SeasonalNaive':
+        """
+        Store the observed series.
+        
+        Lookups only reach back a full season from each target step, so with
+        season >= prediction_horizon they never see values after the forecast
+        origin.
+        
+        Args:
+            series: Target series [time_steps, num_nodes, output_dim]
+            timestamps: Unused, accepted for a uniform fit signature
+        
+        Returns:
+            self
+        """
+        self.series = series.float()
+        return self
+    
+    def forward(self, x: torch.Tensor, adj: Optional[Adjacency] = None,
+                target_steps: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences (unused, accepted for interface compatibility)
+            adj: Unused
+            target_steps: Series indices of the target steps [batch_size, prediction_horizon]
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+            (steps less than a season into the series repeat the first step)
+        """
+        if target_steps is None:
+            raise ValueError("SeasonalNaive needs target_steps (series indices of the targets)")
+        
+        return self.series[(target_steps - self.season).clamp_min(0)]
+
+class NodeRidge(nn.Module):
+    """
+    Per-road ridge autoregression on the last input steps.
+    
+    Every road has its own linear map from its last `num_lags` input steps
+    (all features) to the full horizon, fitted in closed form for all roads
+    at once with one batched solve.
+    """
+    
+    def __init__(self, num_nodes: int, input_dim: int, output_dim: int,
+                 prediction_horizon: int, num_lags: int = 12, alpha: float = 1.0):
+        super(NodeRidge, self).__init__()
+        
+        self.num_lags = num_lags
+        self.alpha = alpha
+        self.prediction_horizon = prediction_horizon
+        
+        # Also trainable by gradient descent; `fit` overwrites with the exact solution
+        self.weight = nn.Parameter(torch.zeros(num_nodes, num_lags * input_dim, prediction_horizon * output_dim))
+        self.bias = nn.Parameter(torch.zeros(num_nodes, prediction_horizon * output_dim))
+    
+    def _design(self, x: torch.Tensor) -> torch.Tensor:
+        """Lagged inputs per road: [batch_size, num_nodes, num_lags * input_dim]."""
+        lags = x[:, -self.num_lags:]
+        return lags.permute(0, 2, 1, 3).reshape(x.size(0), x.size(2), -1)
+    
+    @torch.no_grad()
+    def fit(self, x: torch.Tensor, y: torch.Tensor) -> 'NodeRidge':
+        """
+        Solve (X^T X + alpha I) W = X^T Y for every road.
+        
+        Inputs are centered per road so the bias is not penalized.
+        
+        Args:
+            x: Training inputs [num_samples, sequence_length, num_nodes, input_dim]
+            y: Training targets [num_samples, prediction_horizon, num_nodes, output_dim]
+        
+        Returns:
+            self
+        """
+        design = self._design(x.float())
+        targets = y.float().permute(0, 2, 1, 3).reshape(y.size(0), y.size(2), -1)
+        
+        x_mean, y_mean = design.mean(dim=0), targets.mean(dim=0)
+        design, targets = design - x_mean, targets - y_mean
+        
+        # Normal equations of all roads: [nodes, D, D] and [nodes, D, H*out]
+        gram = torch.einsum('snd,sne->nde', design, design)
+        gram += self.alpha * torch.eye(gram.size(-1), device=gram.device)
+        cross = torch.einsum('snd,snk->ndk', design, targets)
+        
+        weight = torch.linalg.solve(gram, cross)
+        self.weight.copy_(weight)
+        self.bias.copy_(y_mean - torch.einsum('nd,ndk->nk', x_mean, weight))
+        return self
+    
+    def forward(self, x: torch.Tensor, adj: Optional[Adjacency] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Unused, accepted for interface compatibility
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        out = torch.einsum('bnd,ndk->bnk', self._design(x), self.weight) + self.bias
+        out = out.view(x.size(0), x.size(2), self.prediction_horizon, -1)
+        return out.permute(0, 2, 1, 3).contiguous()
+
+class SharedLSTM(nn.Module):
+    """LSTM with weights shared across roads, run over [B*N, T, F]."""
+    
+    def __init__(self, input_dim: int, hidden_dim: int, output_dim: int,
+                 prediction_horizon: int, num_layers: int = 1, dropout: float = 0.0):
+        super(SharedLSTM, self).__init__()
+        
+        self.prediction_horizon = prediction_horizon
+        self.lstm = nn.LSTM(
+            input_dim, hidden_dim, num_layers=num_layers, batch_first=True,
+            dropout=dropout if num_layers > 1 else 0.0
+        )
+        self.output_proj = nn.Linear(hidden_dim, output_dim * prediction_horizon)
+    
+    def forward(self, x: torch.Tensor, adj: Optional[Adjacency] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Unused, accepted for interface compatibility
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        batch_size, seq_len, num_nodes, input_dim = x.size()
+        
+        # Every road is one sequence: [batch*nodes, seq_len, input_dim]
+        sequences = x.permute(0, 2, 1, 3).reshape(batch_size * num_nodes, seq_len, input_dim)
+        lstm_out, _ = self.lstm(sequences)
+        
+        predictions = self.output_proj(lstm_out[:, -1, :])
+        predictions = predictions.view(batch_size, num_nodes, self.prediction_horizon, -1)
+        return predictions.permute(0, 2, 1, 3).contiguous()
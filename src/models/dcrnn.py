@@ -0,0 +1,249 @@
+"""
+Diffusion Convolutional Recurrent Neural Network (DCRNN) for traffic prediction.
+Seq2seq model of diffusion-convolutional GRU cells over sparse forward and
+backward random-walk supports, with scheduled sampling in the decoder.
+"""
+
+import torch
+import torch.nn as nn
+from typing import List, Optional
+import math
+
+from . import Adjacency, graph_matmul
+
+# Below this size dense supports beat SpMM on CPU (crossover measured at ~150-200 nodes)
+DENSE_SUPPORT_MAX_NODES = 150
+
+def random_walk_supports(adj: torch.Tensor) -> List[torch.Tensor]:
+    """
+    Forward and backward random-walk transition matrices of a graph.
+    
+    Args:
+        adj: Adjacency matrix [num_nodes, num_nodes], dense or sparse
+    
+    Returns:
+        Sparse CSR matrices [D_O^(-1) A, D_I^(-1) A^T]
+    """
+    adj = adj.detach().float()
+    coo = (adj if adj.layout == torch.sparse_coo else adj.to_sparse_coo()).coalesce()
+    rows, cols = coo.indices()
+    values = coo.values().abs()
+    num_nodes = adj.size(0)
+    
+    supports = []
+    for src, dst in ((rows, cols), (cols, rows)):
+        degree = torch.zeros(num_nodes, device=values.device).index_add_(0, src, values)
+        weights = values / degree[src].clamp_min(1e-12)
+        transition = torch.sparse_coo_tensor(torch.stack([src, dst]), weights, (num_nodes, num_nodes))
+        supports.append(transition.coalesce().to_sparse_csr())
+    
+    return supports
+
+def layout_supports(supports: List[torch.Tensor]) -> List[torch.Tensor]:
+    """Dense supports for small graphs, sparse CSR otherwise."""
+    if supports[0].size(0) <= DENSE_SUPPORT_MAX_NODES:
+        return [s.to_dense() if s.layout != torch.strided else s for s in supports]
+    return [s.to_sparse_csr() if s.layout != torch.sparse_csr else s for s in supports]
+
+def diffuse(z: torch.Tensor, supports: List[torch.Tensor], max_diffusion_step: int) -> torch.Tensor:
+    """
+    Stack diffusion steps of node features.
+    
+    Args:
+        z: Node features [..., num_nodes, channels]
+        supports: Transition matrices
+        max_diffusion_step: Number of diffusion steps K per support
+    
+    Returns:
+        [z, P_1 z, ..., P_1^K z, P_2 z, ...] concatenated on the channel axis
+    """
+    terms = [z]
+    for support in supports:
+        zk = z
+        for _ in range(max_diffusion_step):
+            zk = graph_matmul(support, zk)
+            terms.append(zk)
+    
+    return torch.cat(terms, dim=-1)
+
+class DCGRUCell(nn.Module):
+    """GRU cell whose matrix products are diffusion convolutions."""
+    
+    def __init__(self, input_dim: int, hidden_dim: int, num_supports: int,
+                 max_diffusion_step: int):
+        super(DCGRUCell, self).__init__()
+        
+        self.hidden_dim = hidden_dim
+        self.max_diffusion_step = max_diffusion_step
+        num_matrices = num_supports * max_diffusion_step + 1
+        
+        # Input side of all gates (reset, update, candidate) in one projection
+        self.input_proj = nn.Linear(input_dim * num_matrices, 3 * hidden_dim)
+        
+        # Hidden side: reset/update gates together, candidate after the reset
+        self.gate_proj = nn.Linear(hidden_dim * num_matrices, 2 * hidden_dim, bias=False)
+        self.candidate_proj = nn.Linear(hidden_dim * num_matrices, hidden_dim, bias=False)
+    
+    def input_gates(self, x: torch.Tensor, supports: List[torch.Tensor]) -> torch.Tensor:
+        """
+        Input contribution to all gates.
+        
+        Args:
+            x: Inputs [..., num_nodes, input_dim]; leading dimensions may
+                include time, so a whole sequence is diffused in one pass
+            supports: Transition matrices
+        
+        Returns:
+            Gate pre-activations [..., num_nodes, 3 * hidden_dim]
+        """
+        return self.input_proj(diffuse(x, supports, self.max_diffusion_step))
+    
+    def forward(self, input_gates: torch.Tensor, h: torch.Tensor,
+                supports: List[torch.Tensor]) -> torch.Tensor:
+        """
+        One recurrent step.
+        
+        Args:
+            input_gates: Output of `input_gates` for this step [batch, num_nodes, 3 * hidden_dim]
+            h: Hidden state [batch, num_nodes, hidden_dim]
+            supports: Transition matrices
+        
+        Returns:
+            New hidden state [batch, num_nodes, hidden_dim]
+        """
+        hidden_gates = self.gate_proj(diffuse(h, supports, self.max_diffusion_step))
+        reset, update = torch.sigmoid(
+            input_gates[..., :2 * self.hidden_dim] + hidden_gates
+        ).chunk(2, dim=-1)
+        
+        candidate = torch.tanh(
+            input_gates[..., 2 * self.hidden_dim:]
+            + self.candidate_proj(diffuse(reset * h, supports, self.max_diffusion_step))
+        )
+        
+        return update * h + (1 - update) * candidate
+
+class DCRNN(nn.Module):
+    """Encoder-decoder DCRNN with scheduled sampling."""
+    
+    # The training loop passes targets for scheduled sampling
+    accepts_targets = True
+    
+    def __init__(self, num_nodes: int, input_dim: int, hidden_dim: int, output_dim: int,
+                 sequence_length: int, prediction_horizon: int, num_layers: int = 2,
+                 max_diffusion_step: int = 2, cl_decay_steps: int = 2000,
+                 use_curriculum_learning: bool = True):
+        super(DCRNN, self).__init__()
+        
+        self.num_nodes = num_nodes
+        self.hidden_dim = hidden_dim
+        self.output_dim = output_dim
+        self.sequence_length = sequence_length
+        self.prediction_horizon = prediction_horizon
+        self.cl_decay_steps = cl_decay_steps
+        self.use_curriculum_learning = use_curriculum_learning
+        
+        # Forward and backward random walk
+        num_supports = 2
+        self.encoder = nn.ModuleList([
+            DCGRUCell(input_dim if i == 0 else hidden_dim, hidden_dim, num_supports, max_diffusion_step)
+            for i in range(num_layers)
+        ])
+        self.decoder = nn.ModuleList([
+            DCGRUCell(output_dim if i == 0 else hidden_dim, hidden_dim, num_supports, max_diffusion_step)
+            for i in range(num_layers)
+        ])
+        self.output_proj = nn.Linear(hidden_dim, output_dim)
+        
+        # Training batches seen, drives the scheduled sampling decay
+        self.register_buffer('batches_seen', torch.zeros((), dtype=torch.long))
+        
+        # Precomputed supports (see `set_supports`), else derived from adj
+        self.supports: Optional[List[torch.Tensor]] = None
+        self._adj_ref = None
+        self._adj_supports: Optional[List[torch.Tensor]] = None
+    
+    def set_supports(self, supports: List[torch.Tensor]):
+        """
+        Use precomputed transition matrices instead of deriving them from adj.
+        
+        Args:
+            supports: [forward, backward] random-walk matrices, e.g. from
+                `GraphSupports.get_torch('dual_random_walk', num_steps=1)`
+        """
+        self.supports = layout_supports(supports)
+    
+    def get_supports(self, adj: Adjacency) -> List[torch.Tensor]:
+        """Transition matrices for a forward pass (computed once per adjacency)."""
+        if self.supports is not None:
+            return self.supports
+        
+        if not isinstance(adj, torch.Tensor):
+            raise ValueError("DCRNN needs the full adjacency, not sampled blocks")
+        
+        if adj is not self._adj_ref:
+            self._adj_ref = adj
+            self._adj_supports = layout_supports(random_walk_supports(adj))
+        return self._adj_supports
+    
+    def teacher_forcing_ratio(self) -> float:
+        """Probability of feeding the ground truth to the decoder (inverse sigmoid decay)."""
+        k = self.cl_decay_steps
+        return k / (k + math.exp(min(self.batches_seen.item() / k, 700.0)))
+    
+    def forward(self, x: torch.Tensor, adj: Adjacency,
+                targets: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Adjacency matrix [num_nodes, num_nodes] (ignored once supports are set)
+            targets: Ground truth [batch_size, prediction_horizon, num_nodes, output_dim]
+                for scheduled sampling (training only)
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        supports = self.get_supports(adj)
+        batch_size, seq_len, num_nodes, _ = x.size()
+        
+        # Encoder, layer by layer: each layer diffuses its whole input sequence at once
+        hidden = []
+        layer_input = x
+        for cell in self.encoder:
+            input_gates = cell.input_gates(layer_input, supports)
+            h = x.new_zeros(batch_size, num_nodes, self.hidden_dim, dtype=input_gates.dtype)
+            
+            outputs = []
+            for t in range(seq_len):
+                h = cell(input_gates[:, t], h, supports)
+                outputs.append(h)
+            
+            hidden.append(h)
+            layer_input = torch.stack(outputs, dim=1)
+        
+        # Decoder, step by step from a zero GO symbol
+        teacher_forcing = self.training and targets is not None and self.use_curriculum_learning
+        ratio = self.teacher_forcing_ratio() if teacher_forcing else 0.0
+        
+        decoder_input = x.new_zeros(batch_size, num_nodes, self.output_dim)
+        predictions = []
+        for t in range(self.prediction_horizon):
+            layer_input = decoder_input
+            for i, cell in enumerate(self.decoder):
+                hidden[i] = cell(cell.input_gates(layer_input, supports), hidden[i], supports)
+                layer_input = hidden[i]
+            
+            prediction = self.output_proj(layer_input)
+            predictions.append(prediction)
+            
+            if teacher_forcing and torch.rand(()).item() < ratio:
+                decoder_input = targets[:, t]
+            else:
+                decoder_input = prediction
+        
+        if self.training and targets is not None:
+            self.batches_seen += 1
+        
+        return torch.stack(predictions, dim=1)
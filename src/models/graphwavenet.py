@@ -0,0 +1,178 @@
+"""
+Graph WaveNet for traffic prediction.
+Gated dilated causal convolutions over time interleaved with diffusion graph
+convolutions over fixed random-walk supports and a learned low-rank adaptive
+adjacency.
+"""
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from typing import List, Optional
+
+from . import Adjacency, TemporalConvolution
+from .dcrnn import diffuse, layout_supports, random_walk_supports
+
+# Row chunk size (elements) when scoring the adaptive adjacency for top-k
+TOP_K_CHUNK_ELEMENTS = 2 ** 20
+
+class GraphWaveNet(nn.Module):
+    """Graph WaveNet with adaptive adjacency."""
+    
+    def __init__(self, num_nodes: int, input_dim: int, output_dim: int,
+                 prediction_horizon: int, residual_channels: int = 32,
+                 skip_channels: int = 256, end_channels: int = 512, num_blocks: int = 4,
+                 layers_per_block: int = 2, kernel_size: int = 2, diffusion_order: int = 2,
+                 adaptive_rank: int = 10, adaptive_top_k: Optional[int] = None,
+                 use_fixed_supports: bool = True, dropout: float = 0.3):
+        super(GraphWaveNet, self).__init__()
+        
+        self.num_nodes = num_nodes
+        self.output_dim = output_dim
+        self.prediction_horizon = prediction_horizon
+        self.diffusion_order = diffusion_order
+        self.adaptive_top_k = adaptive_top_k
+        self.use_fixed_supports = use_fixed_supports
+        self.dropout = nn.Dropout(dropout)
+        
+        # Low-rank adaptive adjacency softmax(relu(E1 E2^T))
+        self.source_embedding = nn.Parameter(torch.randn(num_nodes, adaptive_rank))
+        self.target_embedding = nn.Parameter(torch.randn(num_nodes, adaptive_rank))
+        
+        # Forward/backward random walk (optional) plus the adaptive adjacency
+        num_supports = (2 if use_fixed_supports else 0) + 1
+        num_matrices = num_supports * diffusion_order + 1
+        
+        self.start_conv = nn.Linear(input_dim, residual_channels)
+        
+        # Filter and gate of each layer share one causal convolution
+        self.temporal = nn.ModuleList()
+        self.graph_mlp = nn.ModuleList()
+        self.skip = nn.ModuleList()
+        self.bn = nn.ModuleList()
+        for _ in range(num_blocks):
+            for layer in range(layers_per_block):
+                self.temporal.append(TemporalConvolution(
+                    residual_channels, 2 * residual_channels, kernel_size,
+                    dilation=2 ** layer, dropout=0.0
+                ))
+                self.graph_mlp.append(nn.Conv1d(num_matrices * residual_channels, residual_channels, 1))
+                self.skip.append(nn.Linear(residual_channels, skip_channels))
+                self.bn.append(nn.BatchNorm1d(residual_channels))
+        
+        self.end_proj = nn.Linear(skip_channels, end_channels)
+        self.output_proj = nn.Linear(end_channels, prediction_horizon * output_dim)
+        
+        # Precomputed fixed supports (see `set_supports`), else derived from adj
+        self.supports: Optional[List[torch.Tensor]] = None
+        self._adj_ref = None
+        self._adj_supports: Optional[List[torch.Tensor]] = None
+    
+    def set_supports(self, supports: List[torch.Tensor]):
+        """
+        Use precomputed transition matrices instead of deriving them from adj.
+        
+        Args:
+            supports: [forward, backward] random-walk matrices, e.g. from
+                `GraphSupports.get_torch('dual_random_walk', num_steps=1)`
+        """
+        self.supports = layout_supports(supports)
+    
+    def fixed_supports(self, adj: Adjacency) -> List[torch.Tensor]:
+        """Random-walk supports for a forward pass (computed once per adjacency)."""
+        if not self.use_fixed_supports:
+            return []
+        if self.supports is not None:
+            return self.supports
+        
+        if not isinstance(adj, torch.Tensor):
+            raise ValueError("GraphWaveNet needs the full adjacency, not sampled blocks")
+        
+        if adj is not self._adj_ref:
+            self._adj_ref = adj
+            self._adj_supports = layout_supports(random_walk_supports(adj))
+        return self._adj_supports
+    
+    def adaptive_adjacency(self) -> torch.Tensor:
+        """
+        Learned adjacency softmax(relu(E1 E2^T)).
+        
+        Without top-k this is a dense [num_nodes, num_nodes] matrix. With top-k,
+        the k largest scores per row are selected chunk by chunk without
+        gradients, then only those scores are recomputed from the embeddings
+        and softmax-normalized, so memory stays O(num_nodes * k) in the forward
+        and backward pass. The result is a sparse COO matrix whose values
+        carry the gradients.
+        
+        Returns:
+            Adaptive adjacency [num_nodes, num_nodes]
+        """
+        if self.adaptive_top_k is None:
+            return F.softmax(F.relu(self.source_embedding @ self.target_embedding.t()), dim=1)
+        
+        num_nodes = self.num_nodes
+        k = min(self.adaptive_top_k, num_nodes)
+        chunk = max(1, TOP_K_CHUNK_ELEMENTS // num_nodes)
+        
+        with torch.no_grad():
+            columns = []
+            for start in range(0, num_nodes, chunk):
+                scores = F.relu(self.source_embedding[start:start + chunk] @ self.target_embedding.t())
+                columns.append(scores.topk(k, dim=1)[1])
+            columns = torch.cat(columns)
+        
+        # Differentiable scores of the kept entries only: [num_nodes, k]
+        scores = F.relu(torch.einsum(
+            'nr,nkr->nk', self.source_embedding, self.target_embedding[columns]
+        ))
+        values = F.softmax(scores, dim=1)
+        
+        rows = torch.arange(num_nodes, device=values.device).repeat_interleave(k)
+        indices = torch.stack([rows, columns.flatten()])
+        
+        return torch.sparse_coo_tensor(indices, values.flatten(), (num_nodes, num_nodes))
+    
+    def forward(self, x: torch.Tensor, adj: Adjacency) -> torch.Tensor:
+        """
+        Forward pass.
+        
+        Args:
+            x: Input sequences [batch_size, sequence_length, num_nodes, input_dim]
+            adj: Adjacency matrix [num_nodes, num_nodes] (ignored once supports are set)
+        
+        Returns:
+            Predictions [batch_size, prediction_horizon, num_nodes, output_dim]
+        """
+        # Adaptive adjacency once per forward pass, shared by every layer
+        supports = self.fixed_supports(adj) + [self.adaptive_adjacency()]
+        
+        batch_size, seq_len, num_nodes, _ = x.size()
+        
+        # [batch, nodes, channels, time]
+        h = self.start_conv(x).permute(0, 2, 3, 1).contiguous()
+        channels = h.size(2)
+        
+        skip = 0
+        for temporal, graph_mlp, skip_proj, bn in zip(self.temporal, self.graph_mlp, self.skip, self.bn):
+            residual = h
+            
+            # Gated dilated causal convolution: [batch*nodes, channels, time]
+            filter_gate = temporal(h.view(batch_size * num_nodes, channels, seq_len))
+            filt, gate = filter_gate.chunk(2, dim=1)
+            h = torch.tanh(filt) * torch.sigmoid(gate)
+            
+            # Only the last step reaches the output: [batch, nodes, skip_channels]
+            skip = skip + skip_proj(h[:, :, -1]).view(batch_size, num_nodes, -1)
+            
+            # Diffusion over the node axis, (channels, time) folded into features
+            terms = diffuse(h.view(batch_size, num_nodes, channels * seq_len), supports,
+                            self.diffusion_order)
+            terms = terms.view(batch_size * num_nodes, -1, seq_len)
+            h = graph_mlp(self.dropout(terms))
+            
+            h = bn(h).view(batch_size, num_nodes, channels, seq_len) + residual
+        
+        out = F.relu(self.end_proj(F.relu(skip)))
+        predictions = self.output_proj(out).view(batch_size, num_nodes, self.prediction_horizon, -1)
+        
+        return predictions.permute(0, 2, 1, 3).contiguous()
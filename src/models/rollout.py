@@ -0,0 +1,112 @@
+"""
+Multi-horizon autoregressive rollout.
+Encodes the history window once and advances the cached encoder state one
+5-minute step at a time, so any horizon is served without re-running the
+model over the full window.
+"""
+
+import torch
+import torch.nn as nn
+from typing import Optional
+
+from . import unwrap_model
+
+# Minutes per time step of the aggregated series
+STEP_MINUTES = 5
+
+def horizon_steps(minutes: int, step_minutes: int = STEP_MINUTES) -> int:
+    """Number of steps covering a horizon in minutes (15 -> 3, 120 -> 24)."""
+    return -(-minutes // step_minutes)
+
+def supports_incremental(model: nn.Module) -> bool:
+    """Whether a model caches encoder state (`encode` / `advance` / `readout`)."""
+    model = unwrap_model(model)
+    return all(callable(getattr(model, name, None)) for name in ('encode', 'advance', 'readout'))
+
+def next_input(last_input: torch.Tensor, prediction: torch.Tensor,
+               future_features: Optional[torch.Tensor], step: int,
+               target_feature: int) -> torch.Tensor:
+    """
+    Input frame of a forecast step with the predicted target filled in.
+    
+    Args:
+        last_input: Last observed frame [batch_size, num_nodes, features]
+        prediction: Predicted step [batch_size, num_nodes, output_dim]
+        future_features: Known inputs of the forecast steps (e.g. time
+            encodings) [batch_size, horizon, num_nodes, features], or None to
+            carry the last observed frame forward
+        step: Forecast step index
+        target_feature: Input feature the first output channel predicts
+    
+    Returns:
+        Input frame [batch_size, num_nodes, features]
+    """
+    frame = (last_input if future_features is None else future_features[:, step]).clone()
+    frame[..., target_feature] = prediction[..., 0]
+    return frame
+
+@torch.no_grad()
+def rollout(model: nn.Module, x: torch.Tensor, adj: torch.Tensor, horizon: int,
+            future_features: Optional[torch.Tensor] = None, target_feature: int = 0,
+            incremental: bool = True) -> torch.Tensor:
+    """
+    Forecast an arbitrary number of steps.
+    
+    The model's direct output covers prediction_horizon steps. Longer horizons
+    feed the predicted steps back as inputs and read out the next block. With
+    cached encoder state (STGCN, TemporalGCN) each fed-back step costs one
+    `advance`, independent of the history length; other models re-run the
+    forward pass on the shifted window once per block.
+    
+    Fused ST-GCN blocks (valid convolutions) give the same result either way.
+    Recurrent and causally padded state (LSTM/GRU/conv heads, standard ST-GCN
+    blocks) keeps context from before the window, so later blocks differ
+    slightly from re-running on the truncated window.
+    
+    Run the model in eval mode.
+    
+    Args:
+        model: Traffic model taking (x, adj)
+        x: History window [batch_size, sequence_length, num_nodes, features]
+        adj: Full adjacency matrix [num_nodes, num_nodes]
+        horizon: Number of 5-minute steps to forecast (see `horizon_steps`)
+        future_features: Optional known inputs of the forecast steps
+            [batch_size, >= horizon, num_nodes, features]
+        target_feature: Input feature the model predicts
+        incremental: Use the cached encoder state when the model supports it
+    
+    Returns:
+        Predictions [batch_size, horizon, num_nodes, output_dim]
+    """
+    if not isinstance(adj, torch.Tensor):
+        raise ValueError("Rollout needs the full adjacency, not sampled blocks")
+    if future_features is not None and future_features.size(1) < horizon:
+        raise ValueError(f"future_features covers {future_features.size(1)} steps, need {horizon}")
+    
+    incremental = incremental and supports_incremental(model)
+    if incremental:
+        model = unwrap_model(model)
+        state = model.encode(x, adj)
+    
+    window = x
+    blocks = []
+    produced = 0
+    while produced < horizon:
+        predictions = model.readout(state) if incremental else model(window, adj)
+        predictions = predictions[:, :horizon - produced]
+        blocks.append(predictions)
+        
+        if produced + predictions.size(1) < horizon:
+            frames = []
+            for i in range(predictions.size(1)):
+                frame = next_input(x[:, -1], predictions[:, i], future_features, produced + i, target_feature)
+                if incremental:
+                    state = model.advance(frame, adj, state)
+                frames.append(frame)
+            
+            if not incremental:
+                window = torch.cat([window, torch.stack(frames, dim=1)], dim=1)[:, -x.size(1):]
+        
+        produced += predictions.size(1)
+    
+    return torch.cat(blocks, dim=1)
@@ -6,10 +6,71 @@ Creates PyTorch datasets with windowed sequences and graph structure.
 import numpy as np
 import pandas as pd
 import torch
-from torch.utils.data import Dataset, DataLoader
-from typing import Tuple, Dict, List, Optional
+from torch.utils.data import Dataset, DataLoader, BatchSampler, RandomSampler, SequentialSampler, Sampler, Subset
+from typing import Tuple, Dict, Iterable, Iterator, List, Optional
 import json
 import logging
+import warnings
+
+try:
+    from data.tensor_store import TensorStore
+except ImportError:
+    TensorStore = None
+
+try:
+    from graph.sampling import load_csr_adjacency
+except ImportError:
+    load_csr_adjacency = None
+
+try:
+    from training.splits import TimeSplitManager
+except ImportError:
+    from splits import TimeSplitManager
+
+def load_float_tensor(path: str, mmap: bool = False) -> torch.Tensor:
+    """
+    Load a `.npy` array as a float32 tensor.
+    
+    With `mmap=True` the file is memory-mapped read-only and wrapped without a
+    copy, so DataLoader workers share pages through the OS page cache and
+    arrays larger than RAM can be used. This requires float32 storage.
+    
+    Args:
+        path: Path to the `.npy` file
+        mmap: Whether to memory-map the file instead of reading it into RAM
+        
+    Returns:
+        Float32 tensor (backed by the mapped file when `mmap=True`)
+    """
+    if not mmap:
+        return torch.FloatTensor(np.load(path))
+    
+    array = np.load(path, mmap_mode='r')
+    if array.dtype != np.float32:
+        logging.getLogger(__name__).warning(
+            f"{path} is stored as {array.dtype}, not float32; loading a converted copy"
+        )
+        return torch.from_numpy(np.ascontiguousarray(array, dtype=np.float32))
+    
+    # The mapping is read-only; the tensor is never written to
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        return torch.from_numpy(array)
+
+def gather_nodes(data: torch.Tensor, indices: torch.Tensor, nodes: torch.Tensor) -> torch.Tensor:
+    """
+    Gather `data[indices][:, :, nodes]` without materializing the other nodes.
+    
+    Args:
+        data: Tensor [samples, steps, num_nodes, features]
+        indices: Sample indices [batch]
+        nodes: Node indices [n]
+        
+    Returns:
+        Tensor [batch, steps, n, features]
+    """
+    steps = torch.arange(data.size(1))
+    return data[indices.view(-1, 1, 1), steps.view(1, -1, 1), nodes.view(1, 1, -1)]
 
 class TrafficDataset(Dataset):
     """PyTorch Dataset for traffic prediction with graph structure."""
@@ -63,23 +124,28 @@ class TrafficDataset(Dataset):
 class SpatialTemporalDataset(Dataset):
     """Dataset for spatial-temporal GNN with multiple road segments."""
     
-    def __init__(self, data_dir: str, split: str = 'train'):
+    def __init__(self, data_dir: str, split: str = 'train', mmap: bool = False):
         """
         Initialize spatial-temporal dataset.
         
         Args:
             data_dir: Directory containing processed data
             split: Data split ('train', 'test', 'val')
+            mmap: Memory-map sequences and targets instead of loading them into RAM
         """
         self.data_dir = data_dir
         self.split = split
+        self.mmap = mmap
         
-        # Load data
-        self.sequences = np.load(f"{data_dir}/X_{split}.npy")
-        self.targets = np.load(f"{data_dir}/y_{split}.npy")
+        # Load data (float32 tensors, memory-mapped if requested)
+        self.sequences = load_float_tensor(f"{data_dir}/X_{split}.npy", mmap)
+        self.targets = load_float_tensor(f"{data_dir}/y_{split}.npy", mmap)
         
-        # Load graph structure
-        self.adjacency_matrix = np.load(f"{data_dir}/adjacency_matrix_normalized.npy")
+        # Load graph structure (from the sparse file when available)
+        if load_csr_adjacency is not None:
+            self.adjacency_matrix = load_csr_adjacency(data_dir).toarray()
+        else:
+            self.adjacency_matrix = np.load(f"{data_dir}/adjacency_matrix_normalized.npy")
         
         # Load metadata
         with open(f"{data_dir}/metadata.json", 'r') as f:
@@ -93,8 +159,6 @@ class SpatialTemporalDataset(Dataset):
         self.road_ids = self.metadata.get(road_ids_key, [])
         
         # Convert to tensors
-        self.sequences = torch.FloatTensor(self.sequences)
-        self.targets = torch.FloatTensor(self.targets)
         self.adjacency_matrix = torch.FloatTensor(self.adjacency_matrix)
         
         # Create node index mapping for batches
@@ -130,6 +194,398 @@ class SpatialTemporalDataset(Dataset):
             'node_idx': self.node_indices[idx] if idx < len(self.node_indices) else 0,
             'road_id': self.road_ids[idx] if idx < len(self.road_ids) else 'unknown'
         }
+    
+    @property
+    def has_node_axis(self) -> bool:
+        """Whether samples are all-node windows [seq_len, num_nodes, features]."""
+        return self.sequences.dim() == 4
+    
+    def get_batch(self, indices: torch.Tensor, nodes: Optional[torch.Tensor] = None,
+                  target_nodes: Optional[torch.Tensor] = None) -> Dict[str, torch.Tensor]:
+        """
+        Gather a whole batch with one fancy-index per tensor.
+        
+        Args:
+            indices: Sample indices of the batch
+            nodes: Optional node indices to gather (all-node windows only), so
+                a sampled neighborhood reads only its own nodes
+            target_nodes: Node indices of the targets (default: nodes)
+            
+        Returns:
+            Dictionary with batched sequences and targets
+        """
+        if nodes is None:
+            return {
+                'sequence': self.sequences[indices],
+                'target': self.targets[indices]
+            }
+        
+        if not self.has_node_axis:
+            raise ValueError("Node gathering needs all-node [samples, seq_len, nodes, features] sequences")
+        if target_nodes is None:
+            target_nodes = nodes
+        
+        return {
+            'sequence': gather_nodes(self.sequences, indices, nodes),
+            'target': gather_nodes(self.targets, indices, target_nodes)
+        }
+
+class SnapshotDataset(Dataset):
+    """All-node windows cut from one shared [time_steps, num_nodes, features] grid."""
+    
+    def __init__(self, data_dir: str, split: str = 'train',
+                 target_features: List[str] = ['avg_speed'],
+                 mmap: bool = True, num_hops: int = 0):
+        """
+        Initialize snapshot dataset.
+        
+        Sample i is the i-th window of the split; consecutive windows share all
+        but one time step of storage. Splits are index ranges over the same grid
+        (see `splits.json`), so no split is materialized.
+        
+        Args:
+            data_dir: Directory containing `grid.npy` and `splits.json`
+                (see `create_model_ready_features(store_format='snapshot')`)
+            split: Data split ('train', 'val', 'test' or 'all')
+            target_features: Feature names predicted by the model
+            mmap: Memory-map the grid instead of loading it into RAM
+            num_hops: Number of propagated grids `grid_hop{k}.npy` to
+                concatenate after the raw features (see
+                `graph.propagation.precompute_propagated_features`)
+        """
+        self.data_dir = data_dir
+        self.split = split
+        
+        with open(f"{data_dir}/metadata.json", 'r') as f:
+            self.metadata = json.load(f)
+        
+        self.splits = TimeSplitManager.load(f"{data_dir}/splits.json")
+        self.sequence_length = self.splits.sequence_length
+        self.window = self.splits.window
+        
+        # Windows of a split are contiguous, so the split is just an offset
+        self.indices = self.splits.split_range(split)
+        
+        feature_names = self.metadata['feature_names']
+        missing = [name for name in target_features if name not in feature_names]
+        if missing:
+            raise ValueError(f"Target features not in grid: {missing}")
+        self.target_idx = [feature_names.index(name) for name in target_features]
+        
+        # [time_steps, num_nodes, features]
+        self.grid = np.load(f"{data_dir}/grid.npy", mmap_mode='r' if mmap else None)
+        self.num_nodes = self.grid.shape[1]
+        
+        # Input grids: raw features, then A^k X for k = 1..num_hops
+        self.num_hops = num_hops
+        self.input_grids = [self.grid] + [
+            np.load(f"{data_dir}/grid_hop{hop}.npy", mmap_mode='r' if mmap else None)
+            for hop in range(1, num_hops + 1)
+        ]
+        
+    def __len__(self) -> int:
+        return len(self.indices)
+    
+    def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
+        """
+        Get a single window.
+        
+        Returns:
+            Dictionary with sequence [seq_len, num_nodes, (num_hops+1)*features]
+            and target [prediction_horizon, num_nodes, num_targets]
+        """
+        start = self.indices[idx]
+        
+        # Basic slices of the grids are strided views; only the window is copied
+        inputs = slice(start, start + self.sequence_length)
+        targets = self.grid[start + self.sequence_length:start + self.window]
+        
+        return {
+            'sequence': self._inputs(inputs),
+            'target': torch.from_numpy(np.array(targets[..., self.target_idx]))
+        }
+    
+    def _inputs(self, steps, nodes: Optional[np.ndarray] = None) -> torch.Tensor:
+        """Input features at `steps` (and `nodes`), hops concatenated on the feature axis."""
+        index = steps if nodes is None else (steps, nodes)
+        if self.num_hops == 0:
+            return torch.from_numpy(np.array(self.grid[index]))
+        return torch.from_numpy(np.concatenate(
+            [np.asarray(grid[index], dtype=np.float32) for grid in self.input_grids], axis=-1
+        ))
+    
+    # Samples are all-node windows, so node subsets can be gathered directly
+    has_node_axis = True
+    
+    def get_batch(self, indices: torch.Tensor, nodes: Optional[torch.Tensor] = None,
+                  target_nodes: Optional[torch.Tensor] = None) -> Dict[str, torch.Tensor]:
+        """
+        Gather a batch of windows with offset arithmetic.
+        
+        Args:
+            indices: Window indices of the batch
+            nodes: Optional node indices to read (e.g. the input nodes of a
+                sampled neighborhood); other nodes are never touched
+            target_nodes: Node indices of the targets (default: nodes)
+        
+        Returns:
+            Dictionary with sequence [batch, seq_len, num_nodes, (num_hops+1)*features]
+            and target [batch, prediction_horizon, num_nodes, num_targets], with
+            num_nodes = len(nodes) / len(target_nodes) when given
+        """
+        starts = self.indices.start + indices.numpy()[:, None]
+        input_steps = starts + np.arange(self.sequence_length)
+        target_steps = starts + np.arange(self.sequence_length, self.window)
+        
+        if nodes is None:
+            return {
+                'sequence': self._inputs(input_steps),
+                'target': torch.from_numpy(self.grid[target_steps][..., self.target_idx])
+            }
+        
+        if target_nodes is None:
+            target_nodes = nodes
+        nodes, target_nodes = nodes.numpy(), target_nodes.numpy()
+        
+        # [batch, steps, 1] x [n] broadcasts to [batch, steps, n, features]
+        return {
+            'sequence': self._inputs(input_steps[..., None], nodes),
+            'target': torch.from_numpy(self.grid[target_steps[..., None], target_nodes][..., self.target_idx])
+        }
+
+class TensorStoreDataset(Dataset):
+    """Dataset reading samples from the chunked tensor store."""
+    
+    def __init__(self, data_dir: str, split: str = 'train', cache_chunks: int = 64):
+        """
+        Initialize tensor store dataset.
+        
+        Args:
+            data_dir: Directory containing processed data with a `tensor_store`
+                (see `create_model_ready_features(store_format='chunked')`)
+            split: Data split ('train', 'test', 'val')
+            cache_chunks: Number of decoded chunks kept in memory; shuffled batches
+                touch many chunks, so this should cover a good part of the split
+        """
+        if TensorStore is None:
+            raise ImportError("data.tensor_store is required for the chunked data format")
+        
+        self.data_dir = data_dir
+        self.split = split
+        self.store = TensorStore(f"{data_dir}/tensor_store", cache_chunks=cache_chunks)
+        
+        if f"X_{split}" not in self.store:
+            raise FileNotFoundError(f"No '{split}' split in {data_dir}/tensor_store")
+        
+        # Node indices are small (int32 per sample), keep them in memory
+        self.node_indices = torch.from_numpy(
+            self.store.read(f"{split}_node_idx").astype(np.int64)
+        )
+        self.road_index = self.store.attrs.get('road_index', [])
+        
+    def __len__(self) -> int:
+        return self.store.shape(f"X_{self.split}")[0]
+    
+    def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
+        """
+        Get a single sample.
+        
+        Returns:
+            Dictionary with sequence, target and node index
+        """
+        return {
+            'sequence': self._to_tensor(self.store.read(f"X_{self.split}", idx, idx + 1)[0]),
+            'target': self._to_tensor(self.store.read(f"y_{self.split}", idx, idx + 1)[0]),
+            'node_idx': self.node_indices[idx]
+        }
+    
+    def get_batch(self, indices: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Gather a whole batch, decoding each touched chunk once."""
+        index = indices.numpy()
+        return {
+            'sequence': self._to_tensor(self.store.take(f"X_{self.split}", index)),
+            'target': self._to_tensor(self.store.take(f"y_{self.split}", index)),
+            'node_idx': self.node_indices[indices]
+        }
+    
+    def road_id(self, idx: int) -> str:
+        """Road id of a sample, looked up from its node index."""
+        node = int(self.node_indices[idx])
+        return self.road_index[node] if 0 <= node < len(self.road_index) else 'unknown'
+    
+    @staticmethod
+    def _to_tensor(array: np.ndarray) -> torch.Tensor:
+        """Convert a (possibly float16, read-only) chunk slice to a float32 tensor."""
+        return torch.from_numpy(np.array(array, dtype=np.float32))
+
+class BatchIndexDataset(Dataset):
+    """
+    Batch-level view of a dataset that takes a whole index list per item.
+    
+    Used with a `BatchSampler` and `batch_size=None`, so each batch is one
+    `get_batch` gather instead of per-sample `__getitem__` calls and a Python
+    collate. The adjacency matrix is not part of the batch.
+    """
+    
+    def __init__(self, base_dataset: Dataset, indices: Optional[List[int]] = None):
+        """
+        Initialize batch index dataset.
+        
+        Args:
+            base_dataset: Dataset implementing `get_batch(indices)`
+            indices: Optional subset of sample indices to expose
+        """
+        self.base_dataset = base_dataset
+        
+        if indices is None:
+            self.indices = None
+        else:
+            self.indices = torch.as_tensor(indices, dtype=torch.long)
+        
+    def __len__(self) -> int:
+        if self.indices is None:
+            return len(self.base_dataset)
+        return len(self.indices)
+    
+    def __getitem__(self, batch_indices: List[int]) -> Dict[str, torch.Tensor]:
+        """Get a batch for a list of (subset-local) indices."""
+        batch_indices = torch.as_tensor(batch_indices, dtype=torch.long)
+        if self.indices is not None:
+            batch_indices = self.indices[batch_indices]
+        
+        return self.base_dataset.get_batch(batch_indices)
+    
+    @classmethod
+    def from_dataset(cls, dataset: Dataset) -> 'BatchIndexDataset':
+        """Wrap a dataset or a `Subset` of one."""
+        if isinstance(dataset, Subset):
+            return cls(dataset.dataset, dataset.indices)
+        return cls(dataset)
+
+def create_batch_loader(dataset: Dataset, batch_size: int, shuffle: bool = False,
+                        num_workers: int = 0, drop_last: bool = False) -> DataLoader:
+    """
+    Create a DataLoader that fetches whole batches with a single gather.
+    
+    Args:
+        dataset: Dataset (or Subset) whose base implements `get_batch`
+        batch_size: Batch size
+        shuffle: Whether to shuffle samples every epoch
+        num_workers: Number of worker processes
+        drop_last: Drop the last incomplete batch
+        
+    Returns:
+        DataLoader yielding batched dictionaries
+    """
+    batch_dataset = BatchIndexDataset.from_dataset(dataset)
+    
+    base_sampler = RandomSampler(batch_dataset) if shuffle else SequentialSampler(batch_dataset)
+    batch_sampler = BatchSampler(base_sampler, batch_size=batch_size, drop_last=drop_last)
+    
+    # batch_size=None disables automatic batching: each sampled index list is one item
+    return DataLoader(
+        batch_dataset,
+        sampler=batch_sampler,
+        batch_size=None,
+        num_workers=num_workers,
+        pin_memory=torch.cuda.is_available()
+    )
+
+class NodeSampledBatchSampler(Sampler):
+    """Pairs every batch of sample indices with the next sampled k-hop node batch."""
+    
+    def __init__(self, batch_sampler: Iterable[List[int]], neighbor_sampler):
+        """
+        Initialize node-sampled batch sampler.
+        
+        Args:
+            batch_sampler: Sampler yielding lists of sample indices
+            neighbor_sampler: `graph.sampling.NeighborSampler`; a new pass over
+                its seed nodes starts whenever one is exhausted
+        """
+        self.batch_sampler = batch_sampler
+        self.neighbor_sampler = neighbor_sampler
+        self._node_batches = None
+    
+    def __len__(self) -> int:
+        return len(self.batch_sampler)
+    
+    def __iter__(self) -> Iterator[Tuple[List[int], Dict]]:
+        for indices in self.batch_sampler:
+            yield list(indices), self.next_node_batch()
+    
+    def next_node_batch(self) -> Dict:
+        """Next sampled node mini-batch, starting a new pass when exhausted."""
+        if self._node_batches is not None:
+            node_batch = next(self._node_batches, None)
+            if node_batch is not None:
+                return node_batch
+        
+        self._node_batches = iter(self.neighbor_sampler)
+        return next(self._node_batches)
+
+class NodeSampledDataset(BatchIndexDataset):
+    """
+    Batch-level view that reads only the input nodes of a sampled neighborhood.
+    
+    Items are (sample indices, node batch) pairs from a
+    `NodeSampledBatchSampler`. Sequences are gathered for the input nodes and
+    targets for the seed nodes, so I/O scales with the sampled neighborhood
+    instead of the whole network. The blocks are passed through with the batch.
+    """
+    
+    def __getitem__(self, item: Tuple[List[int], Dict]) -> Dict[str, torch.Tensor]:
+        """Get the node-restricted batch and its blocks."""
+        batch_indices, node_batch = item
+        batch_indices = torch.as_tensor(batch_indices, dtype=torch.long)
+        if self.indices is not None:
+            batch_indices = self.indices[batch_indices]
+        
+        batch = self.base_dataset.get_batch(
+            batch_indices, node_batch['input_nodes'], node_batch['seed_nodes']
+        )
+        batch['blocks'] = node_batch['blocks']
+        return batch
+
+def create_node_sampled_loader(loader: DataLoader, neighbor_sampler) -> DataLoader:
+    """
+    Rebuild a training loader so each batch covers one sampled neighborhood.
+    
+    Keeps the loader's batch composition (shuffled, batched or stratified) and
+    workers; only the node axis is restricted.
+    
+    Args:
+        loader: Training loader over all-node windows (e.g. SnapshotDataset)
+        neighbor_sampler: `graph.sampling.NeighborSampler` over the same graph
+        
+    Returns:
+        DataLoader yielding batches with node-restricted 'sequence'/'target' and
+        the sampled 'blocks'
+    """
+    dataset = loader.dataset
+    if isinstance(dataset, BatchIndexDataset):
+        base, indices = dataset.base_dataset, dataset.indices
+    elif isinstance(dataset, Subset):
+        base, indices = dataset.dataset, dataset.indices
+    else:
+        base, indices = dataset, None
+    
+    if not getattr(base, 'has_node_axis', False):
+        raise ValueError(
+            "Neighbor sampling needs all-node [seq_len, num_nodes, features] samples "
+            "(e.g. 'snapshot_data': true)"
+        )
+    
+    # Automatic batching keeps its batches in batch_sampler, batch-level loaders in sampler
+    batch_sampler = loader.batch_sampler if loader.batch_sampler is not None else loader.sampler
+    
+    return DataLoader(
+        NodeSampledDataset(base, indices),
+        sampler=NodeSampledBatchSampler(batch_sampler, neighbor_sampler),
+        batch_size=None,
+        num_workers=loader.num_workers,
+        pin_memory=torch.cuda.is_available()
+    )
 
 class GraphBatchDataset(Dataset):
     """Dataset that creates graph batches for efficient GNN training."""
@@ -222,25 +678,13 @@ class GraphBatchDataset(Dataset):
             'road_ids': batch_info['road_ids']
         }
 
-def create_data_loaders(data_dir: str, batch_size: int = 32, 
-                       num_workers: int = 0) -> Tuple[DataLoader, DataLoader, DataLoader]:
-    """
-    Create data loaders for train, validation, and test sets.
-    
-    Args:
-        data_dir: Directory containing processed data
-        batch_size: Batch size for data loaders
-        num_workers: Number of worker processes
-        
-    Returns:
-        Tuple of (train_loader, val_loader, test_loader)
-    """
-    # Create datasets
-    train_dataset = SpatialTemporalDataset(data_dir, 'train')
+def _legacy_splits(make_dataset) -> Tuple[Dataset, Dataset, Dataset]:
+    """Train/val/test splits of the per-road sequence files."""
+    train_dataset = make_dataset('train')
     
     # Create validation set if test data exists
     try:
-        test_dataset = SpatialTemporalDataset(data_dir, 'test')
+        test_dataset = make_dataset('test')
         
         # Split test into val and test (50/50)
         test_size = len(test_dataset)
@@ -263,7 +707,60 @@ def create_data_loaders(data_dir: str, batch_size: int = 32,
         )
         test_dataset = val_dataset  # Use val as test for now
     
+    return train_dataset, val_dataset, test_dataset
+
+def create_data_loaders(data_dir: str, batch_size: int = 32, 
+                       num_workers: int = 0,
+                       num_hops: int = 0,
+                       mmap: bool = False,
+                       batched: bool = False,
+                       tensor_store: bool = False,
+                       snapshot: bool = False) -> Tuple[DataLoader, DataLoader, DataLoader]:
+    """
+    Create data loaders for train, validation, and test sets.
+    
+    Args:
+        data_dir: Directory containing processed data
+        batch_size: Batch size for data loaders
+        num_workers: Number of worker processes
+        num_hops: If > 0, append this many precomputed propagation hops to the
+            snapshot inputs (requires `snapshot`)
+        mmap: Memory-map the sequence/target arrays (shared across workers)
+        batched: Fetch whole batches with one gather instead of per-sample items
+        tensor_store: Read from the chunked tensor store instead of `.npy` arrays
+        snapshot: Serve all-node windows from the snapshot grids
+        
+    Returns:
+        Tuple of (train_loader, val_loader, test_loader)
+    """
+    if num_hops > 0 and not snapshot:
+        raise ValueError(
+            "Propagated features are cached per time step of the snapshot grid; "
+            "num_hops > 0 (SIGN) requires snapshot data ('snapshot_data': true)"
+        )
+    
+    def make_dataset(split: str) -> Dataset:
+        if tensor_store:
+            return TensorStoreDataset(data_dir, split)
+        return SpatialTemporalDataset(data_dir, split, mmap=mmap)
+    
+    if snapshot:
+        # Chronological splits over one shared grid, no copies or random splits
+        train_dataset, val_dataset, test_dataset = (
+            SnapshotDataset(data_dir, split, mmap=mmap, num_hops=num_hops)
+            for split in ('train', 'val', 'test')
+        )
+    else:
+        train_dataset, val_dataset, test_dataset = _legacy_splits(make_dataset)
+    
     # Create data loaders
+    if batched:
+        return (
+            create_batch_loader(train_dataset, batch_size, shuffle=True, num_workers=num_workers),
+            create_batch_loader(val_dataset, batch_size, shuffle=False, num_workers=num_workers),
+            create_batch_loader(test_dataset, batch_size, shuffle=False, num_workers=num_workers)
+        )
+    
     train_loader = DataLoader(
         train_dataset, 
         batch_size=batch_size, 
@@ -329,13 +826,15 @@ class WindowDataset(Dataset):
         """
         Initialize window dataset.
         
+        Rows are kept once in contiguous arrays; a window is only its start row,
+        resolved by offset arithmetic.
+        
         Args:
             time_series_df: Time series DataFrame
             window_size: Size of input window
             prediction_horizon: Number of steps to predict
             target_features: List of features to predict
         """
-        self.time_series_df = time_series_df.sort_values(['road_id', 'time_bin'])
         self.window_size = window_size
         self.prediction_horizon = prediction_horizon
         self.target_features = target_features
@@ -345,43 +844,71 @@ class WindowDataset(Dataset):
         self.feature_cols = [col for col in time_series_df.columns 
                            if col not in exclude_cols]
         
+        df_sorted = time_series_df.sort_values(['road_id', 'time_bin'])
+        
+        # Row arrays: features [rows, F], targets [rows, T], road index, time (ns)
+        self.features = torch.from_numpy(
+            df_sorted[self.feature_cols].to_numpy(dtype=np.float32, copy=True)
+        )
+        self.targets = torch.from_numpy(
+            df_sorted[self.target_features].to_numpy(dtype=np.float32, copy=True)
+        )
+        road_codes, self.road_ids = pd.factorize(df_sorted['road_id'])
+        self.row_road_idx = road_codes.astype(np.int32)
+        self.row_times = pd.to_datetime(df_sorted['time_bin']).to_numpy('datetime64[ns]').astype(np.int64)
+        
         # Create windows
         self.create_windows()
         
     def create_windows(self):
-        """Create sliding windows from time series data."""
-        self.windows = []
+        """Compute window start rows and per-window metadata in O(rows)."""
+        span = self.window_size + self.prediction_horizon
         
-        for road_id, group in self.time_series_df.groupby('road_id'):
-            if len(group) < self.window_size + self.prediction_horizon:
-                continue
-                
-            features = group[self.feature_cols].values
-            targets = group[self.target_features].values
-            
-            for i in range(len(features) - self.window_size - self.prediction_horizon + 1):
-                window = {
-                    'features': features[i:i + self.window_size],
-                    'targets': targets[i + self.window_size:i + self.window_size + self.prediction_horizon],
-                    'road_id': road_id,
-                    'start_time': group.iloc[i]['time_bin'],
-                    'end_time': group.iloc[i + self.window_size - 1]['time_bin']
-                }
-                self.windows.append(window)
+        # Rows of each road are contiguous after sorting
+        road_starts = np.flatnonzero(np.r_[True, np.diff(self.row_road_idx) != 0])
+        road_lengths = np.diff(np.r_[road_starts, len(self.row_road_idx)])
+        
+        counts = np.maximum(road_lengths - span + 1, 0)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        self.window_starts = np.repeat(road_starts, counts) + offsets
+        
+        self.road_idx = self.row_road_idx[self.window_starts]
+        self.start_times = self.row_times[self.window_starts]
+        self.end_times = self.row_times[self.window_starts + self.window_size - 1]
     
     def __len__(self) -> int:
-        return len(self.windows)
+        return len(self.window_starts)
     
     def __getitem__(self, idx: int) -> Dict[str, torch.Tensor]:
-        """Get a single window."""
-        window = self.windows[idx]
+        """
+        Get a single window.
+        
+        Features and targets are views into the row arrays; times are int64 ns.
+        """
+        start = int(self.window_starts[idx])
+        split = start + self.window_size
+        
+        return {
+            'features': self.features[start:split],
+            'targets': self.targets[split:split + self.prediction_horizon],
+            'road_idx': int(self.road_idx[idx]),
+            'road_id': self.road_ids[self.road_idx[idx]],
+            'start_time': int(self.start_times[idx]),
+            'end_time': int(self.end_times[idx])
+        }
+    
+    def get_batch(self, indices: torch.Tensor) -> Dict[str, torch.Tensor]:
+        """Gather a batch of windows with one fancy-index per array."""
+        starts = torch.from_numpy(self.window_starts)[indices]
+        input_rows = starts[:, None] + torch.arange(self.window_size)
+        target_rows = starts[:, None] + torch.arange(self.window_size, self.window_size + self.prediction_horizon)
         
         return {
-            'features': torch.FloatTensor(window['features']),
-            'targets': torch.FloatTensor(window['targets']),
-            'road_id': window['road_id'],
-            'start_time': window['start_time'],
-            'end_time': window['end_time']
+            'features': self.features[input_rows],
+            'targets': self.targets[target_rows],
+            'road_idx': torch.from_numpy(self.road_idx)[indices],
+            'start_time': torch.from_numpy(self.start_times)[indices],
+            'end_time': torch.from_numpy(self.end_times)[indices]
         }
 
 def test_dataset_creation():
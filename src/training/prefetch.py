@@ -0,0 +1,227 @@
+"""
+Asynchronous batch prefetching for the training loop.
+A background thread assembles upcoming batches and copies them to the device
+from pinned memory with non-blocking transfers, overlapping data loading with
+compute. With prefetching disabled batches are still timed so the data-wait
+fraction stays comparable.
+"""
+
+import torch
+from torch.utils.data import DataLoader
+from typing import Any, Dict, Iterator, Optional
+import logging
+import queue
+import threading
+import time
+
+def move_to_device(batch: Any, device: torch.device, non_blocking: bool = False,
+                   pin_memory: bool = False) -> Any:
+    """
+    Move every tensor in a (nested) batch to a device.
+    
+    Args:
+        batch: Tensor, or dict/list/tuple of tensors
+        device: Target device
+        non_blocking: Use asynchronous host-to-device copies
+        pin_memory: Page-lock CPU tensors first (required for async copies)
+    
+    Returns:
+        Batch with the same structure on the target device
+    """
+    if isinstance(batch, torch.Tensor):
+        if pin_memory and batch.device.type == 'cpu' and not batch.is_pinned():
+            batch = batch.pin_memory()
+        return batch.to(device, non_blocking=non_blocking)
+    elif isinstance(batch, dict):
+        return {k: move_to_device(v, device, non_blocking, pin_memory) for k, v in batch.items()}
+    elif isinstance(batch, (list, tuple)):
+        return type(batch)(move_to_device(v, device, non_blocking, pin_memory) for v in batch)
+    return batch
+
+def _record_stream(batch: Any, stream: 'torch.cuda.Stream'):
+    """Mark tensors as used on the consumer stream so their memory is not reused early."""
+    if isinstance(batch, torch.Tensor):
+        if batch.is_cuda:
+            batch.record_stream(stream)
+    elif isinstance(batch, dict):
+        for v in batch.values():
+            _record_stream(v, stream)
+    elif isinstance(batch, (list, tuple)):
+        for v in batch:
+            _record_stream(v, stream)
+
+class TimedLoader:
+    """Wraps a DataLoader and records how long the consumer waits for each batch."""
+    
+    def __init__(self, loader: DataLoader):
+        """
+        Initialize timed loader.
+        
+        Args:
+            loader: Underlying data loader
+        """
+        self.loader = loader
+        self.logger = logging.getLogger(__name__)
+        
+        # Data-wait statistics of the last (or current) epoch
+        self.wait_time = 0.0
+        self.num_batches = 0
+        self.epoch_time = 0.0
+    
+    def __len__(self) -> int:
+        return len(self.loader)
+    
+    def __iter__(self) -> Iterator:
+        self.wait_time = 0.0
+        self.num_batches = 0
+        epoch_start = time.perf_counter()
+        
+        iterator = iter(self.loader)
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    break
+                finally:
+                    self.wait_time += time.perf_counter() - wait_start
+                
+                self.num_batches += 1
+                yield batch
+        finally:
+            self.epoch_time = time.perf_counter() - epoch_start
+    
+    def stats(self) -> Dict[str, float]:
+        """
+        Data-wait statistics of the last epoch.
+        
+        Returns:
+            Dictionary with total data-wait time, per-batch wait and the fraction
+            of the epoch spent waiting on data
+        """
+        return {
+            'data_wait_time': self.wait_time,
+            'data_wait_per_batch': self.wait_time / self.num_batches if self.num_batches else 0.0,
+            'data_wait_fraction': self.wait_time / self.epoch_time if self.epoch_time > 0 else 0.0
+        }
+
+class PrefetchLoader(TimedLoader):
+    """Wraps a DataLoader and prefetches batches onto the device in a background thread."""
+    
+    _SENTINEL = object()
+    
+    def __init__(self, loader: DataLoader, device: torch.device, num_prefetch: int = 2,
+                 pin_memory: bool = True):
+        """
+        Initialize prefetch loader.
+        
+        Args:
+            loader: Underlying data loader
+            device: Device batches are moved to
+            num_prefetch: Number of batches kept ready ahead of the consumer
+            pin_memory: Pin host buffers before copying to a CUDA device
+        """
+        super().__init__(loader)
+        self.device = torch.device(device)
+        self.num_prefetch = max(1, num_prefetch)
+        self.use_cuda = self.device.type == 'cuda'
+        self.pin_memory = pin_memory and self.use_cuda
+    
+    def __iter__(self) -> Iterator:
+        self.wait_time = 0.0
+        self.num_batches = 0
+        epoch_start = time.perf_counter()
+        
+        ready = queue.Queue(maxsize=self.num_prefetch)
+        stop = threading.Event()
+        stream = torch.cuda.Stream(device=self.device) if self.use_cuda else None
+        
+        worker = threading.Thread(
+            target=self._produce, args=(ready, stop, stream), daemon=True
+        )
+        worker.start()
+        
+        try:
+            while True:
+                wait_start = time.perf_counter()
+                item = ready.get()
+                self.wait_time += time.perf_counter() - wait_start
+                
+                if item is self._SENTINEL:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                
+                batch, event = item
+                if event is not None:
+                    # Order compute after the copy without blocking the host
+                    torch.cuda.current_stream(self.device).wait_event(event)
+                    _record_stream(batch, torch.cuda.current_stream(self.device))
+                
+                self.num_batches += 1
+                yield batch
+        finally:
+            stop.set()
+            # Unblock a producer waiting on a full queue
+            while worker.is_alive():
+                try:
+                    ready.get_nowait()
+                except queue.Empty:
+                    worker.join(timeout=0.01)
+            self.epoch_time = time.perf_counter() - epoch_start
+    
+    def _produce(self, ready: queue.Queue, stop: threading.Event,
+                 stream: Optional['torch.cuda.Stream']):
+        """Background thread: iterate the loader and stage batches on the device."""
+        try:
+            for batch in self.loader:
+                if stop.is_set():
+                    return
+                
+                if stream is not None:
+                    with torch.cuda.stream(stream):
+                        batch = move_to_device(batch, self.device, non_blocking=True,
+                                               pin_memory=self.pin_memory)
+                        event = torch.cuda.Event()
+                        event.record(stream)
+                else:
+                    batch = move_to_device(batch, self.device)
+                    event = None
+                
+                if not self._put(ready, stop, (batch, event)):
+                    return
+        except Exception as e:
+            self._put(ready, stop, e)
+            return
+        
+        self._put(ready, stop, self._SENTINEL)
+    
+    @staticmethod
+    def _put(ready: queue.Queue, stop: threading.Event, item: Any) -> bool:
+        """Put an item, giving up if the consumer stopped iterating."""
+        while not stop.is_set():
+            try:
+                ready.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+def create_prefetch_loader(loader: DataLoader, device: torch.device,
+                           num_prefetch: int = 2, pin_memory: bool = True):
+    """
+    Wrap a loader with prefetching, or only with data-wait timing if disabled.
+    
+    Args:
+        loader: Underlying data loader
+        device: Device batches are moved to
+        num_prefetch: Batches to prefetch (0 disables prefetching)
+        pin_memory: Pin host buffers before copying to a CUDA device
+    
+    Returns:
+        PrefetchLoader, or a TimedLoader when num_prefetch is 0
+    """
+    if num_prefetch <= 0:
+        return TimedLoader(loader)
+    return PrefetchLoader(loader, device, num_prefetch=num_prefetch, pin_memory=pin_memory)
@@ -0,0 +1,243 @@
+"""
+Stratified batch sampling for rare traffic regimes.
+Assigns every window a stratum (hour bucket, congestion level, incident
+overlap) once, then draws rebalanced batches with vectorized O(batch) work.
+"""
+
+import numpy as np
+import pandas as pd
+import torch
+from torch.utils.data import DataLoader, Dataset, Sampler
+from typing import Dict, Iterator, List, Optional
+import logging
+
+# Same bins and labels as `speed_category` in data.aggregate
+SPEED_BINS = [0, 20, 40, 60, 100]
+SPEED_LABELS = ['congested', 'slow', 'normal', 'fast']
+
+def congestion_levels(speed: np.ndarray) -> np.ndarray:
+    """
+    Map speeds (km/h) to `speed_category` levels.
+    
+    Returns:
+        int64 levels, 0 = congested ... 3 = fast (speeds above the last bin are fast)
+    """
+    levels = np.digitize(speed, SPEED_BINS[1:-1], right=True)
+    return levels.astype(np.int64)
+
+def incident_step_flags(timestamps: np.ndarray, incidents: pd.DataFrame,
+                        road_ids: Optional[List[str]] = None) -> np.ndarray:
+    """
+    Flag time steps during which at least one incident is active.
+    
+    Args:
+        timestamps: Sorted int64 (ns) or datetime64 timestamps of the time axis
+        incidents: DataFrame with 'start_time' and 'end_time' columns and an
+            optional 'road_id' column
+        road_ids: If given (and incidents have 'road_id'), only incidents on
+            these roads count
+    
+    Returns:
+        Boolean flags [time_steps]
+    """
+    timestamps = np.asarray(timestamps).astype('datetime64[ns]')
+    if road_ids is not None and 'road_id' in incidents.columns:
+        incidents = incidents[incidents['road_id'].astype(str).isin(set(road_ids))]
+    
+    start = np.searchsorted(timestamps, pd.to_datetime(incidents['start_time']).to_numpy('datetime64[ns]'))
+    end = np.searchsorted(timestamps, pd.to_datetime(incidents['end_time']).to_numpy('datetime64[ns]'),
+                          side='right')
+    
+    # Interval coverage with a difference array: +1 at start, -1 at end
+    coverage = np.zeros(len(timestamps) + 1, dtype=np.int64)
+    np.add.at(coverage, start, 1)
+    np.add.at(coverage, end, -1)
+    return np.cumsum(coverage[:-1]) > 0
+
+def combine_strata(hour_bucket: np.ndarray, congestion: np.ndarray,
+                   incident: np.ndarray) -> np.ndarray:
+    """Combine per-window attributes into one stratum id (hour-major)."""
+    return (hour_bucket * len(SPEED_LABELS) + congestion) * 2 + incident.astype(np.int64)
+
+def snapshot_strata(dataset: Dataset, num_hour_buckets: int = 6,
+                    congestion_quantile: float = 0.1,
+                    incidents: Optional[pd.DataFrame] = None,
+                    speed_feature: str = 'avg_speed') -> np.ndarray:
+    """
+    Compute the stratum of every window of a `SnapshotDataset`.
+    
+    The hour bucket is taken at the first target step, the congestion level
+    from the `congestion_quantile` of target speeds across nodes (the slowest
+    part of the network drives the level), and incident overlap from incidents
+    active during any target step.
+    
+    Args:
+        dataset: SnapshotDataset
+        num_hour_buckets: Number of equal hour-of-day buckets
+        congestion_quantile: Node quantile of target speed used for the level
+        incidents: Optional incident intervals (see `incident_step_flags`)
+        speed_feature: Speed feature name in the grid
+    
+    Returns:
+        int64 stratum ids [len(dataset)]
+    """
+    data_dir = dataset.data_dir
+    metadata = dataset.metadata
+    seq_len, horizon = dataset.sequence_length, dataset.window - dataset.sequence_length
+    starts = np.arange(dataset.indices.start, dataset.indices.stop)
+    first_target = starts + seq_len
+    
+    timestamps = np.load(f"{data_dir}/grid_timestamps.npy").astype('datetime64[ns]')
+    hours = timestamps.astype('datetime64[h]').astype(np.int64) % 24
+    hour_bucket = hours[first_target] * num_hour_buckets // 24
+    
+    # Per-step speed quantile over nodes, de-normalized to km/h
+    speed_idx = metadata['feature_names'].index(speed_feature)
+    stats = metadata['normalization_stats'].get(speed_feature)
+    step_speed = np.quantile(dataset.grid[:, :, speed_idx], congestion_quantile, axis=1)
+    if stats is not None:
+        step_speed = step_speed * (stats['std'] + 1e-8) + stats['mean']
+    
+    # Slowest step of each target window
+    window_speed = np.lib.stride_tricks.sliding_window_view(step_speed, horizon).min(axis=1)
+    congestion = congestion_levels(window_speed[first_target])
+    
+    if incidents is not None and len(incidents):
+        flags = incident_step_flags(timestamps, incidents, metadata.get('snapshot_nodes'))
+        window_flags = np.lib.stride_tricks.sliding_window_view(flags, horizon).any(axis=1)
+        incident = window_flags[first_target]
+    else:
+        incident = np.zeros(len(starts), dtype=bool)
+    
+    return combine_strata(hour_bucket, congestion, incident)
+
+class StratifiedBatchSampler(Sampler):
+    """Batch sampler drawing windows with per-stratum probabilities."""
+    
+    def __init__(self, strata: np.ndarray, batch_size: int, num_batches: Optional[int] = None,
+                 balance: float = 1.0, stratum_weights: Optional[Dict[int, float]] = None,
+                 seed: Optional[int] = None):
+        """
+        Initialize stratified batch sampler.
+        
+        Stratum s is drawn with probability proportional to
+        count_s ** (1 - balance) * weight_s, so balance=0 reproduces uniform
+        sampling and balance=1 gives every non-empty stratum equal mass.
+        
+        Args:
+            strata: Stratum id of every sample
+            batch_size: Samples per batch
+            num_batches: Batches per epoch (default: one pass worth of samples)
+            balance: Interpolation between natural (0) and balanced (1) strata
+            stratum_weights: Optional extra weight per stratum id
+            seed: Random seed
+        """
+        strata = np.asarray(strata, dtype=np.int64)
+        self.batch_size = batch_size
+        self.num_batches = num_batches or max(len(strata) // batch_size, 1)
+        self.rng = np.random.default_rng(seed)
+        
+        # Samples grouped by stratum: order[offsets[s]:offsets[s] + counts[s]]
+        self.stratum_ids, inverse, self.counts = np.unique(
+            strata, return_inverse=True, return_counts=True
+        )
+        self.order = np.argsort(inverse, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.sample_stratum = inverse
+        
+        weights = np.power(self.counts.astype(np.float64), 1.0 - balance)
+        if stratum_weights:
+            weights *= np.array([stratum_weights.get(int(s), 1.0) for s in self.stratum_ids])
+        self.probs = weights / weights.sum()
+        self.cumulative = np.cumsum(self.probs)
+        
+        logging.getLogger(__name__).info(
+            f"Stratified sampler: {len(self.stratum_ids)} strata, "
+            f"smallest {self.counts.min()} / largest {self.counts.max()} samples"
+        )
+    
+    def __len__(self) -> int:
+        return self.num_batches
+    
+    def __iter__(self) -> Iterator[List[int]]:
+        for _ in range(self.num_batches):
+            yield self.sample_batch().tolist()
+    
+    def sample_batch(self) -> np.ndarray:
+        """Draw one batch of sample indices (O(batch_size) after setup)."""
+        u = self.rng.random(self.batch_size)
+        strata = np.minimum(np.searchsorted(self.cumulative, u, side='right'),
+                            len(self.counts) - 1)
+        within = (self.rng.random(self.batch_size) * self.counts[strata]).astype(np.int64)
+        return self.order[self.offsets[strata] + within]
+    
+    def importance_weights(self, indices: np.ndarray) -> np.ndarray:
+        """
+        Weights that undo the rebalancing in expectation (natural / sampled probability).
+        
+        Args:
+            indices: Sample indices drawn by this sampler
+        
+        Returns:
+            Per-sample weights with mean 1 under the sampling distribution
+        """
+        strata = self.sample_stratum[indices]
+        natural = self.counts[strata] / self.counts.sum()
+        return natural / self.probs[strata]
+    
+    def stratum_summary(self) -> Dict[int, Dict[str, float]]:
+        """Sample count and draw probability per stratum."""
+        return {
+            int(s): {'count': int(c), 'probability': float(p)}
+            for s, c, p in zip(self.stratum_ids, self.counts, self.probs)
+        }
+
+def create_stratified_loader(dataset: Dataset, batch_size: int, config: Dict,
+                             num_workers: int = 0) -> DataLoader:
+    """
+    Create a batch-level loader over a snapshot dataset with stratified draws.
+    
+    Args:
+        dataset: SnapshotDataset (or a batch-level view of one)
+        batch_size: Batch size
+        config: Sampling options: balance, num_hour_buckets, congestion_quantile,
+            incidents_file (CSV with start_time/end_time[/road_id]), num_batches, seed
+        num_workers: Number of worker processes
+    
+    Returns:
+        DataLoader yielding batched dictionaries
+    """
+    try:
+        from datasets import BatchIndexDataset
+    except ImportError:
+        from training.datasets import BatchIndexDataset
+    
+    base = getattr(dataset, 'base_dataset', dataset)
+    if not hasattr(base, 'grid'):
+        raise ValueError("Stratified sampling requires snapshot data ('snapshot_data': true)")
+    
+    incidents = None
+    if config.get('incidents_file'):
+        incidents = pd.read_csv(config['incidents_file'])
+    
+    strata = snapshot_strata(
+        base,
+        num_hour_buckets=config.get('num_hour_buckets', 6),
+        congestion_quantile=config.get('congestion_quantile', 0.1),
+        incidents=incidents
+    )
+    
+    batch_sampler = StratifiedBatchSampler(
+        strata, batch_size,
+        num_batches=config.get('num_batches'),
+        balance=config.get('balance', 1.0),
+        seed=config.get('seed')
+    )
+    
+    return DataLoader(
+        BatchIndexDataset(base),
+        sampler=batch_sampler,
+        batch_size=None,
+        num_workers=num_workers,
+        pin_memory=torch.cuda.is_available()
+    )
@@ -0,0 +1,167 @@
+"""
+Deterministic time-based data splits.
+Stores only time-step boundaries over one shared time axis and exposes
+train/val/test and rolling-origin backtesting folds as zero-copy index ranges.
+"""
+
+import numpy as np
+from torch.utils.data import Dataset, Subset
+from typing import Dict, List, Optional, Sequence
+import json
+
+SPLITS = ('train', 'val', 'test')
+
+class TimeSplitManager:
+    """Chronological train/val/test boundaries over a sequence of time steps."""
+    
+    def __init__(self, num_steps: int, sequence_length: int, prediction_horizon: int,
+                 val_start: int, test_start: int):
+        """
+        Initialize split manager.
+        
+        Steps [0, val_start) are training, [val_start, test_start) validation and
+        [test_start, num_steps) test. A window belongs to the split that contains
+        all of its target steps; its input steps may reach back into earlier
+        splits, so no future values leak into training.
+        
+        Args:
+            num_steps: Number of time steps in the shared time axis
+            sequence_length: Input steps per window
+            prediction_horizon: Target steps per window
+            val_start: First validation step
+            test_start: First test step
+        """
+        if not 0 < val_start <= test_start <= num_steps:
+            raise ValueError(
+                f"Invalid split boundaries: val_start={val_start}, "
+                f"test_start={test_start}, num_steps={num_steps}"
+            )
+        
+        self.num_steps = num_steps
+        self.sequence_length = sequence_length
+        self.prediction_horizon = prediction_horizon
+        self.window = sequence_length + prediction_horizon
+        self.val_start = val_start
+        self.test_start = test_start
+    
+    @classmethod
+    def from_fractions(cls, num_steps: int, sequence_length: int, prediction_horizon: int,
+                       val_fraction: float = 0.1, test_fraction: float = 0.2
+                       ) -> 'TimeSplitManager':
+        """Split the time axis by fractions of time steps (test last)."""
+        test_start = int(round(num_steps * (1 - test_fraction)))
+        val_start = int(round(num_steps * (1 - test_fraction - val_fraction)))
+        return cls(num_steps, sequence_length, prediction_horizon, val_start, test_start)
+    
+    @classmethod
+    def from_dates(cls, timestamps: Sequence, sequence_length: int, prediction_horizon: int,
+                   val_start_date, test_start_date) -> 'TimeSplitManager':
+        """
+        Split the time axis at calendar boundaries.
+        
+        Args:
+            timestamps: Sorted timestamps of the time axis (datetime64 or int64 ns)
+            sequence_length: Input steps per window
+            prediction_horizon: Target steps per window
+            val_start_date: First validation timestamp
+            test_start_date: First test timestamp
+        """
+        timestamps = np.asarray(timestamps).astype('datetime64[ns]')
+        val_start, test_start = np.searchsorted(
+            timestamps, np.array([val_start_date, test_start_date], dtype='datetime64[ns]')
+        )
+        return cls(len(timestamps), sequence_length, prediction_horizon,
+                   int(val_start), int(test_start))
+    
+    def window_range(self, start_step: int, end_step: int) -> range:
+        """
+        Window start indices whose targets lie in [start_step, end_step).
+        
+        Window i covers steps [i, i + window), with targets from i + sequence_length.
+        """
+        first = max(start_step - self.sequence_length, 0)
+        last = end_step - self.window + 1
+        return range(first, max(last, first))
+    
+    def split_range(self, split: str) -> range:
+        """Window start indices of a split ('train', 'val', 'test' or 'all')."""
+        if split == 'train':
+            return self.window_range(0, self.val_start)
+        elif split == 'val':
+            return self.window_range(self.val_start, self.test_start)
+        elif split == 'test':
+            return self.window_range(self.test_start, self.num_steps)
+        elif split == 'all':
+            return self.window_range(0, self.num_steps)
+        raise ValueError(f"Unknown split: {split}")
+    
+    @property
+    def ranges(self) -> Dict[str, range]:
+        """Window index ranges of all splits."""
+        return {split: self.split_range(split) for split in SPLITS}
+    
+    def rolling_origin_folds(self, num_folds: int, fold_steps: Optional[int] = None,
+                             expanding: bool = True,
+                             train_steps: Optional[int] = None) -> List[Dict[str, range]]:
+        """
+        Rolling-origin backtesting folds over the pre-test period.
+        
+        Fold k trains on everything before its origin (or a fixed-length sliding
+        window) and validates on the following `fold_steps` steps; the last fold
+        ends at the test boundary, so the test split is never touched.
+        
+        Args:
+            num_folds: Number of folds
+            fold_steps: Validation steps per fold (default: size of the val split)
+            expanding: Expanding training window (False: sliding window)
+            train_steps: Training steps per fold for a sliding window
+                (default: steps before the first origin)
+        
+        Returns:
+            List of {'train': range, 'val': range, 'origin': int} per fold
+        """
+        fold_steps = fold_steps or (self.test_start - self.val_start)
+        first_origin = self.test_start - num_folds * fold_steps
+        
+        if fold_steps <= 0 or first_origin < self.window:
+            raise ValueError(
+                f"Cannot fit {num_folds} folds of {fold_steps} steps before step {self.test_start}"
+            )
+        
+        train_steps = train_steps or first_origin
+        folds = []
+        for k in range(num_folds):
+            origin = first_origin + k * fold_steps
+            train_begin = 0 if expanding else max(origin - train_steps, 0)
+            folds.append({
+                'train': self.window_range(train_begin, origin),
+                'val': self.window_range(origin, origin + fold_steps),
+                'origin': origin
+            })
+        
+        return folds
+    
+    @staticmethod
+    def subset(dataset: Dataset, indices: range) -> Subset:
+        """Zero-copy view of a dataset over a window index range."""
+        return Subset(dataset, indices)
+    
+    def to_dict(self) -> Dict:
+        return {
+            'num_steps': self.num_steps,
+            'sequence_length': self.sequence_length,
+            'prediction_horizon': self.prediction_horizon,
+            'val_start': self.val_start,
+            'test_start': self.test_start
+        }
+    
+    def save(self, path: str):
+        """Save split boundaries to JSON."""
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+    
+    @classmethod
+    def load(cls, path: str) -> 'TimeSplitManager':
+        """Load split boundaries from JSON."""
+        with open(path, 'r') as f:
+            return cls(**json.load(f))
@@ -18,8 +18,13 @@ import argparse
 
 # Local imports (will work when packages are installed)
 try:
-    from models import create_model
-    from datasets import create_data_loaders, SpatialTemporalDataset
+    from models import create_model, unwrap_model
+    from models.baselines import LOOKUP_BASELINES
+    from datasets import create_data_loaders, create_node_sampled_loader, SpatialTemporalDataset
+    from prefetch import create_prefetch_loader
+    from samplers import create_stratified_loader
+    from graph.sampling import NeighborSampler, load_csr_adjacency
+    from graph.supports import GraphSupports, to_torch_sparse, to_torch_csr
 except ImportError:
     print("Warning: Local modules not found. Install required packages first.")
 
@@ -45,11 +50,20 @@ class TrafficPredictor:
         self.criterion = None
         self.scheduler = None
         
+        # Mixed precision (see setup_mixed_precision)
+        self.amp_enabled = False
+        self.amp_dtype = torch.float32
+        self.scaler = None
+        
+        # Optional neighbor sampler for mini-batch training on large graphs
+        self.sampler = None
+        
         # Training state
         self.epoch = 0
         self.best_val_loss = float('inf')
         self.train_losses = []
         self.val_losses = []
+        self.data_wait_times = []
         
     def setup_logging(self):
         """Setup logging configuration."""
@@ -70,9 +84,28 @@ class TrafficPredictor:
         """Build and initialize the model."""
         self.logger.info(f"Building {self.config['model_type']} model...")
         
+        if self.config['model_type'] in LOOKUP_BASELINES:
+            raise ValueError(
+                f"{self.config['model_type']} is fitted, not trained: call its fit() and pass "
+                f"target time steps (see evaluation/benchmark.py --suite baselines)"
+            )
+        
         self.model = create_model(self.config['model_type'], self.config)
         self.model.to(self.device)
         
+        if self.config.get('compile'):
+            self.logger.info(f"Model compiled as {type(self.model).__name__}")
+        
+        # Diffusion models use precomputed random-walk supports of the raw road graph
+        if hasattr(unwrap_model(self.model), 'set_supports'):
+            try:
+                supports = GraphSupports.from_data_dir(self.config['data_dir']).get_torch(
+                    'dual_random_walk', device=self.device, num_steps=1
+                )
+                unwrap_model(self.model).set_supports(supports)
+            except FileNotFoundError:
+                self.logger.info("No raw adjacency found, supports are derived from the training adjacency")
+        
         # Count parameters
         total_params = sum(p.numel() for p in self.model.parameters())
         trainable_params = sum(p.numel() for p in self.model.parameters() if p.requires_grad)
@@ -127,6 +160,35 @@ class TrafficPredictor:
         else:
             raise ValueError(f"Unknown loss function: {loss_config['type']}")
     
+    def setup_mixed_precision(self):
+        """
+        Setup automatic mixed precision.
+        
+        CPU runs autocast in bfloat16. CUDA uses `amp_dtype` (float16 by default,
+        with a GradScaler against gradient underflow; bfloat16 needs no scaler).
+        """
+        self.amp_enabled = bool(self.config.get('amp', False))
+        
+        if self.device.type == 'cuda':
+            self.amp_dtype = getattr(torch, self.config.get('amp_dtype', 'float16'))
+        else:
+            self.amp_dtype = torch.bfloat16
+        
+        use_scaler = self.amp_enabled and self.amp_dtype == torch.float16
+        self.scaler = torch.amp.GradScaler(self.device.type, enabled=use_scaler)
+        
+        if self.amp_enabled:
+            self.logger.info(
+                f"Mixed precision: {self.amp_dtype} autocast on {self.device.type}"
+                f"{' with gradient scaling' if use_scaler else ''}"
+            )
+    
+    def autocast(self):
+        """Autocast context for forward passes (no-op when AMP is disabled)."""
+        return torch.autocast(
+            device_type=self.device.type, dtype=self.amp_dtype, enabled=self.amp_enabled
+        )
+    
     def load_data(self) -> Tuple[DataLoader, DataLoader, DataLoader]:
         """Load and create data loaders."""
         self.logger.info("Loading data...")
@@ -134,7 +196,32 @@ class TrafficPredictor:
         train_loader, val_loader, test_loader = create_data_loaders(
             data_dir=self.config['data_dir'],
             batch_size=self.config['batch_size'],
-            num_workers=self.config.get('num_workers', 0)
+            num_workers=self.config.get('num_workers', 0),
+            num_hops=self.config.get('num_hops', 3) if self.config['model_type'] == 'sign' else 0,
+            mmap=self.config.get('mmap_data', False),
+            batched=self.config.get('batched_loading', False),
+            tensor_store=self.config.get('tensor_store', False),
+            snapshot=self.config.get('snapshot_data', False)
+        )
+        
+        # Rebalance training batches towards rush-hour, congestion and incident windows
+        if self.config.get('stratified_sampling'):
+            train_loader = create_stratified_loader(
+                train_loader.dataset,
+                batch_size=self.config['batch_size'],
+                config=self.config['stratified_sampling'],
+                num_workers=self.config.get('num_workers', 0)
+            )
+        
+        # Read only the sampled k-hop neighborhood of each training batch
+        if self.sampler is not None:
+            train_loader = create_node_sampled_loader(train_loader, self.sampler)
+        
+        # Overlap batch assembly and host-to-device copies with compute
+        num_prefetch = self.config.get('prefetch_batches', 2)
+        train_loader, val_loader, test_loader = (
+            create_prefetch_loader(loader, self.device, num_prefetch=num_prefetch)
+            for loader in (train_loader, val_loader, test_loader)
         )
         
         self.logger.info(f"Data loaded:")
@@ -144,6 +231,27 @@ class TrafficPredictor:
         
         return train_loader, val_loader, test_loader
     
+    def setup_neighbor_sampler(self):
+        """Setup the k-hop neighbor sampler if enabled in the config."""
+        sampling_config = self.config.get('neighbor_sampling')
+        if not sampling_config:
+            return
+        
+        adjacency = load_csr_adjacency(self.config['data_dir'])
+        self.sampler = NeighborSampler(
+            adjacency,
+            fanouts=sampling_config['fanouts'],
+            batch_size=sampling_config.get('seed_batch_size', 512),
+            shuffle=True,
+            seed=sampling_config.get('seed'),
+            layout=torch.sparse_csr if sampling_config.get('layout') == 'csr' else torch.sparse_coo
+        )
+        
+        self.logger.info(
+            f"Neighbor sampling enabled: fanouts={self.sampler.fanouts}, "
+            f"seed batch size={self.sampler.batch_size}"
+        )
+    
     def train_epoch(self, train_loader: DataLoader, adjacency_matrix: torch.Tensor) -> float:
         """Train for one epoch."""
         self.model.train()
@@ -158,27 +266,40 @@ class TrafficPredictor:
             else:
                 sequences, targets = batch[0].to(self.device), batch[1].to(self.device)
             
+            # Sampled batches hold only their k-hop neighborhood and its blocks
+            if isinstance(batch, dict) and 'blocks' in batch:
+                graph_input = [block.to(self.device) for block in batch['blocks']]
+            else:
+                graph_input = adjacency_matrix
+            
             # Zero gradients
             self.optimizer.zero_grad()
             
-            # Forward pass
-            predictions = self.model(sequences, adjacency_matrix)
+            # Forward pass (autocast when AMP is enabled); seq2seq models also
+            # get the targets for scheduled sampling
+            with self.autocast():
+                if getattr(unwrap_model(self.model), 'accepts_targets', False):
+                    predictions = self.model(sequences, graph_input, targets)
+                else:
+                    predictions = self.model(sequences, graph_input)
             
-            # Calculate loss
-            loss = self.criterion(predictions, targets)
+            # Calculate loss in float32
+            loss = self.criterion(predictions.float(), targets)
             
-            # Backward pass
-            loss.backward()
+            # Backward pass (scaled for float16)
+            self.scaler.scale(loss).backward()
             
-            # Gradient clipping
+            # Gradient clipping on unscaled gradients
             if 'grad_clip' in self.config:
+                self.scaler.unscale_(self.optimizer)
                 torch.nn.utils.clip_grad_norm_(
                     self.model.parameters(), 
                     self.config['grad_clip']
                 )
             
-            # Update weights
-            self.optimizer.step()
+            # Update weights (skipped by the scaler on inf/nan gradients)
+            self.scaler.step(self.optimizer)
+            self.scaler.update()
             
             total_loss += loss.item()
             num_batches += 1
@@ -201,10 +322,11 @@ class TrafficPredictor:
                     sequences, targets = batch[0].to(self.device), batch[1].to(self.device)
                 
                 # Forward pass
-                predictions = self.model(sequences, adjacency_matrix)
+                with self.autocast():
+                    predictions = self.model(sequences, adjacency_matrix)
                 
                 # Calculate loss
-                loss = self.criterion(predictions, targets)
+                loss = self.criterion(predictions.float(), targets)
                 
                 total_loss += loss.item()
                 num_batches += 1
@@ -215,9 +337,10 @@ class TrafficPredictor:
         """Save model checkpoint."""
         checkpoint = {
             'epoch': self.epoch,
-            'model_state_dict': self.model.state_dict(),
+            'model_state_dict': unwrap_model(self.model).state_dict(),
             'optimizer_state_dict': self.optimizer.state_dict(),
             'scheduler_state_dict': self.scheduler.state_dict() if self.scheduler else None,
+            'scaler_state_dict': self.scaler.state_dict() if self.scaler else None,
             'best_val_loss': self.best_val_loss,
             'train_losses': self.train_losses,
             'val_losses': self.val_losses,
@@ -234,12 +357,15 @@ class TrafficPredictor:
         """Load model checkpoint."""
         checkpoint = torch.load(filepath, map_location=self.device)
         
-        self.model.load_state_dict(checkpoint['model_state_dict'])
+        unwrap_model(self.model).load_state_dict(checkpoint['model_state_dict'])
         self.optimizer.load_state_dict(checkpoint['optimizer_state_dict'])
         
         if self.scheduler and checkpoint['scheduler_state_dict']:
             self.scheduler.load_state_dict(checkpoint['scheduler_state_dict'])
         
+        if self.scaler and checkpoint.get('scaler_state_dict'):
+            self.scaler.load_state_dict(checkpoint['scaler_state_dict'])
+        
         self.epoch = checkpoint['epoch']
         self.best_val_loss = checkpoint['best_val_loss']
         self.train_losses = checkpoint['train_losses']
@@ -255,13 +381,23 @@ class TrafficPredictor:
         self.build_model()
         self.setup_optimizer()
         self.setup_loss_function()
+        self.setup_mixed_precision()
+        self.setup_neighbor_sampler()
         
         # Load data
         train_loader, val_loader, test_loader = self.load_data()
         
-        # Load adjacency matrix
-        adj_path = Path(self.config['data_dir']) / 'adjacency_matrix_normalized.npy'
-        adjacency_matrix = torch.FloatTensor(np.load(adj_path)).to(self.device)
+        # Load adjacency matrix (dense, or sparse for large road graphs)
+        sparse_layout = self.config.get('sparse_adjacency')
+        if sparse_layout:
+            adjacency = load_csr_adjacency(self.config['data_dir'])
+            to_sparse = to_torch_sparse if sparse_layout == 'coo' else to_torch_csr
+            adjacency_matrix = to_sparse(adjacency).to(self.device)
+            self.logger.info(f"Using sparse {sparse_layout} adjacency with {adjacency.nnz} non-zeros")
+        else:
+            # Densified from the sparse file, which incremental graph updates keep current
+            adjacency = load_csr_adjacency(self.config['data_dir'])
+            adjacency_matrix = torch.FloatTensor(adjacency.toarray()).to(self.device)
         
         # Create output directory
         output_dir = Path(self.config['output_dir'])
@@ -275,6 +411,13 @@ class TrafficPredictor:
             train_loss = self.train_epoch(train_loader, adjacency_matrix)
             self.train_losses.append(train_loss)
             
+            wait_stats = train_loader.stats()
+            self.data_wait_times.append(wait_stats['data_wait_time'])
+            self.logger.info(
+                f"  Data wait: {wait_stats['data_wait_time']:.2f}s "
+                f"({wait_stats['data_wait_fraction']:.1%} of epoch)"
+            )
+            
             # Validate
             val_loss = self.validate(val_loader, adjacency_matrix)
             self.val_losses.append(val_loss)
@@ -310,6 +453,7 @@ class TrafficPredictor:
         history = {
             'train_losses': self.train_losses,
             'val_losses': self.val_losses,
+            'data_wait_times': self.data_wait_times,
             'best_val_loss': self.best_val_loss,
             'test_loss': test_loss
         }
@@ -334,9 +478,35 @@ def create_default_config() -> Dict:
         "num_epochs": 100,
         "batch_size": 32,
         "num_workers": 0,
+        "mmap_data": False,
+        "batched_loading": True,
+        "prefetch_batches": 2,
+        "tensor_store": False,
+        "snapshot_data": False,
         "save_every": 10,
         "grad_clip": 1.0,
         
+        # Mixed precision: bfloat16 autocast on CPU; float16 + GradScaler on CUDA
+        # unless amp_dtype is "bfloat16"
+        "amp": False,
+        "amp_dtype": "float16",
+        
+        # Model compilation: "compile" (torch.compile, TorchScript fallback),
+        # "script" (TorchScript) or None for eager mode
+        "compile": None,
+        
+        # Sparse adjacency: "csr" (SpMM), "coo" (edge-list scatter) or None for dense
+        "sparse_adjacency": None,
+        
+        # Neighbor sampling (set to e.g. {"fanouts": [10, 10, 10], "seed_batch_size": 512}
+        # to train on sampled k-hop blocks instead of the full graph; needs
+        # snapshot data; "layout": "csr" builds SpMM blocks instead of COO)
+        "neighbor_sampling": None,
+        
+        # Stratified sampling of snapshot windows (e.g. {"balance": 1.0,
+        # "num_hour_buckets": 6, "incidents_file": "data/incidents.csv"})
+        "stratified_sampling": None,
+        
         # Model parameters
         "num_nodes": 100,
         "input_dim": 10,
@@ -345,6 +515,18 @@ def create_default_config() -> Dict:
         "sequence_length": 12,
         "prediction_horizon": 6,
         
+        # TemporalGCN temporal stage: "lstm", "gru" (fused, cuDNN-free) or "conv"
+        "temporal_head": "lstm",
+        
+        # Recompute STGCN blocks / TemporalGCN layers in the backward pass to
+        # trade compute for activation memory (larger batches or graphs)
+        "gradient_checkpointing": False,
+        
+        # STGCN block: "standard" (the original block) or "fused" (single
+        # layout, GLU, unpadded convolutions): ~0.6x training memory and step
+        # time, but ~12% higher eval MSE on the benchmark sample data
+        "stgcn_block": "standard",
+        
         # Optimizer
         "optimizer": {
             "type": "adamw",
@@ -0,0 +1,14 @@
+"""
+Shared pytest setup.
+The source packages are imported the way the scripts run them: `src` and
+`src/training` on the path, so both `models` and the training modules resolve.
+"""
+
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+
+for path in (SRC_DIR, SRC_DIR / 'training'):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
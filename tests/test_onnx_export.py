@@ -0,0 +1,68 @@
+"""ONNX files are reused only while they match their source checkpoint."""
+
+import pytest
+import torch
+
+pytest.importorskip('onnx')
+pytest.importorskip('onnxruntime')
+
+from evaluation.onnx_export import (
+    checkpoint_hash, load_onnx_model, onnx_checkpoint_hash, onnx_path_for
+)
+from models import create_model, example_inputs
+
+CONFIG = {
+    'model_type': 'temporal_gcn', 'num_nodes': 6, 'input_dim': 2, 'output_dim': 1,
+    'hidden_dim': 8, 'sequence_length': 4, 'prediction_horizon': 2
+}
+
+def save_checkpoint(path, seed: int):
+    torch.manual_seed(seed)
+    model = create_model(CONFIG['model_type'], CONFIG)
+    torch.save({'model_state_dict': model.state_dict(), 'config': CONFIG}, path)
+    return model.eval()
+
+def test_stale_onnx_is_detected_and_reexported(tmp_path):
+    model_path = tmp_path / 'final_model.pth'
+    onnx_path = onnx_path_for(str(model_path))
+    save_checkpoint(model_path, seed=0)
+    
+    with pytest.raises(FileNotFoundError):
+        load_onnx_model(str(model_path), CONFIG, export_missing=False)
+    
+    load_onnx_model(str(model_path), CONFIG)
+    assert onnx_checkpoint_hash(str(onnx_path)) == checkpoint_hash(str(model_path))
+    
+    # An up-to-date file is reused without re-exporting
+    exported = onnx_path.stat().st_mtime_ns
+    load_onnx_model(str(model_path), CONFIG, export_missing=False)
+    assert onnx_path.stat().st_mtime_ns == exported
+    
+    # Retraining rewrites the checkpoint; the old ONNX file is now stale
+    retrained = save_checkpoint(model_path, seed=1)
+    with pytest.raises(FileNotFoundError):
+        load_onnx_model(str(model_path), CONFIG, export_missing=False)
+    
+    onnx_model = load_onnx_model(str(model_path), CONFIG)
+    assert onnx_checkpoint_hash(str(onnx_path)) == checkpoint_hash(str(model_path))
+    
+    x, adj = example_inputs(CONFIG['model_type'], CONFIG)
+    with torch.no_grad():
+        torch.testing.assert_close(onnx_model(x, adj), retrained(x, adj), rtol=1e-4, atol=1e-5)
+
+def test_onnx_without_hash_metadata(tmp_path):
+    import onnx
+    
+    model_path = tmp_path / 'final_model.pth'
+    save_checkpoint(model_path, seed=0)
+    load_onnx_model(str(model_path), CONFIG)
+    
+    onnx_path = onnx_path_for(str(model_path))
+    proto = onnx.load(str(onnx_path))
+    del proto.metadata_props[:]
+    onnx.save(proto, str(onnx_path))
+    
+    # Files exported before hashes were recorded count as stale
+    assert onnx_checkpoint_hash(str(onnx_path)) is None
+    with pytest.raises(FileNotFoundError):
+        load_onnx_model(str(model_path), CONFIG, export_missing=False)
@@ -0,0 +1,131 @@
+"""Stable node ids across incremental graph edits."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+from graph.registry import IncrementalGraph, NodeRegistry, remap_node_axis
+from graph.supports import GraphSupports
+
+NUM_ROADS = 30
+
+@pytest.fixture
+def segments():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'osm_id': [f'r{i}' for i in range(NUM_ROADS)],
+        'lat': 13.7 + rng.random(NUM_ROADS) * 0.02,
+        'lon': 100.5 + rng.random(NUM_ROADS) * 0.02
+    })
+
+@pytest.fixture
+def graph_dir(tmp_path, segments):
+    """Data directory with an empty graph, grown to NUM_ROADS segments."""
+    NodeRegistry().save(str(tmp_path / 'node_registry.json'))
+    np.save(tmp_path / 'node_coords.npy', np.zeros((0, 2)))
+    sp.save_npz(tmp_path / 'adjacency_matrix.npz', sp.csr_matrix((0, 0)))
+    
+    graph = IncrementalGraph(str(tmp_path), distance_threshold=1500.0)
+    graph.add_segments(segments)
+    graph.save(refresh_supports=False)
+    return tmp_path
+
+@pytest.fixture(autouse=True)
+def empty_memory_cache(monkeypatch):
+    monkeypatch.setattr(GraphSupports, '_memory_cache', {})
+
+def test_registry_ids_survive_remove_and_readd():
+    registry = NodeRegistry()
+    np.testing.assert_array_equal(registry.register(['a', 'b', 'c']), [0, 1, 2])
+    
+    np.testing.assert_array_equal(registry.remove(['b', 'unknown']), [1])
+    assert registry.node_mapping() == {'a': 0, 'c': 2}
+    
+    # New roads get new ids; a returning road keeps its old one
+    np.testing.assert_array_equal(registry.register(['d', 'b']), [3, 1])
+    assert registry.capacity == 4 and registry.num_active == 4
+    np.testing.assert_array_equal(registry.lookup(['a', 'b', 'd', 'x']), [0, 1, 3, -1])
+
+def test_registry_save_load(tmp_path):
+    registry = NodeRegistry()
+    registry.register(['a', 'b', 'c'])
+    registry.remove(['a'])
+    registry.save(str(tmp_path / 'node_registry.json'))
+    
+    loaded = NodeRegistry.load(str(tmp_path / 'node_registry.json'))
+    assert loaded.id_to_road == ['a', 'b', 'c']
+    assert loaded.node_mapping() == {'b': 1, 'c': 2}
+
+def test_incremental_edits_keep_node_ids(graph_dir, segments):
+    graph = IncrementalGraph(str(graph_dir), distance_threshold=1500.0)
+    before = graph.registry.lookup(segments['osm_id'])
+    
+    removed = graph.remove_segments(['r3', 'r10'])
+    added = graph.add_segments(pd.DataFrame({'osm_id': ['new'], 'lat': [13.71], 'lon': [100.51]}))
+    graph.save()
+    
+    reloaded = IncrementalGraph(str(graph_dir))
+    np.testing.assert_array_equal(reloaded.registry.lookup(segments['osm_id']), before)
+    np.testing.assert_array_equal(added, [NUM_ROADS])
+    
+    # Removed nodes keep their slot but lose every edge
+    adjacency = sp.load_npz(graph_dir / 'adjacency_matrix.npz').tocsr()
+    assert adjacency.shape == (NUM_ROADS + 1, NUM_ROADS + 1)
+    assert adjacency[removed].nnz == 0 and adjacency[:, removed].nnz == 0
+    
+    with open(graph_dir / 'node_mapping.json', 'r') as f:
+        mapping = json.load(f)
+    assert 'r3' not in mapping and mapping['new'] == NUM_ROADS and mapping['r4'] == 4
+    assert not (graph_dir / 'adjacency_matrix.npy').exists()
+
+def test_readded_segment_reuses_its_id(graph_dir, segments):
+    graph = IncrementalGraph(str(graph_dir), distance_threshold=1500.0)
+    graph.remove_segments(['r5'])
+    row = segments[segments['osm_id'] == 'r5']
+    np.testing.assert_array_equal(graph.add_segments(row), [5])
+    assert graph.registry.capacity == NUM_ROADS
+
+@pytest.mark.parametrize('kind,params', [
+    ('random_walk', {'num_steps': 2}),
+    ('dual_random_walk', {'num_steps': 2}),
+    ('chebyshev', {'order': 3, 'lambda_max': 2.0}),
+    ('chebyshev', {'order': 3})
+])
+def test_patched_supports_match_recompute(graph_dir, kind, params):
+    cache_dir = str(graph_dir / 'supports')
+    GraphSupports(sp.load_npz(graph_dir / 'adjacency_matrix.npz'), cache_dir=cache_dir).get(kind, **params)
+    
+    graph = IncrementalGraph(str(graph_dir), distance_threshold=1500.0)
+    graph.remove_segments(['r7'])
+    graph.add_segments(pd.DataFrame({'osm_id': ['new'], 'lat': [13.705], 'lon': [100.505]}))
+    graph.save()
+    
+    adjacency = sp.load_npz(graph_dir / 'adjacency_matrix.npz')
+    supports = GraphSupports(adjacency, cache_dir=cache_dir)
+    # Saving the edited graph already wrote its supports
+    assert list((graph_dir / 'supports').glob(f"{supports.graph_hash}_*.json"))
+    cached = supports.get(kind, **params)
+    GraphSupports._memory_cache.clear()
+    expected = GraphSupports(adjacency).get(kind, **params)
+    
+    assert len(cached) == len(expected)
+    for patched, full in zip(cached, expected):
+        assert patched.shape == (NUM_ROADS + 1, NUM_ROADS + 1)
+        np.testing.assert_allclose(patched.toarray(), full.toarray(), atol=1e-10)
+
+def test_remap_node_axis_rejects_per_road_arrays():
+    registry = NodeRegistry()
+    registry.register(['b', 'a', 'c'])
+    index = registry.remap_index({'a': 0, 'b': 1})
+    
+    grid = np.arange(8, dtype=np.float32).reshape(4, 2, 1)
+    remapped = remap_node_axis(grid, index, num_nodes=2)
+    np.testing.assert_array_equal(remapped[:, 0], grid[:, 1])
+    np.testing.assert_array_equal(remapped[:, 1], grid[:, 0])
+    assert (remapped[:, 2] == 0).all()
+    
+    with pytest.raises(ValueError):
+        remap_node_axis(np.zeros((5, 12, 1)), index, num_nodes=2)
@@ -0,0 +1,54 @@
+"""Sampled-block training matches the full graph when no neighbor is dropped."""
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+import torch
+
+from graph.sampling import NeighborSampler
+from models import create_model
+
+NUM_NODES = 40
+
+def random_graph(num_nodes: int, seed: int = 0) -> sp.csr_matrix:
+    """Symmetric row-normalized graph with self-loops."""
+    rng = np.random.default_rng(seed)
+    adj = sp.random(num_nodes, num_nodes, density=0.08, format='csr', random_state=rng)
+    adj = (adj + adj.T + sp.eye(num_nodes)).tocsr()
+    degree = np.asarray(adj.sum(axis=1)).flatten()
+    return (sp.diags(1.0 / degree) @ adj).tocsr()
+
+@pytest.mark.parametrize('model_type,num_layers', [('temporal_gcn', 3), ('stgcn', 2)])
+@pytest.mark.parametrize('layout', [torch.sparse_coo, torch.sparse_csr])
+def test_full_fanout_blocks_match_full_graph(model_type, num_layers, layout):
+    torch.manual_seed(0)
+    config = {
+        'num_nodes': NUM_NODES, 'input_dim': 3, 'num_features': 3, 'output_dim': 1,
+        'hidden_dim': 8, 'sequence_length': 6, 'prediction_horizon': 2
+    }
+    model = create_model(model_type, config).eval()
+    adjacency = random_graph(NUM_NODES)
+    sampler = NeighborSampler(adjacency, fanouts=[-1] * num_layers, batch_size=7,
+                              shuffle=False, layout=layout)
+    
+    x = torch.randn(2, config['sequence_length'], NUM_NODES, 3)
+    with torch.no_grad():
+        full = model(x, torch.tensor(adjacency.toarray(), dtype=torch.float32))
+        
+        for mini_batch in sampler:
+            blocks = mini_batch['blocks']
+            assert all(block.layout == layout for block in blocks)
+            assert blocks[-1].shape[0] == len(mini_batch['seed_nodes'])
+            
+            sampled = model(x[:, :, mini_batch['input_nodes']], blocks)
+            torch.testing.assert_close(sampled, full[:, :, mini_batch['seed_nodes']],
+                                       rtol=1e-4, atol=1e-5)
+
+def test_fanout_bounds_block_degree():
+    sampler = NeighborSampler(random_graph(NUM_NODES), fanouts=[2, 2], batch_size=8, seed=0)
+    mini_batch = sampler.sample_blocks(np.arange(8))
+    
+    for block in mini_batch['blocks']:
+        rows = block.coalesce().indices()[0]
+        assert torch.bincount(rows).max() <= 2
+    assert torch.equal(mini_batch['input_nodes'][:8], mini_batch['seed_nodes'])
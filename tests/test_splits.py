@@ -0,0 +1,76 @@
+"""Time-based splits never let a window's targets cross a split boundary."""
+
+import json
+
+import numpy as np
+import pytest
+import torch
+
+from datasets import SnapshotDataset
+from splits import SPLITS, TimeSplitManager
+
+def target_steps(splits: TimeSplitManager, windows: range) -> np.ndarray:
+    """All time steps predicted by a range of windows."""
+    starts = np.asarray(windows)[:, None] + splits.sequence_length
+    return (starts + np.arange(splits.prediction_horizon)).ravel()
+
+@pytest.mark.parametrize('sequence_length,prediction_horizon', [(12, 3), (5, 1), (1, 8)])
+def test_split_targets_stay_inside_their_split(sequence_length, prediction_horizon):
+    splits = TimeSplitManager.from_fractions(200, sequence_length, prediction_horizon)
+    bounds = {
+        'train': (0, splits.val_start),
+        'val': (splits.val_start, splits.test_start),
+        'test': (splits.test_start, splits.num_steps)
+    }
+    
+    for split in SPLITS:
+        steps = target_steps(splits, splits.split_range(split))
+        low, high = bounds[split]
+        assert steps.min() >= low and steps.max() < high
+        # Every step of the split is predicted by some window
+        assert set(steps) == set(range(max(low, sequence_length), high))
+    
+    # Inputs may look back into earlier splits, but never ahead
+    ranges = splits.ranges
+    last_train_window = ranges['train'][-1]
+    assert last_train_window + splits.window <= splits.val_start
+
+def test_rolling_origin_folds_validate_after_training():
+    splits = TimeSplitManager(300, 12, 3, val_start=200, test_start=250)
+    
+    for expanding in (True, False):
+        folds = splits.rolling_origin_folds(num_folds=4, fold_steps=20, expanding=expanding)
+        assert [fold['origin'] for fold in folds] == [170, 190, 210, 230]
+        
+        for fold in folds:
+            train_steps = target_steps(splits, fold['train'])
+            val_steps = target_steps(splits, fold['val'])
+            assert train_steps.max() < fold['origin'] <= val_steps.min()
+            assert val_steps.max() < splits.test_start
+
+def test_invalid_boundaries_are_rejected():
+    with pytest.raises(ValueError):
+        TimeSplitManager(100, 12, 3, val_start=80, test_start=60)
+
+def test_snapshot_windows_respect_saved_splits(tmp_path):
+    num_steps, num_nodes = 120, 5
+    # Every value is its own time step, so targets reveal where they were read from
+    grid = np.broadcast_to(np.arange(num_steps, dtype=np.float32)[:, None, None],
+                           (num_steps, num_nodes, 2))
+    np.save(tmp_path / 'grid.npy', np.ascontiguousarray(grid))
+    with open(tmp_path / 'metadata.json', 'w') as f:
+        json.dump({'feature_names': ['avg_speed', 'volume'], 'store_format': 'snapshot'}, f)
+    
+    splits = TimeSplitManager.from_fractions(num_steps, 12, 3)
+    splits.save(str(tmp_path / 'splits.json'))
+    bounds = {'train': (0, splits.val_start), 'val': (splits.val_start, splits.test_start),
+              'test': (splits.test_start, num_steps)}
+    
+    for split in SPLITS:
+        dataset = SnapshotDataset(str(tmp_path), split=split, target_features=['avg_speed'])
+        batch = dataset.get_batch(torch.arange(len(dataset)))
+        low, high = bounds[split]
+        
+        assert batch['target'].min() >= low and batch['target'].max() < high
+        # Inputs immediately precede their targets
+        assert (batch['sequence'][:, -1] + 1 == batch['target'][:, 0]).all()
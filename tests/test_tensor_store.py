@@ -0,0 +1,75 @@
+"""Tensor store round trips for every compression mode."""
+
+import numpy as np
+import pytest
+
+from data import tensor_store
+from data.tensor_store import COMPRESSIONS, TensorStore, encode_road_ids
+
+BACKENDS = {'lz4': tensor_store.lz4_frame, 'zstd': tensor_store.zstandard}
+
+@pytest.fixture(params=COMPRESSIONS)
+def compression(request):
+    if BACKENDS.get(request.param, True) is None:
+        pytest.skip(f"{request.param} backend not installed")
+    return request.param
+
+@pytest.fixture
+def data():
+    return np.random.default_rng(0).standard_normal((103, 4, 3)).astype(np.float32)
+
+def test_round_trip(tmp_path, compression, data):
+    writer = TensorStore(str(tmp_path), mode='w')
+    writer.write_array('X', data, chunk_rows=16, compression=compression)
+    writer.write_array('labels', np.arange(103, dtype=np.int64), chunk_rows=50,
+                       compression=compression)
+    
+    reader = TensorStore(str(tmp_path), cache_chunks=2)
+    assert reader.shape('X') == data.shape
+    np.testing.assert_array_equal(reader.read('X'), data)
+    # Ranges spanning several chunks, and the ragged last chunk
+    np.testing.assert_array_equal(reader.read('X', 10, 50), data[10:50])
+    np.testing.assert_array_equal(reader.read('X', 96), data[96:])
+    assert reader.read('X', 50, 50).shape == (0, 4, 3)
+    
+    indices = [102, 0, 17, 17, 64]
+    np.testing.assert_array_equal(reader.take('X', indices), data[indices])
+    np.testing.assert_array_equal(reader.take('labels', indices), indices)
+
+def test_float16_storage(tmp_path, compression, data):
+    writer = TensorStore(str(tmp_path), mode='w')
+    writer.write_array('X', data, chunk_rows=16, dtype='float16', compression=compression)
+    
+    rows = TensorStore(str(tmp_path)).read('X', 20, 40)
+    assert rows.dtype == np.float16
+    np.testing.assert_allclose(rows.astype(np.float32), data[20:40], atol=1e-2, rtol=1e-3)
+
+def test_append_mode_keeps_existing_arrays(tmp_path, compression, data):
+    TensorStore(str(tmp_path), mode='w').write_array('X', data, compression=compression)
+    appender = TensorStore(str(tmp_path), mode='a')
+    appender.write_array('y', data[:, :1], compression=compression)
+    
+    reader = TensorStore(str(tmp_path))
+    assert 'X' in reader and 'y' in reader
+    np.testing.assert_array_equal(reader.read('y'), data[:, :1])
+
+def test_read_only_store_rejects_writes(tmp_path, data):
+    TensorStore(str(tmp_path), mode='w').write_array('X', data)
+    with pytest.raises(IOError):
+        TensorStore(str(tmp_path)).write_array('X', data)
+
+def test_unknown_compression_is_rejected(tmp_path, data):
+    with pytest.raises(ValueError):
+        TensorStore(str(tmp_path), mode='w').write_array('X', data, compression='snappy')
+
+def test_missing_backend_fails_before_writing(tmp_path, monkeypatch, data):
+    monkeypatch.setattr(tensor_store, 'zstandard', None)
+    store = TensorStore(str(tmp_path), mode='w')
+    with pytest.raises(ImportError):
+        store.write_array('X', data, compression='zstd')
+    assert 'X' not in store and not (tmp_path / 'X').exists()
+
+def test_encode_road_ids_marks_unknown_roads():
+    indices, vocabulary = encode_road_ids(['b', 'x', 'a', 'b'], {'a': 0, 'b': 1})
+    np.testing.assert_array_equal(indices, [1, -1, 0, 1])
+    assert vocabulary == ['a', 'b']